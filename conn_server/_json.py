@@ -0,0 +1,31 @@
+"""JSON helpers — use orjson when installed, stdlib json otherwise.
+
+orjson is an optional speedup (``pip install conn-server[fast]``); every
+caller must work with either backend.
+"""
+from __future__ import annotations
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Parse JSON from bytes or str. Both backends raise json.JSONDecodeError
+# (orjson.JSONDecodeError subclasses it).
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def dumps(obj) -> bytes:
+    """Serialize to compact UTF-8 JSON (for wire payloads)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def dumps_indented(obj) -> bytes:
+    """Serialize to 2-space-indented UTF-8 JSON (for files users may hand-edit)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
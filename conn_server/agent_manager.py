@@ -1,17 +1,47 @@
 """Agent management — reads/writes Claude Code agent .md files in ~/.claude/agents/."""
 from __future__ import annotations
 
+import os
 import re
-from dataclasses import dataclass, field, asdict
+import string
+import sys
+from dataclasses import dataclass
 from pathlib import Path
 
+# Optional: PyYAML (ideally with libyaml) reads block lists in frontmatter,
+# e.g. a "tools:" key followed by "- Read" list items. Flat key: value
+# frontmatter never touches it, and scalar values never come from it.
+try:
+    import yaml
+    _YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:
+    yaml = None
+    _YAML_LOADER = None
+
 AGENTS_DIR = Path.home() / ".claude" / "agents"
 
-# Agent name: lowercase letters, digits, hyphens (1-64 chars)
-NAME_PATTERN = re.compile(r"^[a-z][a-z0-9-]{0,63}$")
+# Agent name: lowercase letters, digits, hyphens (1-64 chars), starting with a
+# letter. Checked with str.translate (deletes every allowed char in one C pass)
+# rather than a regex.
+_NAME_FIRST_CHARS = frozenset(string.ascii_lowercase)
+_NAME_ALLOWED_DELETE = str.maketrans("", "", string.ascii_lowercase + string.digits + "-")
+
+_VALID_MODELS = frozenset({"sonnet", "opus", "haiku", "inherit"})
+_VALID_PERMISSION_MODES = frozenset({"default", "plan", "acceptEdits", "dontAsk", "bypassPermissions"})
+
+# list_agents reads files in chunks of this size until the frontmatter closes
+_HEADER_CHUNK_SIZE = 4096
+
+# One "key: value" frontmatter line, split on the first colon like a plain
+# str.find(":") would; comment lines and lines without a colon never match
+_FM_LINE = re.compile(r"(?m)^(?![ \t]*#)[ \t]*([^:\n]*?)[ \t]*:[ \t]*(.*?)[ \t\r]*$")
+# A top-level key with no inline value — the start of a nested YAML block
+_FM_BLOCK_KEY = re.compile(r"(?m)^(?![#\s])[^:\n]*:[ \t\r]*$")
+# A value wrapped in matching single or double quotes
+_QUOTED = re.compile(r"^(['\"])(.*)\1$")
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentInfo:
     name: str
     description: str
@@ -30,12 +60,16 @@ class AgentManager:
 
     def list_agents(self) -> list[dict]:
         """List all agents (without full prompt text for brevity)."""
-        if not self._dir.exists():
+        try:
+            with os.scandir(self._dir) as it:
+                entries = [e for e in it if e.name.endswith(".md") and e.is_file()]
+        except FileNotFoundError:
             return []
+        entries.sort(key=lambda e: e.name)
         agents = []
-        for path in sorted(self._dir.glob("*.md")):
+        for entry in entries:
             try:
-                agent = self._parse_file(path)
+                agent = self._parse_file_header(entry)
                 agents.append(self._to_summary(agent))
             except Exception:
                 continue  # Skip malformed files
@@ -87,10 +121,17 @@ class AgentManager:
 
     def _parse_file(self, path: Path) -> AgentInfo:
         """Parse a markdown file with YAML frontmatter into AgentInfo."""
-        content = path.read_text()
+        return self._parse_content(path.read_bytes(), path.stem)
+
+    def _parse_file_header(self, entry: os.DirEntry) -> AgentInfo:
+        """Parse only the frontmatter of an agent file (prompt left empty)."""
+        return self._parse_content(_read_frontmatter_block(entry.path), entry.name[:-3])
+
+    def _parse_content(self, content: str | bytes, default_name: str) -> AgentInfo:
+        """Parse markdown with YAML frontmatter into AgentInfo."""
         frontmatter, body = _parse_frontmatter(content)
 
-        name = frontmatter.get("name", path.stem)
+        name = frontmatter.get("name", default_name)
         description = frontmatter.get("description", "")
 
         # Parse tools — can be comma-separated string or already a list
@@ -116,47 +157,68 @@ class AgentManager:
 
     def _to_markdown(self, agent: AgentInfo) -> str:
         """Convert AgentInfo to markdown with YAML frontmatter."""
-        lines = ["---"]
-        lines.append(f"name: {agent.name}")
-        lines.append(f"description: {agent.description}")
-        if agent.tools:
-            lines.append(f"tools: {', '.join(agent.tools)}")
-        if agent.disallowed_tools:
-            lines.append(f"disallowedTools: {', '.join(agent.disallowed_tools)}")
-        if agent.model:
-            lines.append(f"model: {agent.model}")
-        if agent.permission_mode:
-            lines.append(f"permissionMode: {agent.permission_mode}")
-        if agent.mcp_servers:
-            lines.append(f"mcpServers: {', '.join(agent.mcp_servers)}")
-        if agent.max_turns is not None:
-            lines.append(f"maxTurns: {agent.max_turns}")
-        lines.append("---")
-        lines.append("")
-        if agent.prompt:
-            lines.append(agent.prompt)
-            lines.append("")
-        return "\n".join(lines)
+        tools = f"tools: {', '.join(agent.tools)}\n" if agent.tools else ""
+        disallowed = f"disallowedTools: {', '.join(agent.disallowed_tools)}\n" if agent.disallowed_tools else ""
+        model = f"model: {agent.model}\n" if agent.model else ""
+        permission_mode = f"permissionMode: {agent.permission_mode}\n" if agent.permission_mode else ""
+        mcp = f"mcpServers: {', '.join(agent.mcp_servers)}\n" if agent.mcp_servers else ""
+        max_turns = f"maxTurns: {agent.max_turns}\n" if agent.max_turns is not None else ""
+        body = f"\n{agent.prompt}\n" if agent.prompt else ""
+        return (
+            f"---\nname: {agent.name}\ndescription: {agent.description}\n"
+            f"{tools}{disallowed}{model}{permission_mode}{mcp}{max_turns}---\n{body}"
+        )
 
     def _to_summary(self, agent: AgentInfo) -> dict:
         """Convert to dict for list responses (includes all fields)."""
-        d = {
-            "name": agent.name,
-            "description": agent.description,
-            "model": agent.model,
-            "tools": agent.tools,
-            "disallowed_tools": agent.disallowed_tools,
-            "permission_mode": agent.permission_mode,
-            "mcp_servers": agent.mcp_servers,
-            "max_turns": agent.max_turns,
-        }
-        # Remove None values for cleaner JSON
-        return {k: v for k, v in d.items() if v is not None}
+        d = {"name": agent.name, "description": agent.description}
+        # Omit None values for cleaner JSON
+        for key, value in (
+            ("model", agent.model),
+            ("tools", agent.tools),
+            ("disallowed_tools", agent.disallowed_tools),
+            ("permission_mode", agent.permission_mode),
+            ("mcp_servers", agent.mcp_servers),
+            ("max_turns", agent.max_turns),
+        ):
+            if value is not None:
+                d[key] = value
+        return d
+
+
+def _read_frontmatter_block(path: str) -> bytes:
+    """Read just enough of a file to cover its frontmatter, including the closing ---.
+
+    Returns b"" if the file has no (closed) frontmatter.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        data = os.read(fd, _HEADER_CHUNK_SIZE)
+        if not data.startswith(b"---"):
+            return b""
+        search_from = 3
+        while (end := data.find(b"\n---", search_from)) == -1:
+            chunk = os.read(fd, _HEADER_CHUNK_SIZE)
+            if not chunk:
+                return b""
+            search_from = max(3, len(data) - 3)
+            data += chunk
+        return data[:end + 4]
+    finally:
+        os.close(fd)
+
+
+def _is_valid_name(name: str) -> bool:
+    return (
+        1 <= len(name) <= 64
+        and name[0] in _NAME_FIRST_CHARS
+        and not name.translate(_NAME_ALLOWED_DELETE)
+    )
 
 
 def _validate_agent(agent: AgentInfo):
     """Validate agent fields."""
-    if not NAME_PATTERN.match(agent.name):
+    if not _is_valid_name(agent.name):
         raise ValueError(
             f"Invalid agent name '{agent.name}': must be lowercase letters, digits, "
             f"and hyphens (1-64 chars, must start with a letter)"
@@ -164,59 +226,71 @@ def _validate_agent(agent: AgentInfo):
     if not agent.description:
         raise ValueError("Agent description is required")
 
-    valid_models = {"sonnet", "opus", "haiku", "inherit"}
-    if agent.model and agent.model not in valid_models:
-        raise ValueError(f"Invalid model '{agent.model}': must be one of {valid_models}")
+    if agent.model and agent.model not in _VALID_MODELS:
+        raise ValueError(f"Invalid model '{agent.model}': must be one of {', '.join(sorted(_VALID_MODELS))}")
 
-    valid_permission_modes = {"default", "plan", "acceptEdits", "dontAsk", "bypassPermissions"}
-    if agent.permission_mode and agent.permission_mode not in valid_permission_modes:
+    if agent.permission_mode and agent.permission_mode not in _VALID_PERMISSION_MODES:
         raise ValueError(
-            f"Invalid permission mode '{agent.permission_mode}': must be one of {valid_permission_modes}"
+            f"Invalid permission mode '{agent.permission_mode}': "
+            f"must be one of {', '.join(sorted(_VALID_PERMISSION_MODES))}"
         )
 
 
-def _parse_frontmatter(content: str) -> tuple[dict, str]:
+def _parse_frontmatter(content: str | bytes) -> tuple[dict, str]:
     """Parse YAML frontmatter from markdown content.
 
     Returns (frontmatter_dict, body_text).
     Simple parser — no PyYAML dependency needed for flat key-value pairs.
+    Raw file bytes are accepted so the delimiter search runs before decoding;
+    only the frontmatter and body slices are decoded.
     """
-    if not content.startswith("---"):
-        return {}, content
-
-    # Find the closing ---
-    end = content.find("---", 3)
-    if end == -1:
-        return {}, content
-
-    yaml_block = content[3:end].strip()
-    body = content[end + 3:]
-
-    frontmatter = {}
-    for line in yaml_block.split("\n"):
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-        colon_idx = line.find(":")
-        if colon_idx == -1:
-            continue
-        key = line[:colon_idx].strip()
-        value = line[colon_idx + 1:].strip()
-        # Remove surrounding quotes if present
-        if (value.startswith('"') and value.endswith('"')) or \
-           (value.startswith("'") and value.endswith("'")):
-            value = value[1:-1]
-        frontmatter[key] = value
-
+    if isinstance(content, bytes):
+        if not content.startswith(b"---"):
+            return {}, content.decode()
+        end = content.find(b"\n---", 3)
+        if end == -1:
+            return {}, content.decode()
+        yaml_block = content[3:end].decode()
+        body = content[end + 4:].decode()
+    else:
+        if not content.startswith("---"):
+            return {}, content
+        end = content.find("\n---", 3)
+        if end == -1:
+            return {}, content
+        yaml_block = content[3:end]
+        body = content[end + 4:]
+
+    # Intern keys so they share the identifier-literal objects used by .get() lookups
+    frontmatter = {sys.intern(m.group(1)): _unquote(m.group(2)) for m in _FM_LINE.finditer(yaml_block)}
+
+    # Block lists ("tools:" followed by "- Read" items) come from YAML; scalar
+    # fields always keep the flat parser's str values, since YAML would turn
+    # "on" into True, "" into None and drop everything after " #"
+    if _YAML_LOADER is not None and _FM_BLOCK_KEY.search(yaml_block):
+        try:
+            parsed = yaml.load(yaml_block, Loader=_YAML_LOADER)
+        except yaml.YAMLError:
+            parsed = None
+        if isinstance(parsed, dict):
+            for key, value in parsed.items():
+                if isinstance(key, str) and isinstance(value, list):
+                    frontmatter[sys.intern(key)] = [str(item) for item in value]
     return frontmatter, body
 
 
+def _unquote(value: str) -> str:
+    """Remove surrounding quotes if present."""
+    m = _QUOTED.match(value)
+    return m.group(2) if m else value
+
+
 def _parse_string_list(value) -> list[str] | None:
     """Parse a comma-separated string or list into a list of strings."""
-    if value is None:
-        return None
+    if isinstance(value, str):
+        if not value.strip():
+            return None
+        return [stripped for item in value.split(",") if (stripped := item.strip())]
     if isinstance(value, list):
         return value
-    if isinstance(value, str) and value.strip():
-        return [item.strip() for item in value.split(",") if item.strip()]
     return None
@@ -1,10 +1,16 @@
 """Bearer token verification for WebSocket and REST endpoints."""
 
+import hashlib
 import hmac
 
-from .config import get_auth_token
+from .config import get_auth_token_digest
 
 
 def verify_token(token: str) -> bool:
-    """Compare provided token against stored auth token (timing-safe)."""
-    return hmac.compare_digest(token, get_auth_token())
+    """Compare provided token against stored auth token (timing-safe).
+
+    Both sides are hashed to fixed-length SHA-256 digests first, so the
+    comparison does constant work regardless of the submitted token's length.
+    """
+    digest = hashlib.sha256(token.encode("utf-8", "replace")).digest()
+    return hmac.compare_digest(digest, get_auth_token_digest())
@@ -15,6 +15,7 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import functools
 import io
 import json
 import os
@@ -25,16 +26,18 @@ import signal
 import socket
 import subprocess
 import sys
+import time
+import typing
 from pathlib import Path
 
 from . import __version__
 from .config import (
     CONFIG_DIR, CONFIG_FILE, LOG_DIR,
-    load_config, get_host, get_port, get_working_dir,
+    load_config, get_all, get_port, get_event_loop_impl,
     DEFAULT_HOST, DEFAULT_PORT, WORKING_DIR,
-    _write_private_file, _get_local_ip, _get_tailscale_ip,
+    _ensure_dirs, _write_private_file, _get_local_ip, _get_tailscale_ip,
+    invalidate_config_cache,
 )
-from .tls import ensure_certs, get_cert_fingerprint, get_cert_der_b64, TLS_DIR
 
 # ---------- Colors ----------
 
@@ -48,13 +51,20 @@ NC = "\033[0m"
 
 PLIST_NAME = "com.conn.server"
 PLIST_PATH = Path.home() / "Library" / "LaunchAgents" / f"{PLIST_NAME}.plist"
+SYSTEMD_UNIT_PATH = Path("/etc/systemd/system/conn.service")
+
+
+@functools.lru_cache(maxsize=16)
+def _which(name: str) -> str | None:
+    """shutil.which, memoized — PATH doesn't change during a CLI run."""
+    return shutil.which(name)
 
 
 def _check_prerequisites() -> bool:
     """Check that required tools are available. Returns True if all OK."""
     ok = True
 
-    if not shutil.which("claude"):
+    if not _which("claude"):
         _fail("Claude CLI not found")
         print()
         print("  The Conn server requires the Claude CLI to be installed and authenticated.")
@@ -90,14 +100,24 @@ def _is_macos() -> bool:
     return platform.system() == "Darwin"
 
 
+@functools.lru_cache(maxsize=1)
 def _is_service_running() -> bool:
+    """Whether the launchd/systemd service is loaded.
+
+    Memoized: each command checks this before it starts or stops anything
+    and never re-queries afterwards.
+    """
     if _is_macos():
+        if not PLIST_PATH.exists():
+            return False
         result = subprocess.run(
             ["launchctl", "list", PLIST_NAME],
             capture_output=True, text=True,
         )
         return result.returncode == 0
     else:
+        if not SYSTEMD_UNIT_PATH.exists():
+            return False
         result = subprocess.run(
             ["systemctl", "is-active", "--quiet", "conn"],
             capture_output=True,
@@ -106,18 +126,53 @@ def _is_service_running() -> bool:
 
 
 def _health_check() -> bool:
-    port = get_port()
-    result = subprocess.run(
-        ["curl", "-skf", f"https://localhost:{port}/health"],
-        capture_output=True,
-    )
-    return result.returncode == 0
+    import http.client
+    import ssl
+
+    # The server uses a self-signed cert, so skip verification (like curl -k)
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    conn = http.client.HTTPSConnection("localhost", get_port(), timeout=1, context=ctx)
+    try:
+        conn.request("GET", "/health")
+        return conn.getresponse().status == 200
+    except (OSError, http.client.HTTPException):
+        return False
+    finally:
+        conn.close()
+
+
+def _restart_service():
+    """Restart the installed launchd/systemd service."""
+    if _is_macos():
+        subprocess.run(["launchctl", "unload", str(PLIST_PATH)], capture_output=True)
+        time.sleep(1)
+        subprocess.run(["launchctl", "load", str(PLIST_PATH)])
+    else:
+        subprocess.run(["sudo", "systemctl", "restart", "conn"])
+
+
+def _wait_for_health(timeout: float = 10.0) -> bool:
+    """Poll the health endpoint until it answers or `timeout` seconds pass.
+
+    Starts at 50ms and doubles up to 0.5s between attempts, so a server that
+    comes up quickly is seen right away without hammering a slow one.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while True:
+        if _health_check():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.5)
 
 
 def _install_launchd_service():
     """Install a launchd plist for the server."""
-    host = get_host()
-    port = get_port()
     LOG_DIR.mkdir(parents=True, exist_ok=True)
 
     # Unload existing service
@@ -128,7 +183,7 @@ def _install_launchd_service():
         )
 
     # Find the conn-server executable
-    conn_server_bin = shutil.which("conn-server")
+    conn_server_bin = _which("conn-server")
     if not conn_server_bin:
         _fail("conn-server not found on PATH — can't install service")
         return False
@@ -169,7 +224,7 @@ def _install_launchd_service():
 
 def _install_systemd_service():
     """Install a systemd unit for the server."""
-    conn_server_bin = shutil.which("conn-server")
+    conn_server_bin = _which("conn-server")
     if not conn_server_bin:
         _fail("conn-server not found on PATH — can't install service")
         return False
@@ -190,7 +245,7 @@ Environment=PATH={os.environ.get("HOME", "")}/.local/bin:/usr/local/bin:/usr/bin
 WantedBy=multi-user.target
 """
 
-    service_path = "/etc/systemd/system/conn.service"
+    service_path = str(SYSTEMD_UNIT_PATH)
     result = subprocess.run(
         ["sudo", "tee", service_path],
         input=service_content, capture_output=True, text=True,
@@ -217,6 +272,27 @@ def _prompt_yn(msg: str, default: str = "Y") -> bool:
         return default.lower().startswith("y")
 
 
+# Per-invocation memos — none of these change during a CLI run. (The local IP
+# and config.json are already cached inside config.)
+
+@functools.lru_cache(maxsize=1)
+def _tailscale_ip() -> str | None:
+    return _get_tailscale_ip()
+
+
+@functools.lru_cache(maxsize=1)
+def _cert_der_b64() -> str:
+    """DER cert for the QR payload; call only after ensure_certs()."""
+    from .tls import get_cert_der_b64
+    return get_cert_der_b64()
+
+
+@functools.lru_cache(maxsize=1)
+def _cert_fingerprint() -> str:
+    from .tls import get_cert_fingerprint_from_der_b64
+    return get_cert_fingerprint_from_der_b64(_cert_der_b64())
+
+
 def _print_connection_info(show_qr: bool = False):
     """Print connection details to the terminal.
 
@@ -224,14 +300,11 @@ def _print_connection_info(show_qr: bool = False):
         show_qr: If True, display QR code and offer to open SVG.
                  If False, show compact summary only.
     """
-    config = load_config()
-    port = get_port()
-    token = config["auth_token"]
-    working_dir = get_working_dir()
+    _, port, working_dir, token = get_all()
     local_ip = _get_local_ip()
-    tailscale_ip = _get_tailscale_ip()
+    tailscale_ip = _tailscale_ip()
     qr_ip = tailscale_ip or local_ip
-    fingerprint = get_cert_fingerprint()
+    fingerprint = _cert_fingerprint()
 
     print()
     print(f"  {BOLD}Conn Server v{__version__}{NC}")
@@ -259,7 +332,7 @@ def _print_connection_info(show_qr: bool = False):
         import qrcode
         from qrcode.image.svg import SvgPathImage
 
-        cert_der_b64 = get_cert_der_b64()
+        cert_der_b64 = _cert_der_b64()
         payload = json.dumps(
             {"host": qr_ip, "port": port, "token": token, "cert": cert_der_b64},
             separators=(",", ":"),
@@ -278,10 +351,10 @@ def _print_connection_info(show_qr: bool = False):
 
         # SVG file for small terminals
         svg_path = CONFIG_DIR / "qr-code.svg"
-        qr_svg = qrcode.QRCode(box_size=10, border=4)
-        qr_svg.add_data(payload)
-        qr_svg.make(fit=True)
-        img = qr_svg.make_image(image_factory=SvgPathImage)
+        # Same QR matrix, rendered larger — no need to encode the payload again
+        qr.box_size = 10
+        qr.border = 4
+        img = qr.make_image(image_factory=SvgPathImage)
         img.save(str(svg_path))
 
         print("  Scan the QR code above, or open the image:")
@@ -291,7 +364,7 @@ def _print_connection_info(show_qr: bool = False):
         if _prompt_yn("Open QR code image?"):
             if _is_macos():
                 subprocess.run(["open", str(svg_path)], capture_output=True)
-            elif shutil.which("xdg-open"):
+            elif _which("xdg-open"):
                 subprocess.run(["xdg-open", str(svg_path)], capture_output=True)
             else:
                 _info(f"Open {svg_path} in a browser to scan")
@@ -301,6 +374,25 @@ def _print_connection_info(show_qr: bool = False):
     print()
 
 
+def _save_setup_config(config: dict):
+    """Persist the config from a setup flow, then make sure TLS certs exist.
+
+    The file is written to a temp name and renamed into place, so an
+    interrupted setup never leaves a truncated config.json behind.
+    """
+    from .tls import ensure_certs
+
+    _ensure_dirs()
+    tmp_path = CONFIG_FILE.with_suffix(".json.tmp")
+    _write_private_file(tmp_path, json.dumps(config, indent=2))
+    tmp_path.rename(CONFIG_FILE)
+    invalidate_config_cache()
+    _success(f"Configuration saved to {CONFIG_FILE}")
+
+    ensure_certs()
+    _success("TLS certificates ready")
+
+
 def cmd_setup(args):
     """Interactive setup — configure port, project directory, and auth token."""
     print()
@@ -312,10 +404,7 @@ def cmd_setup(args):
         return
 
     # Load existing config or defaults
-    existing = {}
-    if CONFIG_FILE.exists():
-        with open(CONFIG_FILE) as f:
-            existing = json.load(f)
+    existing = load_config() if CONFIG_FILE.exists() else {}
 
     current_port = existing.get("port", DEFAULT_PORT)
     current_dir = existing.get("working_dir", WORKING_DIR)
@@ -368,14 +457,7 @@ def cmd_setup(args):
         "working_dir": working_dir,
     }
 
-    from .config import _ensure_dirs
-    _ensure_dirs()
-    _write_private_file(CONFIG_FILE, json.dumps(config, indent=2))
-    _success(f"Configuration saved to {CONFIG_FILE}")
-
-    # Ensure TLS certs
-    ensure_certs()
-    _success("TLS certificates ready")
+    _save_setup_config(config)
 
     print()
     _info(f"Run {BOLD}conn-server start{NC} to start the server")
@@ -427,14 +509,7 @@ def _run_first_time_setup():
         "working_dir": working_dir,
     }
 
-    from .config import _ensure_dirs
-    _ensure_dirs()
-    _write_private_file(CONFIG_FILE, json.dumps(config, indent=2))
-    _success(f"Configuration saved to {CONFIG_FILE}")
-
-    # Ensure TLS certs
-    ensure_certs()
-    _success("TLS certificates ready")
+    _save_setup_config(config)
     print()
 
     return True
@@ -442,6 +517,8 @@ def _run_first_time_setup():
 
 def cmd_start(args):
     """Start the server."""
+    from .tls import ensure_certs
+
     # Check prerequisites
     if not _check_prerequisites():
         return
@@ -452,15 +529,11 @@ def cmd_start(args):
         if not _run_first_time_setup():
             return  # Setup was cancelled
 
-    config = load_config()
-    host = get_host()
-    port = get_port()
-
     ensure_certs()
 
     # If no service is installed yet, ask whether to install one
     service_running = _is_service_running()
-    service_exists = PLIST_PATH.exists() if _is_macos() else Path("/etc/systemd/system/conn.service").exists()
+    service_exists = PLIST_PATH.exists() if _is_macos() else SYSTEMD_UNIT_PATH.exists()
 
     if service_exists and service_running:
         # Service already running — just inform and exit
@@ -478,9 +551,7 @@ def cmd_start(args):
             subprocess.run(["launchctl", "load", str(PLIST_PATH)], capture_output=True)
         else:
             subprocess.run(["sudo", "systemctl", "start", "conn"])
-        import time
-        time.sleep(2)
-        if _health_check():
+        if _wait_for_health():
             _success("Server started")
             _print_connection_info(show_qr=True)
         else:
@@ -502,9 +573,7 @@ def cmd_start(args):
             ok = _install_systemd_service()
 
         if ok:
-            import time
-            time.sleep(2)
-            if _health_check():
+            if _wait_for_health():
                 _success("Service installed and running")
                 _print_connection_info(show_qr=True)
             else:
@@ -518,8 +587,9 @@ def cmd_start(args):
 
 def _run_server():
     """Start the uvicorn server (blocking). Used by both foreground and service modes."""
-    host = get_host()
-    port = get_port()
+    from .tls import ensure_certs, TLS_DIR
+
+    host, port, _, _ = get_all()
     ensure_certs()
 
     import uvicorn
@@ -529,6 +599,7 @@ def _run_server():
         port=port,
         ssl_keyfile=str(TLS_DIR / "server.key"),
         ssl_certfile=str(TLS_DIR / "server.crt"),
+        loop=get_event_loop_impl(),
     )
 
 
@@ -560,20 +631,12 @@ def cmd_stop(args):
 def cmd_restart(args):
     """Restart the system service."""
     _info("Restarting server...")
-    if _is_macos():
-        if not PLIST_PATH.exists():
-            _fail("Service not installed — run: conn-server start")
-            return
-        subprocess.run(["launchctl", "unload", str(PLIST_PATH)], capture_output=True)
-        import time
-        time.sleep(1)
-        subprocess.run(["launchctl", "load", str(PLIST_PATH)])
-    else:
-        subprocess.run(["sudo", "systemctl", "restart", "conn"])
+    if _is_macos() and not PLIST_PATH.exists():
+        _fail("Service not installed — run: conn-server start")
+        return
+    _restart_service()
 
-    import time
-    time.sleep(2)
-    if _health_check():
+    if _wait_for_health():
         _success("Server restarted")
     else:
         _warn("Server restarted but not responding yet — check: conn-server logs")
@@ -581,10 +644,7 @@ def cmd_restart(args):
 
 def cmd_status(args):
     """Show server status."""
-    config = load_config()
-    port = get_port()
-    host = get_host()
-    working_dir = get_working_dir()
+    host, port, working_dir, _ = get_all()
 
     print()
     print(f"  {BOLD}Conn Server Status{NC} {DIM}v{__version__}{NC}")
@@ -600,7 +660,7 @@ def cmd_status(args):
         _fail("Server is not running")
 
     local_ip = _get_local_ip()
-    tailscale_ip = _get_tailscale_ip()
+    tailscale_ip = _tailscale_ip()
     print()
     print(f"  {DIM}URL:{NC}        https://localhost:{port}")
     print(f"  {DIM}Host:{NC}       {host}")
@@ -629,14 +689,14 @@ def cmd_qr(args):
         print("  Run: pip install qrcode")
         return
 
-    config = load_config()
-    port = get_port()
-    token = config["auth_token"]
+    from .tls import ensure_certs
+
+    _, port, _, token = get_all()
 
     ensure_certs()
-    cert_der_b64 = get_cert_der_b64()
+    cert_der_b64 = _cert_der_b64()
     local_ip = _get_local_ip()
-    tailscale_ip = _get_tailscale_ip()
+    tailscale_ip = _tailscale_ip()
     qr_ip = tailscale_ip or local_ip
 
     payload = json.dumps(
@@ -666,10 +726,10 @@ def cmd_qr(args):
         from qrcode.image.svg import SvgPathImage
 
         svg_path = CONFIG_DIR / "qr-code.svg"
-        qr_svg = qrcode.QRCode(box_size=10, border=4)
-        qr_svg.add_data(payload)
-        qr_svg.make(fit=True)
-        img = qr_svg.make_image(image_factory=SvgPathImage)
+        # Same QR matrix, rendered larger — no need to encode the payload again
+        qr.box_size = 10
+        qr.border = 4
+        img = qr.make_image(image_factory=SvgPathImage)
         img.save(str(svg_path))
 
         print(f"  {svg_path}")
@@ -678,7 +738,7 @@ def cmd_qr(args):
         if _prompt_yn("Open QR code image?"):
             if _is_macos():
                 subprocess.run(["open", str(svg_path)], capture_output=True)
-            elif shutil.which("xdg-open"):
+            elif _which("xdg-open"):
                 subprocess.run(["xdg-open", str(svg_path)], capture_output=True)
             else:
                 _info(f"Open {svg_path} in a browser to scan")
@@ -690,11 +750,9 @@ def cmd_qr(args):
 
 def cmd_config(args):
     """Show current configuration."""
-    config = load_config()
-    port = get_port()
-    host = get_host()
-    working_dir = get_working_dir()
-    token = config["auth_token"]
+    from .tls import TLS_DIR
+
+    host, port, working_dir, token = get_all()
 
     print()
     print(f"  {BOLD}Conn Configuration{NC}")
@@ -710,6 +768,59 @@ def cmd_config(args):
     print()
 
 
+def _tail_lines(f: typing.BinaryIO, n: int) -> list[bytes]:
+    """Return the last n lines of a file, reading backwards from the end.
+
+    Leaves the file positioned at EOF.
+    """
+    pos = f.seek(0, os.SEEK_END)
+    block = max(n * 256, 4096)
+    data = b""
+    # n + 1 newlines guarantee the first of the last n lines is complete
+    while pos > 0 and data.count(b"\n") <= n:
+        step = min(pos, block)
+        pos -= step
+        f.seek(pos)
+        data = f.read(step) + data
+    f.seek(0, os.SEEK_END)
+    return data.splitlines(keepends=True)[-n:]
+
+
+def _follow(f: typing.BinaryIO, out: typing.BinaryIO, interval: float = 0.5):
+    """Copy data appended to f to out until interrupted (like tail -f)."""
+    while True:
+        chunk = f.read()
+        if chunk:
+            out.write(chunk)
+            out.flush()
+            continue
+        if os.fstat(f.fileno()).st_size < f.tell():
+            # Truncated (e.g. log rotation in place) — start over
+            f.seek(0)
+            continue
+        time.sleep(interval)
+
+
+def _follow_journal(journal, n: int):
+    """In-process `journalctl -u conn -f -n <n>` via the systemd Python bindings."""
+    reader = journal.Reader()
+    reader.add_match(_SYSTEMD_UNIT="conn.service")
+    reader.seek_tail()
+    history = []
+    while len(history) < n and (entry := reader.get_previous()):
+        history.append(entry)
+    for entry in reversed(history):
+        print(entry.get("MESSAGE", ""))
+    if len(history) > 1:
+        # Move back to the newest entry already printed; iteration continues after it
+        reader.get_next(len(history) - 1)
+    sys.stdout.flush()
+    while True:
+        for entry in reader:
+            print(entry.get("MESSAGE", ""), flush=True)
+        reader.wait()
+
+
 def cmd_logs(args):
     """Show server logs."""
     log_file = LOG_DIR / "server.err"
@@ -719,18 +830,35 @@ def cmd_logs(args):
     if not log_file.exists():
         if not _is_macos():
             _info("Showing systemd journal...")
-            os.execvp("journalctl", ["journalctl", "-u", "conn", "-f", "--no-pager", "-n", "50"])
+            try:
+                from systemd import journal
+            except ImportError:
+                os.execvp("journalctl", ["journalctl", "-u", "conn", "-f", "--no-pager", "-n", "50"])
+            try:
+                _follow_journal(journal, 50)
+            except KeyboardInterrupt:
+                print()
             return
         _fail(f"No log files found at {LOG_DIR}")
         return
 
-    if args.follow:
-        _info(f"Following {log_file} (Ctrl+C to stop)")
-        os.execvp("tail", ["tail", "-f", str(log_file)])
-    else:
-        _info(f"Last 50 lines from {log_file}")
-        print()
-        os.execvp("tail", ["tail", "-n", "50", str(log_file)])
+    out = sys.stdout.buffer
+    with open(log_file, "rb") as f:
+        if args.follow:
+            _info(f"Following {log_file} (Ctrl+C to stop)")
+            sys.stdout.flush()
+            out.writelines(_tail_lines(f, 10))
+            out.flush()
+            try:
+                _follow(f, out)
+            except KeyboardInterrupt:
+                print()
+        else:
+            _info(f"Last 50 lines from {log_file}")
+            print()
+            sys.stdout.flush()
+            out.writelines(_tail_lines(f, 50))
+            out.flush()
 
 
 def cmd_upgrade(args):
@@ -743,7 +871,7 @@ def cmd_upgrade(args):
     _info(f"Current version: {__version__}")
 
     # Detect install method and upgrade
-    pipx_bin = shutil.which("pipx")
+    pipx_bin = _which("pipx")
     if pipx_bin:
         _info("Upgrading via pipx...")
         result = subprocess.run(
@@ -783,17 +911,9 @@ def cmd_upgrade(args):
     # Restart service if running
     if _is_service_running():
         _info("Restarting service...")
-        if _is_macos():
-            subprocess.run(["launchctl", "unload", str(PLIST_PATH)], capture_output=True)
-            import time
-            time.sleep(1)
-            subprocess.run(["launchctl", "load", str(PLIST_PATH)])
-        else:
-            subprocess.run(["sudo", "systemctl", "restart", "conn"])
+        _restart_service()
 
-        import time
-        time.sleep(2)
-        if _health_check():
+        if _wait_for_health():
             _success("Server restarted with new version")
         else:
             _warn("Server restarted but not responding yet — check: conn-server logs")
@@ -810,59 +930,60 @@ def cmd_version(args):
 
 # ---------- Main ----------
 
-def main():
+def _add_logs_arguments(p: argparse.ArgumentParser):
+    p.add_argument("-f", "--follow", action="store_true", help="Follow logs in real time")
+
+
+# name -> (handler, help text, extra-argument hook). "serve" has no help text:
+# it's internal, used by the launchd/systemd service definitions.
+_COMMANDS = {
+    "start": (cmd_start, "Start the server", None),
+    "serve": (cmd_serve, None, None),
+    "stop": (cmd_stop, "Stop the system service", None),
+    "restart": (cmd_restart, "Restart the system service", None),
+    "status": (cmd_status, "Show server status", None),
+    "setup": (cmd_setup, "Interactive setup / reconfigure", None),
+    "qr": (cmd_qr, "Show the connection QR code", None),
+    "config": (cmd_config, "Show current configuration", None),
+    "logs": (cmd_logs, "Show server logs", _add_logs_arguments),
+    "upgrade": (cmd_upgrade, "Upgrade to latest version and restart", None),
+    "version": (cmd_version, "Show version", None),
+}
+
+
+def _add_command(subparsers, name: str):
+    func, help_text, add_arguments = _COMMANDS[name]
+    kwargs = {"help": help_text} if help_text else {}
+    p = subparsers.add_parser(name, **kwargs)
+    if add_arguments:
+        add_arguments(p)
+    p.set_defaults(func=func)
+
+
+def main(argv: list[str] | None = None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # Answer `conn-server version` before building any parser
+    if argv == ["version"]:
+        cmd_version(None)
+        return
+
     parser = argparse.ArgumentParser(
         prog="conn-server",
         description="Conn Server — remote control server for Claude CLI",
     )
     subparsers = parser.add_subparsers(dest="command")
 
-    # start
-    p_start = subparsers.add_parser("start", help="Start the server")
-    p_start.set_defaults(func=cmd_start)
-
-    # serve (internal — used by launchd/systemd)
-    p_serve = subparsers.add_parser("serve")
-    p_serve.set_defaults(func=cmd_serve)
-
-    # stop
-    p_stop = subparsers.add_parser("stop", help="Stop the system service")
-    p_stop.set_defaults(func=cmd_stop)
-
-    # restart
-    p_restart = subparsers.add_parser("restart", help="Restart the system service")
-    p_restart.set_defaults(func=cmd_restart)
-
-    # status
-    p_status = subparsers.add_parser("status", help="Show server status")
-    p_status.set_defaults(func=cmd_status)
-
-    # setup
-    p_setup = subparsers.add_parser("setup", help="Interactive setup / reconfigure")
-    p_setup.set_defaults(func=cmd_setup)
-
-    # qr
-    p_qr = subparsers.add_parser("qr", help="Show the connection QR code")
-    p_qr.set_defaults(func=cmd_qr)
-
-    # config
-    p_config = subparsers.add_parser("config", help="Show current configuration")
-    p_config.set_defaults(func=cmd_config)
-
-    # logs
-    p_logs = subparsers.add_parser("logs", help="Show server logs")
-    p_logs.add_argument("-f", "--follow", action="store_true", help="Follow logs in real time")
-    p_logs.set_defaults(func=cmd_logs)
-
-    # upgrade
-    p_upgrade = subparsers.add_parser("upgrade", help="Upgrade to latest version and restart")
-    p_upgrade.set_defaults(func=cmd_upgrade)
-
-    # version
-    p_version = subparsers.add_parser("version", help="Show version")
-    p_version.set_defaults(func=cmd_version)
+    # Only one subcommand runs per invocation, so build just its parser.
+    # Bare `conn-server`, --help and unknown commands get the full set.
+    if argv and argv[0] in _COMMANDS:
+        _add_command(subparsers, argv[0])
+    else:
+        for name in _COMMANDS:
+            _add_command(subparsers, name)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if not args.command:
         parser.print_help()
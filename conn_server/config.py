@@ -7,13 +7,20 @@ Configuration priority (highest to lowest):
 """
 from __future__ import annotations
 
+import functools
+import hashlib
+import importlib.util
 import io
 import json
 import os
 import secrets
 import socket
+import sys
+import typing
 from pathlib import Path
 
+from . import _json
+
 CONFIG_DIR = Path.home() / ".conn"
 CONFIG_FILE = CONFIG_DIR / "config.json"
 SESSIONS_FILE = CONFIG_DIR / "sessions.json"
@@ -29,21 +36,36 @@ DEFAULT_PORT = 8443
 DEFAULT_HOST = "0.0.0.0"
 WORKING_DIR = str(Path.home() / "Projects")
 
+# Parsed config.json, populated on first load_config() call. The file only
+# changes through this module (or the CLI setup flow), so writers call
+# invalidate_config_cache() instead of re-reading on every access.
+_CACHED_CONFIG: dict | None = None
+_CACHED_TOKEN_DIGEST: bytes | None = None
+# CONFIG_DIR value for which _ensure_dirs() already created the directory tree
+_DIRS_ENSURED_FOR: Path | None = None
+
 
 def _ensure_dirs():
+    """Create the ~/.conn directory tree (once per process per CONFIG_DIR)."""
+    global _DIRS_ENSURED_FOR
+    if _DIRS_ENSURED_FOR == CONFIG_DIR:
+        return
     CONFIG_DIR.mkdir(mode=0o700, exist_ok=True)
     HISTORY_DIR.mkdir(mode=0o700, exist_ok=True)
     LOG_DIR.mkdir(mode=0o700, exist_ok=True)
     UPLOADS_DIR.mkdir(mode=0o700, exist_ok=True)
     RELEASES_DIR.mkdir(mode=0o700, exist_ok=True)
     PROJECTS_CONFIG_DIR.mkdir(mode=0o700, exist_ok=True)
+    _DIRS_ENSURED_FOR = CONFIG_DIR
 
 
-def _write_private_file(path: Path, content: str):
+def _write_private_file(path: Path, content: str | bytes):
     """Write a file with owner-only permissions (0600)."""
+    if isinstance(content, str):
+        content = content.encode()
     fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
     try:
-        os.write(fd, content.encode())
+        os.write(fd, content)
     finally:
         os.close(fd)
 
@@ -77,7 +99,16 @@ def _get_tailscale_ip() -> str | None:
 
 
 def _get_local_ip() -> str:
-    """Get the machine's local network IP address."""
+    """Get the machine's local network IP address.
+
+    CONN_LOCAL_IP overrides auto-detection (e.g. on multi-homed machines).
+    """
+    return os.environ.get("CONN_LOCAL_IP") or _detect_local_ip()
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_local_ip() -> str:
+    """Detect the local network IP address (cached for the process lifetime)."""
     try:
         # Connect to an external address to determine the local IP
         # (doesn't actually send traffic)
@@ -90,15 +121,29 @@ def _get_local_ip() -> str:
         return "127.0.0.1"
 
 
+def invalidate_config_cache():
+    """Drop the cached config so the next load_config() re-reads the file."""
+    global _CACHED_CONFIG, _CACHED_TOKEN_DIGEST
+    _CACHED_CONFIG = None
+    _CACHED_TOKEN_DIGEST = None
+
+
 def load_config() -> dict:
-    """Load config, generating auth token on first run."""
+    """Load config, generating auth token on first run.
+
+    The result is cached for the life of the process; callers must not
+    mutate the returned dict.
+    """
+    global _CACHED_CONFIG
+    if _CACHED_CONFIG is not None:
+        return _CACHED_CONFIG
+
     _ensure_dirs()
 
     is_first_run = not CONFIG_FILE.exists()
 
     if CONFIG_FILE.exists():
-        with open(CONFIG_FILE) as f:
-            config = json.load(f)
+        config = _json.loads(CONFIG_FILE.read_bytes())
     else:
         config = {
             "auth_token": secrets.token_hex(32),
@@ -106,9 +151,10 @@ def load_config() -> dict:
             "port": DEFAULT_PORT,
             "working_dir": WORKING_DIR,
         }
-        _write_private_file(CONFIG_FILE, json.dumps(config, indent=2))
+        _write_private_file(CONFIG_FILE, _json.dumps_indented(config))
 
     config["_is_first_run"] = is_first_run
+    _CACHED_CONFIG = config
     return config
 
 
@@ -116,19 +162,55 @@ def get_auth_token() -> str:
     return load_config()["auth_token"]
 
 
+def get_auth_token_digest() -> bytes:
+    """Return the SHA-256 digest of the auth token, computed once and cached."""
+    global _CACHED_TOKEN_DIGEST
+    if _CACHED_TOKEN_DIGEST is None:
+        _CACHED_TOKEN_DIGEST = hashlib.sha256(get_auth_token().encode()).digest()
+    return _CACHED_TOKEN_DIGEST
+
+
 def get_host() -> str:
-    return os.environ.get("CONN_HOST") or load_config().get("host", DEFAULT_HOST)
+    return _host_from(load_config())
 
 
 def get_port() -> int:
+    return _port_from(load_config())
+
+
+def get_working_dir() -> str:
+    return _working_dir_from(load_config())
+
+
+def get_event_loop_impl() -> str:
+    """Name of the uvicorn event loop to run on: uvloop when installed.
+
+    uvloop's libuv-backed streams and subprocess transports cut per-event
+    overhead when forwarding claude's stream-json output. It is not
+    available on Windows, where the stock asyncio loop is used.
+    """
+    return "uvloop" if importlib.util.find_spec("uvloop") is not None else "asyncio"
+
+
+def get_all() -> tuple[str, int, str, str]:
+    """Return (host, port, working_dir, auth_token) from a single config load."""
+    config = load_config()
+    return _host_from(config), _port_from(config), _working_dir_from(config), config["auth_token"]
+
+
+def _host_from(config: dict) -> str:
+    return os.environ.get("CONN_HOST") or config.get("host", DEFAULT_HOST)
+
+
+def _port_from(config: dict) -> int:
     env_port = os.environ.get("CONN_PORT")
     if env_port:
         return int(env_port)
-    return load_config().get("port", DEFAULT_PORT)
+    return config.get("port", DEFAULT_PORT)
 
 
-def get_working_dir() -> str:
-    return os.environ.get("CONN_WORKING_DIR") or load_config().get("working_dir", WORKING_DIR)
+def _working_dir_from(config: dict) -> str:
+    return os.environ.get("CONN_WORKING_DIR") or config.get("working_dir", WORKING_DIR)
 
 
 def get_machine_name() -> str:
@@ -176,14 +258,41 @@ def get_local_model_status() -> dict:
 
 def set_local_model_enabled(enabled: bool):
     """Toggle the local_model.enabled flag in config."""
-    config = load_config()
-    config.pop("_is_first_run", None)
-    lm = config.get("local_model", {})
+    config = {k: v for k, v in load_config().items() if k != "_is_first_run"}
+    lm = dict(config.get("local_model", {}))
     lm["enabled"] = enabled
     config["local_model"] = lm
     tmp_path = CONFIG_FILE.with_suffix(".json.tmp")
-    _write_private_file(tmp_path, json.dumps(config, indent=2))
+    _write_private_file(tmp_path, _json.dumps_indented(config))
     tmp_path.rename(CONFIG_FILE)
+    invalidate_config_cache()
+
+
+class _IndentedWriter(io.TextIOBase):
+    """Text stream that forwards each complete line to `out` with a 2-space indent."""
+
+    def __init__(self, out: typing.TextIO):
+        self._out = out
+        self._parts: list[str] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if "\n" not in s:
+            self._parts.append(s)
+            return len(s)
+        *lines, rest = s.split("\n")
+        for line in lines:
+            self._parts.append(line)
+            self._out.write("  " + "".join(self._parts) + "\n")
+            self._parts.clear()
+        if rest:
+            self._parts.append(rest)
+        return len(s)
+
+    def flush(self):
+        self._out.flush()
 
 
 def _print_qr_code(host: str, port: int, token: str, cert_der_b64: str | None = None):
@@ -202,11 +311,8 @@ def _print_qr_code(host: str, port: int, token: str, cert_der_b64: str | None =
     qr.add_data(data)
     qr.make(fit=True)
 
-    # Capture ASCII output and indent it
-    buf = io.StringIO()
-    qr.print_ascii(out=buf, invert=True)
-    for line in buf.getvalue().splitlines():
-        print(f"  {line}")
+    # Stream ASCII output straight to stdout, indented
+    qr.print_ascii(out=_IndentedWriter(sys.stdout), invert=True)
 
     print()
     print("  Scan this QR code with the Conn app to connect.")
@@ -218,10 +324,9 @@ def print_startup_banner():
 
     config = load_config()
     is_first_run = config.get("_is_first_run", False)
-    host = get_host()
-    port = get_port()
+    port = _port_from(config)
     token = config["auth_token"]
-    working_dir = get_working_dir()
+    working_dir = _working_dir_from(config)
     local_ip = _get_local_ip()
     tailscale_ip = _get_tailscale_ip()
     # Prefer Tailscale IP for QR code — works both on LAN and remotely
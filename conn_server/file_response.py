@@ -0,0 +1,166 @@
+"""File responses that let the ASGI server send straight from the fd.
+
+When the server advertises the ``http.response.zerocopysend`` extension,
+the file descriptor is handed over and the server pushes it to the socket
+with sendfile(), skipping the kernel→user→kernel copy of a chunked body.
+Servers without the extension (uvicorn today) get Starlette's normal
+streamed FileResponse.
+
+conditional_file_response() adds single-range requests and ETag /
+Last-Modified revalidation on top, so large downloads can resume and
+unchanged files are not re-sent.
+"""
+from __future__ import annotations
+
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """FileResponse that can send a byte range and use zero-copy send.
+
+    byte_range is an (offset, count) pair; the caller sets the 206 status and
+    Content-Range / Content-Length headers to match.
+    """
+
+    def __init__(self, *args, byte_range: tuple[int, int] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.byte_range = byte_range
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        head = scope["method"].upper() == "HEAD"
+        if self.byte_range is None and (head or not zerocopy):
+            await super().__call__(scope, receive, send)
+            return
+
+        try:
+            f = await anyio.to_thread.run_sync(open, self.path, "rb")
+        except FileNotFoundError:
+            raise RuntimeError(f"File at path {self.path} does not exist.")
+        with f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                raise RuntimeError(f"File at path {self.path} is not a file.")
+            if self.stat_result is None:
+                self.set_stat_headers(st)
+            offset, count = self.byte_range or (0, st.st_size)
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            })
+            if head:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            elif zerocopy:
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": f.fileno(),
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                })
+            else:
+                await anyio.to_thread.run_sync(f.seek, offset)
+                while True:
+                    chunk = await anyio.to_thread.run_sync(f.read, min(self.chunk_size, count))
+                    count -= len(chunk)
+                    more_body = count > 0 and bool(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                    if not more_body:
+                        break
+        if self.background is not None:
+            await self.background()
+
+
+def _etag(st: os.stat_result) -> str:
+    # Strong: size plus nanosecond mtime changes whenever the bytes do, and
+    # If-Range only ever matches a strong validator (RFC 9110 §13.1.5)
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 §13.2.2)
+        # Weak comparison: a W/-prefixed copy of our tag still matches
+        return if_none_match.strip() == "*" or etag in (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single `bytes=` range into (offset, count).
+
+    Returns None when the header is not a single byte range we understand
+    (callers then send the whole file); raises ValueError when it is
+    well-formed but unsatisfiable.
+    """
+    m = _RANGE_RE.fullmatch(header.strip())
+    if m is None:
+        return None
+    start, end = m.groups()
+    if not start:
+        if not end:
+            return None
+        # Suffix range: the last N bytes
+        length = min(int(end), size)
+        if length == 0:
+            raise ValueError(header)
+        return size - length, length
+    first = int(start)
+    last = min(int(end), size - 1) if end else size - 1
+    if first >= size or last < first:
+        raise ValueError(header)
+    return first, last - first + 1
+
+
+def conditional_file_response(path: Path, request: Request, **kwargs) -> Response:
+    """Serve `path` honouring Range, If-Range, If-None-Match and If-Modified-Since.
+
+    Extra keyword arguments (media_type, filename, ...) go to ZeroCopyFileResponse.
+    """
+    st = path.stat()
+    etag = _etag(st)
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": formatdate(st.st_mtime, usegmt=True),
+    }
+
+    if _not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() in (etag, headers["last-modified"])):
+        try:
+            byte_range = _parse_range(range_header, st.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={"content-range": f"bytes */{st.st_size}"})
+        if byte_range is not None:
+            offset, count = byte_range
+            headers["content-range"] = f"bytes {offset}-{offset + count - 1}/{st.st_size}"
+            headers["content-length"] = str(count)
+            return ZeroCopyFileResponse(
+                path, status_code=206, headers=headers, stat_result=st, byte_range=byte_range, **kwargs,
+            )
+
+    return ZeroCopyFileResponse(path, headers=headers, stat_result=st, **kwargs)
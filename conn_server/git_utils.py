@@ -3,15 +3,38 @@ from __future__ import annotations
 
 import logging
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from .config import WORKTREES_DIR
 
 logger = logging.getLogger(__name__)
 
+# Optional: pygit2 (libgit2 bindings) answers the read-only queries in-process
+# instead of forking git. Worktree add/remove always shell out to git.
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+
+def _open_repo(path: str):
+    """Open the repository containing path with pygit2, or None if there isn't one."""
+    git_dir = pygit2.discover_repository(path)
+    return pygit2.Repository(git_dir) if git_dir else None
+
 
 def get_current_branch(repo_path: str) -> str | None:
     """Return the current git branch name for a directory, or None if not a git repo."""
+    if pygit2 is not None:
+        try:
+            repo = _open_repo(repo_path)
+            if repo is None or repo.is_bare or repo.head_is_unborn:
+                return None
+            # Match `git rev-parse --abbrev-ref HEAD`, which prints HEAD when detached
+            return "HEAD" if repo.head_is_detached else repo.head.shorthand
+        except (pygit2.GitError, KeyError, OSError):
+            return None
     try:
         result = subprocess.run(
             ["git", "rev-parse", "--abbrev-ref", "HEAD"],
@@ -29,6 +52,12 @@ def get_current_branch(repo_path: str) -> str | None:
 
 def is_git_repo(path: str) -> bool:
     """Check if a directory is inside a git repository."""
+    if pygit2 is not None:
+        try:
+            repo = _open_repo(path)
+            return repo is not None and not repo.is_bare
+        except (pygit2.GitError, KeyError, OSError):
+            return False
     try:
         result = subprocess.run(
             ["git", "rev-parse", "--is-inside-work-tree"],
@@ -45,19 +74,16 @@ def is_git_repo(path: str) -> bool:
 def create_worktree(repo_path: str, conversation_id: str, base_branch: str | None = None) -> str | None:
     """Create a git worktree for a conversation.
 
-    Creates branch 'conn/{conversation_id}' from the current branch.
+    Creates branch 'conn/{conversation_id}' from base_branch (default: HEAD).
     Returns the worktree path on success, None on failure.
     """
     WORKTREES_DIR.mkdir(parents=True, exist_ok=True)
     worktree_path = WORKTREES_DIR / conversation_id
     branch_name = f"conn/{conversation_id}"
 
-    if base_branch is None:
-        base_branch = get_current_branch(repo_path) or "HEAD"
-
     try:
         result = subprocess.run(
-            ["git", "worktree", "add", "-b", branch_name, str(worktree_path), base_branch],
+            ["git", "worktree", "add", "-b", branch_name, str(worktree_path), base_branch or "HEAD"],
             cwd=repo_path,
             capture_output=True,
             text=True,
@@ -76,32 +102,56 @@ def create_worktree(repo_path: str, conversation_id: str, base_branch: str | Non
 
 def remove_worktree(repo_path: str, conversation_id: str) -> bool:
     """Remove a worktree and its branch. Returns True on success."""
+    success = _remove_worktree_dir(repo_path, conversation_id)
+    _delete_branches(repo_path, [f"conn/{conversation_id}"])
+    return success
+
+
+def remove_worktrees(repo_path: str, conversation_ids: list[str]) -> dict[str, bool]:
+    """Remove several worktrees of one repo and their branches.
+
+    The worktree directories are independent, so they're removed concurrently;
+    the branches are then deleted with a single `git branch -D` (a branch can't
+    be deleted while a worktree still has it checked out).
+    Returns {conversation_id: success}.
+    """
+    if not conversation_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(4, len(conversation_ids))) as pool:
+        results = dict(zip(
+            conversation_ids,
+            pool.map(lambda cid: _remove_worktree_dir(repo_path, cid), conversation_ids),
+        ))
+    _delete_branches(repo_path, [f"conn/{cid}" for cid in conversation_ids])
+    return results
+
+
+def _remove_worktree_dir(repo_path: str, conversation_id: str) -> bool:
     worktree_path = WORKTREES_DIR / conversation_id
-    branch_name = f"conn/{conversation_id}"
+    if not worktree_path.exists():
+        return True
+    try:
+        result = subprocess.run(
+            ["git", "worktree", "remove", str(worktree_path), "--force"],
+            cwd=repo_path,
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        if result.returncode != 0:
+            logger.error(f"Failed to remove worktree: {result.stderr}")
+            return False
+        return True
+    except (subprocess.TimeoutExpired, FileNotFoundError, OSError) as e:
+        logger.error(f"Worktree removal error: {e}")
+        return False
 
-    success = True
 
-    # Remove worktree
-    if worktree_path.exists():
-        try:
-            result = subprocess.run(
-                ["git", "worktree", "remove", str(worktree_path), "--force"],
-                cwd=repo_path,
-                capture_output=True,
-                text=True,
-                timeout=30,
-            )
-            if result.returncode != 0:
-                logger.error(f"Failed to remove worktree: {result.stderr}")
-                success = False
-        except (subprocess.TimeoutExpired, FileNotFoundError, OSError) as e:
-            logger.error(f"Worktree removal error: {e}")
-            success = False
-
-    # Delete the branch
+def _delete_branches(repo_path: str, branch_names: list[str]):
+    """Best-effort `git branch -D`; git keeps going past branches that are already gone."""
     try:
         subprocess.run(
-            ["git", "branch", "-D", branch_name],
+            ["git", "branch", "-D", *branch_names],
             cwd=repo_path,
             capture_output=True,
             text=True,
@@ -109,5 +159,3 @@ def remove_worktree(repo_path: str, conversation_id: str) -> bool:
         )
     except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
         pass  # Branch may already be gone
-
-    return success
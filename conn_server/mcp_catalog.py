@@ -5,11 +5,14 @@ credentials. The app shows these as one-tap install options.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterator
 
+from . import _json
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class CredentialField:
     key: str            # Where the value goes (env var name or header name)
     label: str          # Human-readable label shown in the app
@@ -19,7 +22,7 @@ class CredentialField:
     value_prefix: str = ""  # Prepended to user input (e.g. "Bearer ")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CatalogEntry:
     id: str
     display_name: str
@@ -234,11 +237,65 @@ CATALOG: list[CatalogEntry] = [
 ]
 
 
+def _credential_to_dict(c: CredentialField) -> dict:
+    return {
+        "key": c.key,
+        "label": c.label,
+        "placement": c.placement,
+        "help_text": c.help_text,
+        "help_url": c.help_url,
+        "value_prefix": c.value_prefix,
+    }
+
+
+def _entry_to_dict(e: CatalogEntry) -> dict:
+    """Serialize a CatalogEntry — same output as dataclasses.asdict, without the reflection."""
+    return {
+        "id": e.id,
+        "display_name": e.display_name,
+        "description": e.description,
+        "transport": e.transport,
+        "command": e.command,
+        "args": list(e.args) if e.args is not None else None,
+        "url": e.url,
+        "credentials": [_credential_to_dict(c) for c in e.credentials],
+        "default_env": dict(e.default_env) if e.default_env is not None else None,
+        "setup_note": e.setup_note,
+        "doc_url": e.doc_url,
+    }
+
+
+# CATALOG never changes at runtime, so serialize it once. Per-request work is
+# just a shallow copy of each dict plus the `installed` flag.
+_CATALOG_SERIALIZED: list[dict] = [_entry_to_dict(entry) for entry in CATALOG]
+
+
+# Each entry also pre-rendered as JSON, once per value of the `installed`
+# flag, so the HTTP endpoint only picks and joins bytes.
+_CATALOG_JSON: list[tuple[str, bytes, bytes]] = [
+    (d["id"], _json.dumps({**d, "installed": False}), _json.dumps({**d, "installed": True}))
+    for d in _CATALOG_SERIALIZED
+]
+
+
+def get_catalog_json(installed_names: set[str]) -> bytes:
+    """get_catalog() as a JSON array, assembled from pre-serialized entries."""
+    return b"[" + b",".join(
+        installed if cid in installed_names else not_installed
+        for cid, not_installed, installed in _CATALOG_JSON
+    ) + b"]"
+
+
+def iter_catalog(installed_names: set[str]) -> Iterator[dict]:
+    """Yield catalog entries with an `installed` flag.
+
+    Nested values (args, credentials, ...) are shared with the module-level
+    cache — callers must not mutate them.
+    """
+    for d in _CATALOG_SERIALIZED:
+        yield {**d, "installed": d["id"] in installed_names}
+
+
 def get_catalog(installed_names: set[str]) -> list[dict]:
-    """Return catalog entries with an `installed` flag."""
-    result = []
-    for entry in CATALOG:
-        d = asdict(entry)
-        d["installed"] = entry.id in installed_names
-        result.append(d)
-    return result
+    """Return catalog entries with an `installed` flag (see iter_catalog)."""
+    return list(iter_catalog(installed_names))
@@ -2,12 +2,18 @@
 from __future__ import annotations
 
 import asyncio
+import enum
+import functools
+import itertools
+import json
 import logging
 import os
 import socket
 import sys
+import zlib
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +22,99 @@ PREVIEW_PORT_MIN = 8100
 PREVIEW_PORT_MAX = 8199
 
 
+def _dir_entries(working_dir: str) -> set[str]:
+    """Names in a directory, read with one listdir instead of a stat per candidate file."""
+    try:
+        return set(os.listdir(working_dir))
+    except OSError:
+        return set()
+
+
+def _package_scripts(package_json: Path) -> tuple[bool, bool]:
+    """Return (has_dev, has_start) for a package.json; (False, False) if missing or invalid."""
+    try:
+        mtime_ns = package_json.stat().st_mtime_ns
+    except OSError:
+        return False, False
+    return _parse_package_scripts(str(package_json), mtime_ns)
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_package_scripts(path: str, mtime_ns: int) -> tuple[bool, bool]:
+    # mtime_ns is only part of the cache key: an edited file gets a fresh entry
+    try:
+        scripts = json.loads(Path(path).read_text()).get("scripts", {})
+    except (json.JSONDecodeError, KeyError):
+        return False, False
+    return "dev" in scripts, "start" in scripts
+
+
+def _ports_in_use() -> set[int]:
+    """Local TCP ports with a socket in the kernel tables (Linux; empty set elsewhere)."""
+    ports = set()
+    for path in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(path) as f:
+                next(f, None)  # header
+                for line in f:
+                    # "  0: 0100007F:1F90 00000000:0000 0A ..." — local_address is field 1
+                    ports.add(int(line.split(None, 2)[1].rpartition(":")[2], 16))
+        except OSError:
+            continue
+    return ports
+
+
+class ProjectKind(enum.Enum):
+    NODE_DEV = "node_dev"        # package.json with a "dev" script
+    NODE_START = "node_start"    # package.json with a "start" script
+    DJANGO = "django"
+    FLASK = "flask"
+    STATIC_DIST = "static_dist"  # dist/index.html
+    STATIC_ROOT = "static_root"  # index.html
+
+
+def detect_project_kind(wd: Path) -> ProjectKind | None:
+    """Classify a project directory for previewing, or None if it isn't previewable."""
+    entries = _dir_entries(str(wd))
+
+    # Node.js with dev or start script
+    if "package.json" in entries:
+        has_dev, has_start = _package_scripts(wd / "package.json")
+        if has_dev:
+            return ProjectKind.NODE_DEV
+        if has_start:
+            return ProjectKind.NODE_START
+
+    if "manage.py" in entries:
+        return ProjectKind.DJANGO
+    if "app.py" in entries:
+        return ProjectKind.FLASK
+    if "dist" in entries and (wd / "dist" / "index.html").exists():
+        return ProjectKind.STATIC_DIST
+    if "index.html" in entries:
+        return ProjectKind.STATIC_ROOT
+    return None
+
+
+# argv template per project kind, filled in with str.format. Only these
+# literals are ever parsed as format strings; paths arrive as values.
+_COMMAND_TEMPLATES: dict[ProjectKind, tuple[str, ...]] = {
+    ProjectKind.NODE_DEV: ("npm", "run", "dev", "--", "--host", "0.0.0.0", "--port", "{port}"),
+    ProjectKind.NODE_START: ("npm", "start"),
+    ProjectKind.DJANGO: ("{python}", "manage.py", "runserver", "0.0.0.0:{port}"),
+    ProjectKind.FLASK: ("{python}", "-m", "flask", "run", "--host", "0.0.0.0", "--port", "{port}"),
+    ProjectKind.STATIC_DIST: ("{python}", "-m", "http.server", "{port}", "--directory", "{dir}", "--bind", "0.0.0.0"),
+    ProjectKind.STATIC_ROOT: ("{python}", "-m", "http.server", "{port}", "--directory", "{dir}", "--bind", "0.0.0.0"),
+}
+
+
+def command_for(kind: ProjectKind, wd: Path, port: int) -> list[str]:
+    """Dev server command for a project of the given kind, listening on port."""
+    directory = wd / "dist" if kind is ProjectKind.STATIC_DIST else wd
+    values = {"python": sys.executable, "port": port, "dir": directory}
+    return [arg.format_map(values) for arg in _COMMAND_TEMPLATES[kind]]
+
+
 @dataclass
 class PreviewInfo:
     port: int
@@ -25,42 +124,25 @@ class PreviewInfo:
     conversation_id: str | None = None
 
 
+@dataclass(slots=True)
+class _Entry:
+    info: PreviewInfo
+    process: asyncio.subprocess.Process
+
+
 class PreviewManager:
     def __init__(self):
         # Primary key: working_dir (one preview per project directory)
-        self._previews: dict[str, PreviewInfo] = {}
-        self._processes: dict[str, asyncio.subprocess.Process] = {}
+        self._entries: dict[str, _Entry] = {}
+        # Ports held by our previews, kept in step with _entries
+        self._used_ports: set[int] = set()
+        # working_dir -> preferred port; bounded by the number of projects seen
+        self._preferred_port_cache: dict[str, int] = {}
 
     @staticmethod
     def can_preview(working_dir: str) -> bool:
         """Check if a directory contains a previewable web project."""
-        wd = Path(working_dir)
-
-        # Node.js with dev or start script
-        package_json = wd / "package.json"
-        if package_json.exists():
-            import json
-            try:
-                pkg = json.loads(package_json.read_text())
-                scripts = pkg.get("scripts", {})
-                if "dev" in scripts or "start" in scripts:
-                    return True
-            except (json.JSONDecodeError, KeyError):
-                pass
-
-        # Django
-        if (wd / "manage.py").exists():
-            return True
-
-        # Flask
-        if (wd / "app.py").exists():
-            return True
-
-        # Static HTML
-        if (wd / "dist" / "index.html").exists() or (wd / "index.html").exists():
-            return True
-
-        return False
+        return detect_project_kind(Path(working_dir)) is not None
 
     def _find_free_port(self, working_dir: str | None = None) -> int:
         """Find an available port in the preview range.
@@ -69,30 +151,30 @@ class PreviewManager:
         hash so the same project always lands on the same port (avoids browser
         cache crossover when different projects reuse ports).
         """
-        port_range = PREVIEW_PORT_MAX - PREVIEW_PORT_MIN + 1
-        used = {p.port for p in self._previews.values()}
-
+        ports = range(PREVIEW_PORT_MIN, PREVIEW_PORT_MAX + 1)
+        start = 0
         if working_dir:
-            preferred = PREVIEW_PORT_MIN + (hash(working_dir) % port_range)
-            # Try the preferred port first, then scan from there
-            for offset in range(port_range):
-                port = PREVIEW_PORT_MIN + (preferred - PREVIEW_PORT_MIN + offset) % port_range
-                if port in used:
-                    continue
-                try:
-                    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                        s.bind(("", port))
-                        return port
-                except OSError:
-                    continue
-        else:
-            for port in range(PREVIEW_PORT_MIN, PREVIEW_PORT_MAX + 1):
-                if port in used:
+            preferred = self._preferred_port_cache.get(working_dir)
+            if preferred is None:
+                # crc32, not hash(): str hashes are salted per process, which
+                # would move the preferred port on every server restart
+                preferred = PREVIEW_PORT_MIN + zlib.crc32(working_dir.encode()) % len(ports)
+                self._preferred_port_cache[working_dir] = preferred
+            start = preferred - PREVIEW_PORT_MIN
+
+        # Try the preferred port first, then scan from there. Ports our own
+        # previews hold, or that the kernel lists as in use, are skipped
+        # without a bind; the rest are confirmed with a test bind (a socket
+        # can be bound without showing up in /proc/net/tcp). A failed bind
+        # leaves the socket unbound, so one probe socket serves every attempt.
+        taken = self._used_ports | _ports_in_use()
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            for port in itertools.chain(ports[start:], ports[:start]):
+                if port in taken:
                     continue
                 try:
-                    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                        s.bind(("", port))
-                        return port
+                    s.bind(("", port))
+                    return port
                 except OSError:
                     continue
         raise RuntimeError("No free ports available in preview range")
@@ -100,57 +182,32 @@ class PreviewManager:
     def _detect_command(self, working_dir: str, port: int) -> list[str]:
         """Auto-detect the right dev server command for the project."""
         wd = Path(working_dir)
-
-        # Node.js projects
-        package_json = wd / "package.json"
-        if package_json.exists():
-            import json
-            try:
-                pkg = json.loads(package_json.read_text())
-                scripts = pkg.get("scripts", {})
-                if "dev" in scripts:
-                    return ["npm", "run", "dev", "--", "--host", "0.0.0.0", "--port", str(port)]
-                if "start" in scripts:
-                    return ["npm", "start"]
-            except (json.JSONDecodeError, KeyError):
-                pass
-
-        python = sys.executable
-
-        # Python projects
-        manage_py = wd / "manage.py"
-        if manage_py.exists():
-            return [python, "manage.py", "runserver", f"0.0.0.0:{port}"]
-
-        # Flask
-        app_py = wd / "app.py"
-        if app_py.exists():
-            return [python, "-m", "flask", "run", "--host", "0.0.0.0", "--port", str(port)]
-
-        # Static files
-        index_html = wd / "index.html"
-        dist_index = wd / "dist" / "index.html"
-        if dist_index.exists():
-            return [python, "-m", "http.server", str(port), "--directory", str(wd / "dist"), "--bind", "0.0.0.0"]
-        if index_html.exists():
-            return [python, "-m", "http.server", str(port), "--directory", str(wd), "--bind", "0.0.0.0"]
-
-        raise RuntimeError(f"Could not detect project type in {working_dir}")
+        kind = detect_project_kind(wd)
+        if kind is None:
+            raise RuntimeError(f"Could not detect project type in {working_dir}")
+        return command_for(kind, wd, port)
 
     async def _wait_for_port(self, port: int, timeout: float = 15.0) -> bool:
-        """Poll until the port is accepting connections."""
-        deadline = asyncio.get_event_loop().time() + timeout
-        while asyncio.get_event_loop().time() < deadline:
-            try:
-                _, writer = await asyncio.wait_for(
-                    asyncio.open_connection("127.0.0.1", port),
-                    timeout=1.0,
-                )
-                writer.close()
-                await writer.wait_closed()
-                return True
-            except (OSError, asyncio.TimeoutError):
-                await asyncio.sleep(0.5)
+        """Poll until the port is accepting connections.
+
+        Backs off from 10ms to 500ms between attempts, so fast dev servers
+        are picked up almost immediately.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = 0.01
+        while loop.time() < deadline:
+            # Bare non-blocking socket rather than open_connection: no stream
+            # reader/writer/protocol objects just to learn whether it accepts
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.setblocking(False)
+                try:
+                    await asyncio.wait_for(loop.sock_connect(s, ("127.0.0.1", port)), timeout=1.0)
+                    return True
+                except (OSError, asyncio.TimeoutError):
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.7, 0.5)
         return False
 
     async def start(
@@ -199,16 +256,15 @@ class PreviewManager:
             command=cmd_str,
             conversation_id=conversation_id,
         )
-        self._previews[working_dir] = info
-        self._processes[working_dir] = process
+        self._entries[working_dir] = _Entry(info, process)
+        self._used_ports.add(port)
 
         # Wait for the server to become ready
         ready = await self._wait_for_port(port)
         if not ready:
             # Check if the process died
             if process.returncode is not None:
-                self._previews.pop(working_dir, None)
-                self._processes.pop(working_dir, None)
+                self._forget(working_dir)
                 raise RuntimeError(f"Preview server exited immediately (code {process.returncode})")
             logger.warning(f"Preview on port {port} not yet responding, but process is running")
 
@@ -217,9 +273,7 @@ class PreviewManager:
 
     async def stop(self, working_dir: str) -> bool:
         """Stop the preview server for a project directory."""
-        process = self._processes.pop(working_dir, None)
-        self._previews.pop(working_dir, None)
-
+        process = self._forget(working_dir)
         if process is None:
             return False
 
@@ -238,6 +292,14 @@ class PreviewManager:
 
         return True
 
+    def _forget(self, working_dir: str) -> asyncio.subprocess.Process | None:
+        """Drop all bookkeeping for a preview. Returns its process, if any."""
+        entry = self._entries.pop(working_dir, None)
+        if entry is None:
+            return None
+        self._used_ports.discard(entry.info.port)
+        return entry.process
+
     async def restart(
         self,
         working_dir: str,
@@ -249,49 +311,49 @@ class PreviewManager:
 
     async def stop_for_conversation(self, conversation_id: str) -> str | None:
         """Stop the preview associated with a conversation. Returns working_dir if stopped."""
-        for wd, info in list(self._previews.items()):
-            if info.conversation_id == conversation_id:
+        for wd, entry in list(self._entries.items()):
+            if entry.info.conversation_id == conversation_id:
                 await self.stop(wd)
                 return wd
         return None
 
     async def stop_all(self):
         """Stop all preview servers."""
-        for wd in list(self._previews.keys()):
+        for wd in list(self._entries):
             await self.stop(wd)
 
     def get_preview(self, working_dir: str) -> PreviewInfo | None:
         """Get active preview info for a project directory."""
-        info = self._previews.get(working_dir)
-        if info is None:
+        entry = self._entries.get(working_dir)
+        if entry is None:
             return None
         # Check if process is still alive
-        process = self._processes.get(working_dir)
-        if process and process.returncode is not None:
+        if entry.process.returncode is not None:
             # Process died — clean up
-            self._previews.pop(working_dir, None)
-            self._processes.pop(working_dir, None)
+            self._forget(working_dir)
             return None
-        return info
+        return entry.info
 
     def get_preview_for_conversation(self, conversation_id: str) -> PreviewInfo | None:
         """Get active preview for the directory associated with a conversation."""
-        for wd, info in self._previews.items():
-            if info.conversation_id == conversation_id:
+        for wd, entry in self._entries.items():
+            if entry.info.conversation_id == conversation_id:
                 return self.get_preview(wd)
         return None
 
-    def list_previews(self) -> list[dict]:
-        """List all active previews."""
-        result = []
-        for wd in list(self._previews.keys()):
+    def iter_previews(self) -> Iterator[dict]:
+        """Yield each active preview as a dict, reaping dead ones on the way."""
+        for wd in list(self._entries):
             info = self.get_preview(wd)
             if info:
-                result.append({
+                yield {
                     "port": info.port,
                     "pid": info.pid,
                     "working_dir": info.working_dir,
                     "command": info.command,
                     "conversation_id": info.conversation_id,
-                })
-        return result
+                }
+
+    def list_previews(self) -> list[dict]:
+        """List all active previews."""
+        return list(self.iter_previews())
@@ -1,9 +1,10 @@
 """Per-project configuration (custom instructions) stored in ~/.conn/projects/."""
 from __future__ import annotations
 
-import json
+import functools
 from pathlib import Path
 
+from . import _json
 from .config import PROJECTS_CONFIG_DIR
 
 
@@ -14,12 +15,22 @@ def _config_file(project_path: str) -> Path:
 
 
 def get_project_config(project_path: str) -> dict:
-    """Read config for a project. Returns dict with path and custom_instructions."""
+    """Read config for a project. Returns dict with path and custom_instructions.
+
+    Parsed files are cached by (mtime, size); callers must not mutate the result.
+    """
     cfg = _config_file(project_path)
-    if cfg.exists():
-        with open(cfg) as f:
-            return json.load(f)
-    return {"path": project_path, "custom_instructions": ""}
+    try:
+        st = cfg.stat()
+    except FileNotFoundError:
+        return {"path": project_path, "custom_instructions": ""}
+    return _read_config_cached(str(cfg), st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=128)
+def _read_config_cached(path: str, mtime_ns: int, size: int) -> dict:
+    # mtime_ns and size only key the cache, so edits made outside the server are seen
+    return _json.loads(Path(path).read_bytes())
 
 
 def get_custom_instructions(project_path: str) -> str | None:
@@ -34,5 +45,7 @@ def set_custom_instructions(project_path: str, instructions: str):
     PROJECTS_CONFIG_DIR.mkdir(exist_ok=True)
     cfg = _config_file(project_path)
     data = {"path": project_path, "custom_instructions": instructions}
-    with open(cfg, "w") as f:
-        json.dump(data, f, indent=2)
+    cfg.write_bytes(_json.dumps_indented(data))
+    # A rewrite within the filesystem's timestamp granularity can keep the
+    # same mtime, so don't rely on the cache key alone for our own writes
+    _read_config_cached.cache_clear()
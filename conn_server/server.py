@@ -2,9 +2,11 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
 import logging
 import os
+import re
 import shutil
 import signal
 import subprocess
@@ -12,40 +14,54 @@ import sys
 import time
 import typing
 import uuid
+import weakref
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Header, HTTPException, UploadFile, File, Query
-from fastapi.responses import FileResponse
+from fastapi import Depends, FastAPI, WebSocket, WebSocketDisconnect, Header, HTTPException, UploadFile, File, Query, Request
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from starlette.websockets import WebSocketState
 
+from . import _json
 from .auth import verify_token
-from .config import load_config, get_working_dir, get_host, get_port, print_startup_banner, UPLOADS_DIR, LOG_DIR, WORKTREES_DIR, RELEASES_DIR
-from .git_utils import get_current_branch, is_git_repo, create_worktree, remove_worktree
+from .config import load_config, get_working_dir, get_host, get_port, get_event_loop_impl, print_startup_banner, UPLOADS_DIR, LOG_DIR, WORKTREES_DIR, RELEASES_DIR
+from .file_response import ZeroCopyFileResponse, conditional_file_response
+from .git_utils import get_current_branch, is_git_repo, create_worktree, remove_worktree, remove_worktrees
 from .agent_manager import AgentManager
-from .mcp_catalog import get_catalog
+from .mcp_catalog import get_catalog_json
 from .mcp_config import McpConfigManager
 from .preview_manager import PreviewManager
 from .project_config import get_project_config, get_custom_instructions, set_custom_instructions
-from .session_manager import SessionManager
+from .session_manager import Conversation, SessionManager
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
 # Global state
 active_processes: dict[str, asyncio.subprocess.Process] = {}
-conversation_locks: dict[str, asyncio.Lock] = {}
+# Weak values: a lock lives only while a message handler holds it (or waits
+# on it), so idle and deleted conversations don't accumulate entries.
+conversation_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
 start_time: float = 0
 sessions = SessionManager()
 previews = PreviewManager()
 mcp_servers = McpConfigManager()
 agents = AgentManager()
 
-# Track connected WebSocket clients for broadcasting events
-connected_clients: list[WebSocket] = []
+# Track connected WebSocket clients for broadcasting events. An insertion-
+# ordered dict used as a set: O(1) removal on disconnect, and the last key is
+# the most recently connected client.
+connected_clients: dict[WebSocket, None] = {}
 # Server name provided by each client during auth (e.g. "MacBook Pro")
 client_server_names: dict[int, str] = {}  # id(websocket) -> server_name
+# Broadcast events waiting to go out to each client, drained by a sender task
+# in ws_chat so one slow socket can't hold up delivery to the others.
+client_outboxes: dict[int, asyncio.Queue] = {}  # id(websocket) -> queue of JSON payloads
+CLIENT_OUTBOX_SIZE = 256
+# Fire-and-forget tasks; the event loop only holds weak references to tasks,
+# so without this an unawaited handler can be garbage-collected mid-flight
+background_tasks: set[asyncio.Task] = set()
 # Client app version — persisted to disk so it survives server restarts
 _CLIENT_VERSION_FILE = Path.home() / ".conn" / "client_version.json"
 
@@ -75,9 +91,10 @@ except ImportError:
 
 def _get_conversation_lock(conversation_id: str) -> asyncio.Lock:
     """Get or create a per-conversation lock."""
-    if conversation_id not in conversation_locks:
-        conversation_locks[conversation_id] = asyncio.Lock()
-    return conversation_locks[conversation_id]
+    lock = conversation_locks.get(conversation_id)
+    if lock is None:
+        lock = conversation_locks[conversation_id] = asyncio.Lock()
+    return lock
 
 
 @asynccontextmanager
@@ -86,11 +103,28 @@ async def lifespan(app: FastAPI):
     start_time = time.time()
     print_startup_banner()
     yield
-    logger.info("Server shutting down — stopping preview servers")
+    logger.info("Server shutting down — stopping preview servers and claude processes")
     await previews.stop_all()
+    # Not in our process group, so they won't see the signal that stopped us
+    await _cancel_all_processes()
+
+
+def _spawn(coro: typing.Coroutine) -> asyncio.Task:
+    """Run a coroutine in the background, keeping its task alive until done."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+class _JSONResponse(JSONResponse):
+    """JSONResponse rendered through _json (orjson when installed)."""
 
+    def render(self, content: typing.Any) -> bytes:
+        return _json.dumps(content)
 
-app = FastAPI(lifespan=lifespan)
+
+app = FastAPI(lifespan=lifespan, default_response_class=_JSONResponse)
 
 if _printer_available:
     app.include_router(printer_router)
@@ -98,6 +132,32 @@ if _printer_available:
 
 # ---------- REST endpoints ----------
 
+
+def _verify_rest_auth(authorization: str | None):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+    token = authorization.removeprefix("Bearer ")
+    if not verify_token(token):
+        raise HTTPException(status_code=403, detail="Invalid token")
+
+
+def require_auth(authorization: str = Header(None)):
+    """Dependency: require a valid `Authorization: Bearer` header."""
+    _verify_rest_auth(authorization)
+
+
+def require_auth_or_token(token: str = Query(None), authorization: str = Header(None)):
+    """Dependency: accept a ?token= query parameter in place of the header.
+
+    For clients that can't set headers (image loaders, Android DownloadManager).
+    """
+    if token:
+        if not verify_token(token):
+            raise HTTPException(status_code=403, detail="Invalid token")
+    else:
+        _verify_rest_auth(authorization)
+
+
 @app.get("/health")
 async def health():
     return {
@@ -106,55 +166,77 @@ async def health():
     }
 
 
-@app.get("/client/version")
-async def get_client_version(authorization: str = Header(None)):
+@app.get("/client/version", dependencies=[Depends(require_auth)])
+async def get_client_version():
     """Return the app version reported by the most recently connected client."""
-    _verify_rest_auth(authorization)
     if not client_app_version:
         raise HTTPException(status_code=404, detail="No client has connected yet")
     return client_app_version
 
 
-@app.get("/conversations")
-async def list_conversations(authorization: str = Header(None)):
-    _verify_rest_auth(authorization)
+# working_dir -> ((mtime_ns, inode) of .git/HEAD, branch). HEAD is rewritten
+# (via rename) on every checkout, so a matching signature means the branch
+# can't have changed.
+_branch_cache: dict[str, tuple[tuple[int, int], str | None]] = {}
+
+
+async def _branch_for(working_dir: str) -> str | None:
+    """get_current_branch() off the event loop, cached until .git/HEAD changes."""
+    try:
+        st = os.stat(os.path.join(working_dir, ".git", "HEAD"))
+    except OSError:
+        # Not a repo root (subdirectory, linked worktree, or no repo) — no cheap key
+        return await asyncio.to_thread(get_current_branch, working_dir)
+    signature = (st.st_mtime_ns, st.st_ino)
+    cached = _branch_cache.get(working_dir)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    branch = await asyncio.to_thread(get_current_branch, working_dir)
+    _branch_cache[working_dir] = (signature, branch)
+    return branch
+
+
+async def _branches_for(working_dirs: typing.Iterable[str]) -> dict[str, str | None]:
+    """Look up the branch of each distinct directory concurrently."""
+    unique = list(dict.fromkeys(working_dirs))
+    return dict(zip(unique, await asyncio.gather(*map(_branch_for, unique))))
+
+
+@app.get("/conversations", dependencies=[Depends(require_auth)])
+async def list_conversations():
     convs = sessions.list_conversations()
-    # Compute git branch per unique working_dir (cached within request)
-    branch_cache: dict[str, str | None] = {}
+    branches = await _branches_for(conv["working_dir"] for conv in convs if conv.get("working_dir"))
     for conv in convs:
         wd = conv.get("working_dir")
-        if wd:
-            if wd not in branch_cache:
-                branch_cache[wd] = get_current_branch(wd)
-            conv["git_branch"] = branch_cache[wd]
-        else:
-            conv["git_branch"] = None
+        conv["git_branch"] = branches[wd] if wd else None
     return {"conversations": convs}
 
 
-@app.delete("/conversations/{conversation_id}")
-async def delete_conversation(conversation_id: str, authorization: str = Header(None)):
-    _verify_rest_auth(authorization)
-    # Clean up worktree before deleting conversation data
+@app.delete("/conversations/{conversation_id}", dependencies=[Depends(require_auth)])
+async def delete_conversation(conversation_id: str):
     conv = sessions.get_conversation(conversation_id)
-    if conv and conv.git_worktree_path and conv.original_working_dir:
-        remove_worktree(conv.original_working_dir, conversation_id)
-        logger.info(f"Cleaned up worktree for conversation {conversation_id}")
-    # Stop any preview server associated with this conversation
-    await previews.stop_for_conversation(conversation_id)
+
+    async def cleanup_worktree():
+        if conv and conv.git_worktree_path and conv.original_working_dir:
+            await asyncio.to_thread(remove_worktree, conv.original_working_dir, conversation_id)
+            logger.info(f"Cleaned up worktree for conversation {conversation_id}")
+
+    # Clean up the worktree and any preview server before deleting conversation
+    # data; the git work runs in a thread so the loop keeps serving meanwhile.
+    await asyncio.gather(cleanup_worktree(), previews.stop_for_conversation(conversation_id))
     if sessions.delete_conversation(conversation_id):
+        conversation_locks.pop(conversation_id, None)
         # Clean up uploaded images for this conversation
         conv_uploads = UPLOADS_DIR / conversation_id
         if conv_uploads.exists():
-            shutil.rmtree(conv_uploads)
+            await asyncio.to_thread(shutil.rmtree, conv_uploads)
             logger.info(f"Cleaned up uploads for conversation {conversation_id}")
         return {"deleted": conversation_id}
     raise HTTPException(status_code=404, detail="Conversation not found")
 
 
-@app.get("/conversations/{conversation_id}/history")
-async def get_conversation_history(conversation_id: str, authorization: str = Header(None)):
-    _verify_rest_auth(authorization)
+@app.get("/conversations/{conversation_id}/history", dependencies=[Depends(require_auth)])
+async def get_conversation_history(conversation_id: str):
     conv = sessions.get_conversation(conversation_id)
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
@@ -175,32 +257,49 @@ ALLOWED_DOCUMENT_EXTENSIONS = {
 }
 ALLOWED_UPLOAD_EXTENSIONS = ALLOWED_IMAGE_EXTENSIONS | ALLOWED_DOCUMENT_EXTENSIONS
 MAX_UPLOAD_SIZE = 20 * 1024 * 1024  # 20MB
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
 
-@app.post("/upload")
+@app.post("/upload", dependencies=[Depends(require_auth)])
 async def upload_file(
     conversation_id: str = Query(...),
     file: UploadFile = File(...),
-    authorization: str = Header(None),
 ):
-    _verify_rest_auth(authorization)
-
     ext = Path(file.filename or "").suffix.lower()
     if ext not in ALLOWED_UPLOAD_EXTENSIONS:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
 
-    content = await file.read()
-    if len(content) > MAX_UPLOAD_SIZE:
-        raise HTTPException(status_code=413, detail="File too large (max 20MB)")
-
-    conv_dir = UPLOADS_DIR / conversation_id
-    conv_dir.mkdir(parents=True, exist_ok=True)
-
-    filename = f"{uuid.uuid4().hex[:12]}_{file.filename}"
-    dest = conv_dir / filename
-    dest.write_bytes(content)
-
-    logger.info(f"Uploaded {len(content)} bytes to {dest}")
+    # Starlette has already spooled the whole multipart body by now; checking
+    # the reported size first rejects an oversized file before it is copied
+    # to disk at all.
+    too_large = HTTPException(status_code=413, detail="File too large (max 20MB)")
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise too_large
+
+    # Shard by the first two hex digits of the name so a long-lived
+    # conversation never piles thousands of entries into one directory.
+    # The whole tree still sits under UPLOADS_DIR/<conversation_id>.
+    upload_id = uuid.uuid4().hex[:12]
+    shard_dir = UPLOADS_DIR / conversation_id / upload_id[:2]
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    dest = shard_dir / f"{upload_id}_{file.filename}"
+
+    # Copy from the spooled file in chunks, with the disk writes off the event
+    # loop, rather than reading it into one up-to-20MB bytes object first.
+    total = 0
+    out = await asyncio.to_thread(open, dest, "wb")
+    try:
+        with out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                total += len(chunk)
+                if total > MAX_UPLOAD_SIZE:
+                    raise too_large
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+
+    logger.info(f"Uploaded {total} bytes to {dest}")
     return {"path": str(dest)}
 
 
@@ -208,24 +307,61 @@ async def upload_file(
 SERVABLE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".bmp"}
 
 
-def _get_servable_roots() -> list[Path]:
-    """Return directories from which /files is allowed to serve."""
-    roots = [
-        UPLOADS_DIR.resolve(),
-        Path(get_working_dir()).resolve(),
-        WORKTREES_DIR.resolve(),
-        Path("/tmp").resolve(),
-    ]
-    # Include per-conversation working dirs (e.g. project-specific paths)
-    for conv_data in sessions.list_conversations():
-        wd = conv_data.get("working_dir")
-        if wd:
-            roots.append(Path(wd).resolve())
-    return roots
-
-
-@app.get("/files")
-async def serve_file(path: str = Query(...), token: str = Query(None), authorization: str = Header(None)):
+def _root_prefixes(roots: typing.Iterable[Path]) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Resolve roots to (exact paths, paths with a trailing separator) for _is_under."""
+    exact = tuple(dict.fromkeys(str(r.resolve()) for r in roots))
+    return exact, tuple(r if r.endswith(os.sep) else r + os.sep for r in exact)
+
+
+def _is_under(resolved: str, roots: tuple[str, ...], prefixes: tuple[str, ...]) -> bool:
+    """True if the resolved path is one of roots or inside one of them."""
+    return resolved in roots or resolved.startswith(prefixes)
+
+
+# Linux PATH_MAX — nothing longer can name a real file
+MAX_REQUEST_PATH_LENGTH = 4096
+
+
+def _resolve_request_path(path: str) -> Path:
+    """Validate a client-supplied path and resolve it.
+
+    Rejects oversized and traversing paths before touching the filesystem, so
+    a pathological request never reaches resolve().
+    """
+    if len(path) > MAX_REQUEST_PATH_LENGTH:
+        raise HTTPException(status_code=414, detail="Path too long")
+    # Security: block path traversal via .. components
+    if ".." in Path(path).parts:
+        raise HTTPException(status_code=400, detail="Invalid path")
+    return Path(path).resolve()
+
+
+# (cache key, configured roots) — rebuilt only when the conversation set or a
+# configured directory changes. The roots are kept unresolved and resolved on
+# every request, so a symlinked root (e.g. /tmp) that is repointed takes
+# effect immediately.
+_servable_roots_cache: tuple[tuple, tuple[Path, ...]] | None = None
+
+
+def _get_servable_roots() -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Return (roots, prefixes) of directories /files is allowed to serve from."""
+    global _servable_roots_cache
+    working_dir = get_working_dir()
+    key = (sessions, sessions.mutation_counter, working_dir, UPLOADS_DIR, WORKTREES_DIR)
+    cached = _servable_roots_cache
+    if cached is None or cached[0] != key:
+        roots = [UPLOADS_DIR, Path(working_dir), WORKTREES_DIR, Path("/tmp")]
+        # Include per-conversation working dirs (e.g. project-specific paths)
+        for conv_data in sessions.list_conversations():
+            wd = conv_data.get("working_dir")
+            if wd:
+                roots.append(Path(wd))
+        cached = _servable_roots_cache = (key, tuple(dict.fromkeys(roots)))
+    return _root_prefixes(cached[1])
+
+
+@app.get("/files", dependencies=[Depends(require_auth_or_token)])
+async def serve_file(request: Request, path: str = Query(...)):
     """Serve an image file from the server filesystem.
 
     Used to send screenshots and other images generated by tools (e.g. Playwright)
@@ -233,21 +369,11 @@ async def serve_file(path: str = Query(...), token: str = Query(None), authoriza
     Restricted to files under the uploads dir, working dir, or /tmp.
     Accepts auth via Authorization header OR ?token= query parameter (for image loaders).
     """
-    if token:
-        if not verify_token(token):
-            raise HTTPException(status_code=403, detail="Invalid token")
-    else:
-        _verify_rest_auth(authorization)
 
-    file_path = Path(path).resolve()
-
-    # Security: block path traversal via .. components
-    if ".." in Path(path).parts:
-        raise HTTPException(status_code=400, detail="Invalid path")
+    file_path = _resolve_request_path(path)
 
     # Security: restrict to known safe directories
-    allowed_roots = _get_servable_roots()
-    if not any(file_path == root or root in file_path.parents for root in allowed_roots):
+    if not _is_under(str(file_path), *_get_servable_roots()):
         raise HTTPException(status_code=403, detail="Path is outside allowed directories")
 
     if not file_path.is_file():
@@ -257,13 +383,16 @@ async def serve_file(path: str = Query(...), token: str = Query(None), authoriza
     if ext not in SERVABLE_EXTENSIONS:
         raise HTTPException(status_code=403, detail=f"File type not allowed: {ext}")
 
-    return FileResponse(str(file_path))
+    # Images are re-requested on every chat re-render; let clients revalidate
+    # with the ETag instead of re-downloading. Private: the route needs auth.
+    response = conditional_file_response(file_path, request)
+    response.headers["cache-control"] = "private, max-age=300"
+    return response
 
 
-@app.get("/conversations/active")
-async def active_conversations(authorization: str = Header(None)):
+@app.get("/conversations/active", dependencies=[Depends(require_auth)])
+async def active_conversations():
     """List conversation IDs that currently have a running Claude process."""
-    _verify_rest_auth(authorization)
     active_ids = [cid for cid, proc in active_processes.items() if proc.returncode is None]
     return {"active_conversation_ids": active_ids}
 
@@ -274,24 +403,21 @@ class SendImageRequest(BaseModel):
 
 
 SEND_IMAGE_ALLOWED_ROOTS = [Path("/tmp/auto-mobile/screenshots")]
+_SEND_IMAGE_ROOTS = _root_prefixes(SEND_IMAGE_ALLOWED_ROOTS)
 
 
-@app.post("/send-image")
-async def send_image(req: SendImageRequest, authorization: str = Header(None)):
+@app.post("/send-image", dependencies=[Depends(require_auth)])
+async def send_image(req: SendImageRequest):
     """Inject an image into a conversation's WebSocket stream.
 
     Used by Claude Code to send screenshots (e.g. from AutoMobile) to the
     mobile client for visual review.  If conversation_id is omitted, defaults
     to the conversation with an active Claude process.
     """
-    _verify_rest_auth(authorization)
 
-    file_path = Path(req.path).resolve()
-    if ".." in Path(req.path).parts:
-        raise HTTPException(status_code=400, detail="Invalid path")
+    file_path = _resolve_request_path(req.path)
 
-    if not any(file_path == root or root.resolve() in file_path.parents
-               for root in SEND_IMAGE_ALLOWED_ROOTS):
+    if not _is_under(str(file_path), *_SEND_IMAGE_ROOTS):
         raise HTTPException(status_code=403, detail="Path outside allowed directories")
 
     if not file_path.is_file():
@@ -315,24 +441,39 @@ async def send_image(req: SendImageRequest, authorization: str = Header(None)):
     # Broadcast image + message_complete so the client finalizes the message
     image_event = {"type": "image", "path": req.path, "conversation_id": conv_id}
     complete_event = {"type": "message_complete", "conversation_id": conv_id}
-    for ws in list(connected_clients):
-        await _send(ws, image_event)
-        await _send(ws, complete_event)
+    _broadcast(image_event, complete_event)
 
     return {"ok": True, "conversation_id": conv_id}
 
 
-@app.get("/projects")
-async def list_projects(authorization: str = Header(None)):
+def _scan_projects(projects_root: Path) -> list[dict]:
+    """Visible subdirectories of the projects root, sorted by name."""
+    mtime_ns = projects_root.stat().st_mtime_ns
+    return [{"name": name, "path": path} for name, path in _scan_projects_cached(str(projects_root), mtime_ns)]
+
+
+@functools.lru_cache(maxsize=8)
+def _scan_projects_cached(projects_root: str, mtime_ns: int) -> tuple[tuple[str, str], ...]:
+    # Adding, removing or renaming an entry bumps the directory's mtime, so
+    # mtime_ns only keys the cache and a new project is picked up at once
+    return tuple(
+        (entry.name, str(entry))
+        for entry in sorted(Path(projects_root).iterdir())
+        if entry.is_dir() and not entry.name.startswith(".")
+    )
+
+
+@app.get("/projects", dependencies=[Depends(require_auth)])
+async def list_projects():
     """List subdirectories of the projects root as available project contexts."""
-    _verify_rest_auth(authorization)
     projects_root = Path(get_working_dir())
     if not projects_root.is_dir():
         return {"projects": []}
-    projects = [{"name": "All Projects", "path": str(projects_root), "git_branch": get_current_branch(str(projects_root))}]
-    for entry in sorted(projects_root.iterdir()):
-        if entry.is_dir() and not entry.name.startswith("."):
-            projects.append({"name": entry.name, "path": str(entry), "git_branch": get_current_branch(str(entry))})
+    projects = [{"name": "All Projects", "path": str(projects_root)}]
+    projects.extend(await asyncio.to_thread(_scan_projects, projects_root))
+    branches = await _branches_for(p["path"] for p in projects)
+    for p in projects:
+        p["git_branch"] = branches[p["path"]]
     return {"projects": projects}
 
 
@@ -340,10 +481,23 @@ class CreateProjectRequest(BaseModel):
     name: str
 
 
-@app.post("/projects")
-async def create_project(request: CreateProjectRequest, authorization: str = Header(None)):
+def _init_project_dir(new_project: Path):
+    """Create a project directory and git-init it (blocking; run in a thread)."""
+    new_project.mkdir(parents=True)
+
+    # Initialize a git repo so Claude CLI has a stable project root.
+    # Without this, the CLI resolves the project root inconsistently
+    # between calls, which breaks --resume (session not found).
+    try:
+        subprocess.run(["git", "init"], cwd=str(new_project), capture_output=True, check=True)
+        logger.info(f"Created project directory with git: {new_project}")
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        logger.warning(f"Created project directory (git init failed): {new_project}")
+
+
+@app.post("/projects", dependencies=[Depends(require_auth)])
+async def create_project(request: CreateProjectRequest):
     """Create a new project directory under the projects root."""
-    _verify_rest_auth(authorization)
 
     name = request.name.strip()
     if not name:
@@ -357,24 +511,13 @@ async def create_project(request: CreateProjectRequest, authorization: str = Hea
     if new_project.exists():
         raise HTTPException(status_code=409, detail="Project already exists")
 
-    new_project.mkdir(parents=True)
-
-    # Initialize a git repo so Claude CLI has a stable project root.
-    # Without this, the CLI resolves the project root inconsistently
-    # between calls, which breaks --resume (session not found).
-    try:
-        subprocess.run(["git", "init"], cwd=str(new_project), capture_output=True, check=True)
-        logger.info(f"Created project directory with git: {new_project}")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        logger.warning(f"Created project directory (git init failed): {new_project}")
-
+    await asyncio.to_thread(_init_project_dir, new_project)
     return {"name": name, "path": str(new_project)}
 
 
-@app.get("/projects/files")
-async def list_project_files(path: str = Query(...), authorization: str = Header(None)):
+@app.get("/projects/files", dependencies=[Depends(require_auth)])
+async def list_project_files(path: str = Query(...)):
     """List files and directories in the given project path."""
-    _verify_rest_auth(authorization)
     projects_root = Path(get_working_dir()).resolve()
     target = Path(path).resolve()
 
@@ -404,18 +547,13 @@ async def list_project_files(path: str = Query(...), authorization: str = Header
     return {"entries": entries}
 
 
-@app.get("/projects/files/download")
-async def download_project_file(path: str = Query(...), token: str = Query(None), authorization: str = Header(None)):
+@app.get("/projects/files/download", dependencies=[Depends(require_auth_or_token)])
+async def download_project_file(path: str = Query(...)):
     """Download a file from a project directory.
 
     Accepts auth via Authorization header OR ?token= query parameter
     (for Android DownloadManager which can't set headers).
     """
-    if token:
-        if not verify_token(token):
-            raise HTTPException(status_code=403, detail="Invalid token")
-    else:
-        _verify_rest_auth(authorization)
 
     projects_root = Path(get_working_dir()).resolve()
     target = Path(path).resolve()
@@ -427,13 +565,12 @@ async def download_project_file(path: str = Query(...), token: str = Query(None)
     if not target.is_file():
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(str(target), filename=target.name)
+    return ZeroCopyFileResponse(str(target), filename=target.name)
 
 
-@app.get("/projects/config")
-async def get_project_config_endpoint(path: str = Query(...), authorization: str = Header(None)):
+@app.get("/projects/config", dependencies=[Depends(require_auth)])
+async def get_project_config_endpoint(path: str = Query(...)):
     """Get configuration (custom instructions) for a project."""
-    _verify_rest_auth(authorization)
     return get_project_config(path)
 
 
@@ -442,10 +579,9 @@ class UpdateProjectConfigRequest(BaseModel):
     custom_instructions: str
 
 
-@app.put("/projects/config")
-async def update_project_config(request: UpdateProjectConfigRequest, authorization: str = Header(None)):
+@app.put("/projects/config", dependencies=[Depends(require_auth)])
+async def update_project_config(request: UpdateProjectConfigRequest):
     """Update custom instructions for a project."""
-    _verify_rest_auth(authorization)
     set_custom_instructions(request.path, request.custom_instructions)
     return get_project_config(request.path)
 
@@ -457,29 +593,29 @@ class LocalModelToggleRequest(BaseModel):
     enabled: bool
 
 
-@app.get("/config/local-model")
-async def get_local_model_status_endpoint(authorization: str = Header(None)):
+@app.get("/config/local-model", dependencies=[Depends(require_auth)])
+async def get_local_model_status_endpoint():
     """Return local model availability and enabled status."""
-    _verify_rest_auth(authorization)
     from .config import get_local_model_status
     return get_local_model_status()
 
 
-@app.post("/config/local-model")
-async def set_local_model_enabled_endpoint(request: LocalModelToggleRequest, authorization: str = Header(None)):
+@app.post("/config/local-model", dependencies=[Depends(require_auth)])
+async def set_local_model_enabled_endpoint(request: LocalModelToggleRequest):
     """Toggle local model delegation on or off."""
-    _verify_rest_auth(authorization)
     from .config import set_local_model_enabled
     set_local_model_enabled(request.enabled)
     from .config import get_local_model_status
     return get_local_model_status()
 
 
-@app.post("/restart")
-async def restart_server(authorization: str = Header(None)):
+RESTART_DRAIN_TIMEOUT = 5.0  # seconds /restart waits for background tasks
+
+
+@app.post("/restart", dependencies=[Depends(require_auth)])
+async def restart_server():
     """Gracefully restart the server. Cancels active Claude process, then exits.
     launchd (KeepAlive=true) will restart the process automatically."""
-    _verify_rest_auth(authorization)
 
     logger.info("Restart requested — shutting down gracefully")
 
@@ -492,10 +628,15 @@ async def restart_server(authorization: str = Header(None)):
     # Schedule the actual exit slightly after returning the response
     async def _exit():
         await asyncio.sleep(0.5)
+        # Let in-flight handlers (now that their processes are cancelled)
+        # finish sending their final events before we go down
+        pending = background_tasks - {asyncio.current_task()}
+        if pending:
+            await asyncio.wait(pending, timeout=RESTART_DRAIN_TIMEOUT)
         logger.info("Exiting for restart")
         os.kill(os.getpid(), signal.SIGTERM)
 
-    asyncio.create_task(_exit())
+    _spawn(_exit())
 
     return {"status": "restarting"}
 
@@ -504,12 +645,11 @@ async def restart_server(authorization: str = Header(None)):
 deploy_process: asyncio.subprocess.Process | None = None
 
 
-@app.post("/deploy")
-async def deploy_build(authorization: str = Header(None)):
+@app.post("/deploy", dependencies=[Depends(require_auth)])
+async def deploy_build():
     """Trigger a build and deploy to Firebase App Distribution.
     Runs the build script as a background process and returns immediately."""
     global deploy_process
-    _verify_rest_auth(authorization)
 
     if deploy_process and deploy_process.returncode is None:
         raise HTTPException(status_code=409, detail="Deploy already in progress")
@@ -530,15 +670,14 @@ async def deploy_build(authorization: str = Header(None)):
             cwd=str(script.parent.parent),
         )
 
-    asyncio.create_task(_wait_deploy(deploy_process, log_file))
+    _spawn(_wait_deploy(deploy_process, log_file))
 
     return {"status": "deploying", "log_file": str(log_file)}
 
 
-@app.get("/deploy/status")
-async def deploy_status(authorization: str = Header(None)):
+@app.get("/deploy/status", dependencies=[Depends(require_auth)])
+async def deploy_status():
     """Check the status of the current or last deploy."""
-    _verify_rest_auth(authorization)
 
     if deploy_process is None:
         return {"status": "idle"}
@@ -564,54 +703,58 @@ async def _wait_deploy(proc: asyncio.subprocess.Process, log_file: Path):
 # ---------- Self-hosted update endpoints ----------
 
 
-@app.get("/update/check")
-async def update_check(authorization: str = Header(None)):
+def _load_release_json(path: Path):
+    """Parse a release metadata file, re-reading only when it changes.
+
+    The parsed value is shared between calls — callers must not mutate it.
+    """
+    st = path.stat()
+    return _read_release_json_cached(str(path), st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_release_json_cached(path: str, mtime_ns: int, size: int):
+    # mtime_ns and size only key the cache, so a newly published release is seen
+    return _json.loads(Path(path).read_bytes())
+
+
+@app.get("/update/check", dependencies=[Depends(require_auth)])
+async def update_check():
     """Return the latest available APK version info."""
-    _verify_rest_auth(authorization)
-    version_file = RELEASES_DIR / "version.json"
-    if not version_file.exists():
+    try:
+        return _load_release_json(RELEASES_DIR / "version.json")
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="No release available")
-    return json.loads(version_file.read_text())
 
 
-@app.get("/update/download")
-async def update_download(token: str = Query(None), authorization: str = Header(None)):
+@app.get("/update/download", dependencies=[Depends(require_auth_or_token)])
+async def update_download(request: Request):
     """Download the latest APK. Accepts auth via header or ?token= query param."""
-    if token:
-        if not verify_token(token):
-            raise HTTPException(status_code=403, detail="Invalid token")
-    else:
-        _verify_rest_auth(authorization)
 
     apk_file = RELEASES_DIR / "latest.apk"
     if not apk_file.exists():
         raise HTTPException(status_code=404, detail="No APK available")
 
-    return FileResponse(
-        str(apk_file),
+    return conditional_file_response(
+        apk_file,
+        request,
         media_type="application/vnd.android.package-archive",
         filename="conn-update.apk",
     )
 
 
-@app.get("/update/releases")
-async def update_releases(authorization: str = Header(None)):
+@app.get("/update/releases", dependencies=[Depends(require_auth)])
+async def update_releases():
     """Return the list of all available builds."""
-    _verify_rest_auth(authorization)
-    manifest = RELEASES_DIR / "releases.json"
-    if not manifest.exists():
+    try:
+        return {"releases": _load_release_json(RELEASES_DIR / "releases.json")}
+    except FileNotFoundError:
         return {"releases": []}
-    return {"releases": json.loads(manifest.read_text())}
 
 
-@app.get("/update/download/{filename}")
-async def update_download_file(filename: str, token: str = Query(None), authorization: str = Header(None)):
+@app.get("/update/download/{filename}", dependencies=[Depends(require_auth_or_token)])
+async def update_download_file(request: Request, filename: str):
     """Download a specific APK by filename. Accepts auth via header or ?token= query param."""
-    if token:
-        if not verify_token(token):
-            raise HTTPException(status_code=403, detail="Invalid token")
-    else:
-        _verify_rest_auth(authorization)
 
     # Prevent path traversal
     if "/" in filename or "\\" in filename or ".." in filename:
@@ -621,8 +764,9 @@ async def update_download_file(filename: str, token: str = Query(None), authoriz
     if not apk_file.exists():
         raise HTTPException(status_code=404, detail="APK not found")
 
-    return FileResponse(
-        str(apk_file),
+    return conditional_file_response(
+        apk_file,
+        request,
         media_type="application/vnd.android.package-archive",
         filename=filename,
     )
@@ -644,10 +788,9 @@ class PreviewStopProjectRequest(BaseModel):
     working_dir: str
 
 
-@app.get("/preview/check/{conversation_id}")
-async def check_preview(conversation_id: str, authorization: str = Header(None)):
+@app.get("/preview/check/{conversation_id}", dependencies=[Depends(require_auth)])
+async def check_preview(conversation_id: str):
     """Check if a conversation's project directory is previewable."""
-    _verify_rest_auth(authorization)
     conv = sessions.get_conversation(conversation_id)
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
@@ -655,10 +798,9 @@ async def check_preview(conversation_id: str, authorization: str = Header(None))
     return {"previewable": PreviewManager.can_preview(working_dir)}
 
 
-@app.get("/preview/check-project")
-async def check_preview_project(path: str = Query(...), authorization: str = Header(None)):
+@app.get("/preview/check-project", dependencies=[Depends(require_auth)])
+async def check_preview_project(path: str = Query(...)):
     """Check if a project directory is previewable."""
-    _verify_rest_auth(authorization)
     return {"previewable": PreviewManager.can_preview(path)}
 
 
@@ -671,8 +813,7 @@ async def _broadcast_preview_available(working_dir: str, port: int, conversation
     }
     if conversation_id:
         event["conversation_id"] = conversation_id
-    for ws in connected_clients:
-        await _send(ws, event)
+    _broadcast(event)
 
 
 async def _broadcast_preview_stopped(working_dir: str, conversation_id: str | None = None):
@@ -683,14 +824,12 @@ async def _broadcast_preview_stopped(working_dir: str, conversation_id: str | No
     }
     if conversation_id:
         event["conversation_id"] = conversation_id
-    for ws in connected_clients:
-        await _send(ws, event)
+    _broadcast(event)
 
 
-@app.post("/preview/start")
-async def start_preview(request: PreviewStartRequest, authorization: str = Header(None)):
+@app.post("/preview/start", dependencies=[Depends(require_auth)])
+async def start_preview(request: PreviewStartRequest):
     """Start a dev server for the given conversation's project directory."""
-    _verify_rest_auth(authorization)
 
     conv = sessions.get_conversation(request.conversation_id)
     if not conv:
@@ -710,10 +849,9 @@ async def start_preview(request: PreviewStartRequest, authorization: str = Heade
     return {"port": info.port}
 
 
-@app.post("/preview/start-project")
-async def start_preview_project(request: PreviewStartProjectRequest, authorization: str = Header(None)):
+@app.post("/preview/start-project", dependencies=[Depends(require_auth)])
+async def start_preview_project(request: PreviewStartProjectRequest):
     """Start a dev server for a project directory (no conversation required)."""
-    _verify_rest_auth(authorization)
 
     try:
         info = await previews.start(working_dir=request.working_dir)
@@ -724,10 +862,9 @@ async def start_preview_project(request: PreviewStartProjectRequest, authorizati
     return {"port": info.port, "working_dir": request.working_dir}
 
 
-@app.post("/preview/restart")
-async def restart_preview(request: PreviewStartRequest, authorization: str = Header(None)):
+@app.post("/preview/restart", dependencies=[Depends(require_auth)])
+async def restart_preview(request: PreviewStartRequest):
     """Restart the preview server for a conversation's project directory."""
-    _verify_rest_auth(authorization)
 
     conv = sessions.get_conversation(request.conversation_id)
     if not conv:
@@ -747,10 +884,9 @@ async def restart_preview(request: PreviewStartRequest, authorization: str = Hea
     return {"port": info.port}
 
 
-@app.post("/preview/stop")
-async def stop_preview(request: PreviewStopRequest, authorization: str = Header(None)):
+@app.post("/preview/stop", dependencies=[Depends(require_auth)])
+async def stop_preview(request: PreviewStopRequest):
     """Stop the preview server for a conversation."""
-    _verify_rest_auth(authorization)
     working_dir = await previews.stop_for_conversation(request.conversation_id)
     if not working_dir:
         raise HTTPException(status_code=404, detail="No preview running for this conversation")
@@ -759,10 +895,9 @@ async def stop_preview(request: PreviewStopRequest, authorization: str = Header(
     return {"stopped": True}
 
 
-@app.post("/preview/stop-project")
-async def stop_preview_project(request: PreviewStopProjectRequest, authorization: str = Header(None)):
+@app.post("/preview/stop-project", dependencies=[Depends(require_auth)])
+async def stop_preview_project(request: PreviewStopProjectRequest):
     """Stop the preview server for a project directory."""
-    _verify_rest_auth(authorization)
     stopped = await previews.stop(request.working_dir)
     if not stopped:
         raise HTTPException(status_code=404, detail="No preview running for this directory")
@@ -771,11 +906,11 @@ async def stop_preview_project(request: PreviewStopProjectRequest, authorization
     return {"stopped": True}
 
 
-@app.get("/preview/status")
-async def preview_status(authorization: str = Header(None)):
+@app.get("/preview/status", dependencies=[Depends(require_auth)])
+async def preview_status():
     """List all active preview servers."""
-    _verify_rest_auth(authorization)
-    return {"previews": previews.list_previews()}
+    body = _json.dumps({"previews": list(previews.iter_previews())})
+    return Response(content=body, media_type="application/json")
 
 
 # ---------- MCP server management endpoints ----------
@@ -797,17 +932,15 @@ class McpServerToggleRequest(BaseModel):
     enabled: bool
 
 
-@app.get("/mcp/servers")
-async def list_mcp_servers(authorization: str = Header(None)):
+@app.get("/mcp/servers", dependencies=[Depends(require_auth)])
+async def list_mcp_servers():
     """List all configured MCP servers (env values masked)."""
-    _verify_rest_auth(authorization)
     return {"servers": mcp_servers.list_servers()}
 
 
-@app.post("/mcp/servers")
-async def add_mcp_server(request: McpServerRequest, authorization: str = Header(None)):
+@app.post("/mcp/servers", dependencies=[Depends(require_auth)])
+async def add_mcp_server(request: McpServerRequest):
     """Add a new MCP server."""
-    _verify_rest_auth(authorization)
     from .mcp_config import McpServer
     server = McpServer(
         name=request.name,
@@ -828,10 +961,9 @@ async def add_mcp_server(request: McpServerRequest, authorization: str = Header(
     return {"server": request.name}
 
 
-@app.put("/mcp/servers/{name}")
-async def update_mcp_server(name: str, request: McpServerRequest, authorization: str = Header(None)):
+@app.put("/mcp/servers/{name}", dependencies=[Depends(require_auth)])
+async def update_mcp_server(name: str, request: McpServerRequest):
     """Update an existing MCP server."""
-    _verify_rest_auth(authorization)
     updates = request.model_dump(exclude_none=True)
     updates.pop("name", None)
     try:
@@ -844,32 +976,29 @@ async def update_mcp_server(name: str, request: McpServerRequest, authorization:
     return {"server": name}
 
 
-@app.delete("/mcp/servers/{name}")
-async def delete_mcp_server(name: str, authorization: str = Header(None)):
+@app.delete("/mcp/servers/{name}", dependencies=[Depends(require_auth)])
+async def delete_mcp_server(name: str):
     """Remove an MCP server."""
-    _verify_rest_auth(authorization)
     if mcp_servers.remove_server(name):
         logger.info(f"Removed MCP server: {name}")
         return {"deleted": name}
     raise HTTPException(status_code=404, detail="MCP server not found")
 
 
-@app.post("/mcp/servers/{name}/toggle")
-async def toggle_mcp_server(name: str, request: McpServerToggleRequest, authorization: str = Header(None)):
+@app.post("/mcp/servers/{name}/toggle", dependencies=[Depends(require_auth)])
+async def toggle_mcp_server(name: str, request: McpServerToggleRequest):
     """Enable or disable an MCP server globally."""
-    _verify_rest_auth(authorization)
     if mcp_servers.toggle_server(name, request.enabled):
         logger.info(f"Toggled MCP server {name}: enabled={request.enabled}")
         return {"name": name, "enabled": request.enabled}
     raise HTTPException(status_code=404, detail="MCP server not found")
 
 
-@app.get("/mcp/catalog")
-async def list_mcp_catalog(authorization: str = Header(None)):
+@app.get("/mcp/catalog", dependencies=[Depends(require_auth)])
+async def list_mcp_catalog():
     """Return the catalog of pre-configured MCP server templates."""
-    _verify_rest_auth(authorization)
     installed = set(mcp_servers.get_server_names())
-    return {"catalog": get_catalog(installed)}
+    return Response(content=b'{"catalog":' + get_catalog_json(installed) + b"}", media_type="application/json")
 
 
 # ---------- Agent management endpoints ----------
@@ -887,17 +1016,15 @@ class AgentRequest(BaseModel):
     max_turns: typing.Optional[int] = None
 
 
-@app.get("/agents")
-async def list_agents(authorization: str = Header(None)):
+@app.get("/agents", dependencies=[Depends(require_auth)])
+async def list_agents():
     """List all available agents."""
-    _verify_rest_auth(authorization)
     return {"agents": agents.list_agents()}
 
 
-@app.get("/agents/{name}")
-async def get_agent(name: str, authorization: str = Header(None)):
+@app.get("/agents/{name}", dependencies=[Depends(require_auth)])
+async def get_agent(name: str):
     """Get full agent details including prompt."""
-    _verify_rest_auth(authorization)
     agent = agents.get_agent(name)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
@@ -914,10 +1041,9 @@ async def get_agent(name: str, authorization: str = Header(None)):
     }
 
 
-@app.post("/agents")
-async def create_agent(request: AgentRequest, authorization: str = Header(None)):
+@app.post("/agents", dependencies=[Depends(require_auth)])
+async def create_agent(request: AgentRequest):
     """Create a new agent."""
-    _verify_rest_auth(authorization)
     from .agent_manager import AgentInfo
     agent = AgentInfo(
         name=request.name,
@@ -938,10 +1064,9 @@ async def create_agent(request: AgentRequest, authorization: str = Header(None))
     return {"agent": agent.name}
 
 
-@app.put("/agents/{name}")
-async def update_agent(name: str, request: AgentRequest, authorization: str = Header(None)):
+@app.put("/agents/{name}", dependencies=[Depends(require_auth)])
+async def update_agent(name: str, request: AgentRequest):
     """Update an existing agent."""
-    _verify_rest_auth(authorization)
     from .agent_manager import AgentInfo
     agent = AgentInfo(
         name=request.name,
@@ -964,10 +1089,9 @@ async def update_agent(name: str, request: AgentRequest, authorization: str = He
     return {"agent": agent.name}
 
 
-@app.delete("/agents/{name}")
-async def delete_agent(name: str, authorization: str = Header(None)):
+@app.delete("/agents/{name}", dependencies=[Depends(require_auth)])
+async def delete_agent(name: str):
     """Delete an agent."""
-    _verify_rest_auth(authorization)
     if agents.delete_agent(name):
         logger.info(f"Deleted agent: {name}")
         return {"deleted": name}
@@ -975,15 +1099,6 @@ async def delete_agent(name: str, authorization: str = Header(None)):
 
 
 
-
-def _verify_rest_auth(authorization: str | None):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = authorization.removeprefix("Bearer ")
-    if not verify_token(token):
-        raise HTTPException(status_code=403, detail="Invalid token")
-
-
 # ---------- WebSocket endpoint ----------
 
 
@@ -999,11 +1114,15 @@ async def _safe_handle(websocket: WebSocket, coro):
             pass  # Client may have disconnected
 
 
+WS_PARSE_OFFLOAD_SIZE = 64 * 1024  # inbound frames at least this long are parsed off the loop
+
+
 @app.websocket("/ws/chat")
 async def ws_chat(websocket: WebSocket):
     await websocket.accept()
     authenticated = False
     ping_task: asyncio.Task | None = None
+    sender_task: asyncio.Task | None = None
 
     async def _ping_loop():
         """Send periodic pings to keep the connection alive and detect dead clients."""
@@ -1014,16 +1133,32 @@ async def ws_chat(websocket: WebSocket):
         except (WebSocketDisconnect, RuntimeError, asyncio.CancelledError):
             pass
 
+    async def _sender_loop(outbox: asyncio.Queue):
+        """Deliver broadcast events queued for this client, in order."""
+        try:
+            while True:
+                await _send_raw(websocket, await outbox.get())
+        except asyncio.CancelledError:
+            pass
+
     try:
         while True:
             raw = await websocket.receive_text()
-            msg = json.loads(raw)
+            if len(raw) < WS_PARSE_OFFLOAD_SIZE:
+                msg = _json.loads(raw)
+            else:
+                # Large frames (e.g. base64 images) would stall every other
+                # connection while parsing, so parse them in a thread
+                msg = await asyncio.to_thread(_json.loads, raw)
             msg_type = msg.get("type")
 
             if msg_type == "auth":
                 if verify_token(msg.get("token", "")):
                     authenticated = True
-                    connected_clients.append(websocket)
+                    connected_clients[websocket] = None
+                    if sender_task is None:  # A repeated auth keeps the existing outbox and sender
+                        outbox = client_outboxes[id(websocket)] = asyncio.Queue(maxsize=CLIENT_OUTBOX_SIZE)
+                        sender_task = asyncio.create_task(_sender_loop(outbox))
                     server_name = msg.get("server_name", "")
                     if server_name:
                         client_server_names[id(websocket)] = server_name
@@ -1033,17 +1168,18 @@ async def ws_chat(websocket: WebSocket):
                         client_app_version["code"] = int(app_version_code)
                         client_app_version["name"] = app_version_name
                         _save_client_version(client_app_version)
-                    await _send(websocket, {"type": "auth_ok"})
-                    ping_task = asyncio.create_task(_ping_loop())
+                    await _send_raw(websocket, _AUTH_OK)
+                    if ping_task is None:
+                        ping_task = asyncio.create_task(_ping_loop())
                     logger.info(f"Client authenticated (server_name={server_name or 'unset'}, app_version={app_version_code or 'unset'})")
                 else:
-                    await _send(websocket, {"type": "error", "detail": "Invalid token"})
+                    await _send_raw(websocket, _ERR_INVALID_TOKEN)
                     await websocket.close(code=4001, reason="Invalid token")
                     return
                 continue
 
             if not authenticated:
-                await _send(websocket, {"type": "error", "detail": "Not authenticated"})
+                await _send_raw(websocket, _ERR_NOT_AUTHENTICATED)
                 await websocket.close(code=4001, reason="Not authenticated")
                 return
 
@@ -1054,15 +1190,12 @@ async def ws_chat(websocket: WebSocket):
             if msg_type == "message":
                 # Dispatch as background task so the receive loop stays free
                 # for other conversations' messages and cancel requests.
-                asyncio.create_task(_safe_handle(websocket, _handle_message(websocket, msg)))
-            elif msg_type == "new_conversation":
-                await _handle_new_conversation(websocket, msg)
-            elif msg_type == "update_permissions":
-                await _handle_update_permissions(websocket, msg)
-            elif msg_type == "update_mcp_servers":
-                await _handle_update_mcp_servers(websocket, msg)
-            elif msg_type == "cancel":
-                await _handle_cancel(websocket, msg)
+                _spawn(_safe_handle(websocket, _handle_message(websocket, msg)))
+                continue
+
+            handler = _WS_HANDLERS.get(msg_type)
+            if handler:
+                await handler(websocket, msg)
             else:
                 await _send(websocket, {"type": "error", "detail": f"Unknown message type: {msg_type}"})
 
@@ -1073,9 +1206,11 @@ async def ws_chat(websocket: WebSocket):
     finally:
         if ping_task:
             ping_task.cancel()
-        if websocket in connected_clients:
-            connected_clients.remove(websocket)
+        if sender_task:
+            sender_task.cancel()
+        connected_clients.pop(websocket, None)
         client_server_names.pop(id(websocket), None)
+        client_outboxes.pop(id(websocket), None)
 
 
 def _build_prompt(text: str, image_paths: list[str]) -> str:
@@ -1111,71 +1246,75 @@ async def _handle_message(websocket: WebSocket, msg: dict):
     session_id = msg.get("session_id")
 
     if not text and not image_paths:
-        await _send(websocket, {"type": "error", "detail": "Empty message"})
+        await _send_raw(websocket, _ERR_EMPTY_MESSAGE)
         return
 
     # Validate conversation_id format before using it in file paths
     from .session_manager import CONVERSATION_ID_PATTERN
     if conversation_id and not CONVERSATION_ID_PATTERN.match(conversation_id):
-        await _send(websocket, {"type": "error", "detail": "Invalid conversation ID format"})
+        await _send_raw(websocket, _ERR_INVALID_CONVERSATION_ID)
         return
 
     prompt = _build_prompt(text, image_paths)
 
     conv_lock = _get_conversation_lock(conversation_id)
 
+    # Take the lock once and hold it for the whole turn
     if conv_lock.locked():
         logger.info(f"Lock held for {conversation_id} — cancelling previous process")
         await _cancel_conversation_process(conversation_id)
         # Wait briefly for the lock to release
         try:
             await asyncio.wait_for(conv_lock.acquire(), timeout=5.0)
-            conv_lock.release()
         except asyncio.TimeoutError:
             await _send(websocket, {"type": "busy", "detail": "Conversation is still finishing", "conversation_id": conversation_id})
             return
+    else:
+        await conv_lock.acquire()  # Uncontended: returns without suspending
 
-    # Look up session_id and working_dir from conversation if not provided
-    is_first_turn = False
-    conv_working_dir = None
-    if not session_id and conversation_id:
-        conv = sessions.get_conversation(conversation_id)
-        if conv:
-            session_id = conv.claude_session_id
-            conv_working_dir = conv.working_dir
-            is_first_turn = not session_id  # First turn if no stored session yet
-        else:
-            # Auto-create conversation if it doesn't exist (e.g. new_conversation was lost due to reconnect)
-            msg_working_dir = msg.get("working_dir")
-            sessions.create_conversation(conversation_id, text[:50], working_dir=msg_working_dir)
-            is_first_turn = True
-    elif session_id:
-        # Client provided a session_id — check if the conversation actually has one stored
+    try:
+        # Look up session_id and working_dir from conversation if not provided.
+        # The Conversation is fetched once and handed to _run_claude; the
+        # session manager mutates it in place, so later reads stay current.
+        is_first_turn = False
+        conv_working_dir = None
         conv = sessions.get_conversation(conversation_id) if conversation_id else None
-        if conv:
-            conv_working_dir = conv.working_dir
-            if not conv.claude_session_id:
+        if not session_id and conversation_id:
+            if conv:
+                session_id = conv.claude_session_id
+                conv_working_dir = conv.working_dir
+                is_first_turn = not session_id  # First turn if no stored session yet
+            else:
+                # Auto-create conversation if it doesn't exist (e.g. new_conversation was lost due to reconnect)
+                msg_working_dir = msg.get("working_dir")
+                conv = sessions.create_conversation(conversation_id, text[:50], working_dir=msg_working_dir)
                 is_first_turn = True
+        elif session_id:
+            # Client provided a session_id — check if the conversation actually has one stored
+            if conv:
+                conv_working_dir = conv.working_dir
+                if not conv.claude_session_id:
+                    is_first_turn = True
+
+        # Log user message to history (original text, not the expanded prompt)
+        sessions.append_history(conversation_id, {
+            "role": "user",
+            "text": text or "[image]",
+        })
 
-    # Log user message to history (original text, not the expanded prompt)
-    sessions.append_history(conversation_id, {
-        "role": "user",
-        "text": text or "[image]",
-    })
-
-    # Generate AI title immediately from first message (don't wait for response)
-    if is_first_turn and conversation_id:
-        asyncio.create_task(_generate_summary(conversation_id, text or "[image]"))
+        # Generate AI title immediately from first message (don't wait for response)
+        if is_first_turn and conversation_id:
+            _spawn(_generate_summary(conversation_id, text or "[image]"))
 
-    # Use worktree path if this conversation is isolated, otherwise working_dir
-    conv_obj = sessions.get_conversation(conversation_id)
-    if conv_obj and conv_obj.git_worktree_path:
-        cwd = conv_obj.git_worktree_path
-    else:
-        cwd = conv_working_dir or get_working_dir()
+        # Use worktree path if this conversation is isolated, otherwise working_dir
+        if conv and conv.git_worktree_path:
+            cwd = conv.git_worktree_path
+        else:
+            cwd = conv_working_dir or get_working_dir()
 
-    async with conv_lock:
-        await _run_claude(websocket, prompt, conversation_id, session_id, is_first_turn, cwd=cwd)
+        await _run_claude(websocket, prompt, conversation_id, session_id, is_first_turn, cwd=cwd, conv=conv)
+    finally:
+        conv_lock.release()
 
 
 async def _handle_new_conversation(websocket: WebSocket, msg: dict):
@@ -1238,11 +1377,13 @@ def _working_dir_matches(conversation_id: str, working_dir: str) -> bool:
 VALID_TOOL_NAMES = {"Read", "Write", "Edit", "Bash", "Glob", "Grep", "WebSearch", "WebFetch"}
 
 
+# A known tool name, optionally followed by one parenthesized pattern
+_TOOL_SPEC_RE = re.compile(rf"(?:{'|'.join(map(re.escape, sorted(VALID_TOOL_NAMES)))})(?:\(.*\))?")
+
+
 def _validate_tool_spec(spec: str) -> bool:
     """Validate a tool spec like 'Bash' or 'Bash(git:*)'."""
-    # Extract base tool name (everything before optional parenthesized pattern)
-    base = spec.split("(", 1)[0]
-    return base in VALID_TOOL_NAMES
+    return isinstance(spec, str) and _TOOL_SPEC_RE.fullmatch(spec) is not None
 
 
 async def _handle_update_permissions(websocket: WebSocket, msg: dict):
@@ -1251,11 +1392,11 @@ async def _handle_update_permissions(websocket: WebSocket, msg: dict):
     allowed_tools = msg.get("allowed_tools", [])
 
     if not conversation_id:
-        await _send(websocket, {"type": "error", "detail": "Missing conversation_id"})
+        await _send_raw(websocket, _ERR_MISSING_CONVERSATION_ID)
         return
 
-    invalid = [t for t in allowed_tools if not _validate_tool_spec(t)]
-    if invalid:
+    if not all(map(_validate_tool_spec, allowed_tools)):
+        invalid = [t for t in allowed_tools if not _validate_tool_spec(t)]
         await _send(websocket, {"type": "error", "detail": f"Invalid tools: {invalid}"})
         return
 
@@ -1266,7 +1407,7 @@ async def _handle_update_permissions(websocket: WebSocket, msg: dict):
             "allowed_tools": allowed_tools,
         })
     else:
-        await _send(websocket, {"type": "error", "detail": "Conversation not found"})
+        await _send_raw(websocket, _ERR_CONVERSATION_NOT_FOUND)
 
 
 async def _handle_update_mcp_servers(websocket: WebSocket, msg: dict):
@@ -1275,7 +1416,7 @@ async def _handle_update_mcp_servers(websocket: WebSocket, msg: dict):
     mcp_server_names = msg.get("mcp_servers", [])
 
     if not conversation_id:
-        await _send(websocket, {"type": "error", "detail": "Missing conversation_id"})
+        await _send_raw(websocket, _ERR_MISSING_CONVERSATION_ID)
         return
 
     # Validate that all requested servers actually exist
@@ -1292,7 +1433,7 @@ async def _handle_update_mcp_servers(websocket: WebSocket, msg: dict):
             "mcp_servers": mcp_server_names,
         })
     else:
-        await _send(websocket, {"type": "error", "detail": "Conversation not found"})
+        await _send_raw(websocket, _ERR_CONVERSATION_NOT_FOUND)
 
 
 async def _cancel_conversation_process(conversation_id: str) -> bool:
@@ -1300,19 +1441,31 @@ async def _cancel_conversation_process(conversation_id: str) -> bool:
     proc = active_processes.get(conversation_id)
     if proc and proc.returncode is None:
         logger.info(f"Terminating claude process for {conversation_id}")
-        proc.terminate()
+        _signal_process_group(proc, signal.SIGTERM)
         try:
             await asyncio.wait_for(proc.wait(), timeout=5.0)
         except asyncio.TimeoutError:
-            proc.kill()
+            _signal_process_group(proc, signal.SIGKILL)
         return True
     return False
 
 
+def _signal_process_group(proc: asyncio.subprocess.Process, sig: int):
+    """Signal a claude process together with the tool processes it spawned.
+
+    Each claude process leads its own session (see _run_claude), so its pid
+    is also its process group id.
+    """
+    try:
+        os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        # Process already gone
+        pass
+
+
 async def _cancel_all_processes():
-    """Terminate all active claude subprocesses."""
-    for cid in list(active_processes.keys()):
-        await _cancel_conversation_process(cid)
+    """Terminate all active claude subprocesses, waiting on them in parallel."""
+    await asyncio.gather(*(_cancel_conversation_process(cid) for cid in list(active_processes)))
 
 
 async def _handle_cancel(websocket: WebSocket, msg: dict):
@@ -1330,60 +1483,63 @@ async def _handle_cancel(websocket: WebSocket, msg: dict):
                 await _send(websocket, {"type": "cancelled", "conversation_id": cid})
                 cancelled_any = True
         if not cancelled_any:
-            await _send(websocket, {"type": "error", "detail": "No active process to cancel"})
+            await _send_raw(websocket, _ERR_NO_ACTIVE_PROCESS)
 
 
-async def _run_claude(websocket: WebSocket, text: str, conversation_id: str, session_id: str | None, is_first_turn: bool = False, cwd: str | None = None):
-    """Spawn claude -p subprocess and stream events back via WebSocket."""
+# Client message types handled inline on the receive loop. "message" is not
+# listed: it runs as a background task (see websocket_endpoint).
+_WS_HANDLERS = {
+    "new_conversation": _handle_new_conversation,
+    "update_permissions": _handle_update_permissions,
+    "update_mcp_servers": _handle_update_mcp_servers,
+    "cancel": _handle_cancel,
+}
 
-    conv = sessions.get_conversation(conversation_id)
-    use_agent = conv and conv.agent
 
-    # Conn-specific platform rules (appended regardless of agent)
-    server_name = client_server_names.get(id(websocket), "")
-    if not server_name:
-        from .config import get_machine_name
-        server_name = get_machine_name()
-    conn_system_prompt = (
-        "The user is communicating with you remotely via Conn, "
-        "an Android app that connects to this machine over the local network. "
-        "They cannot see your full terminal output or interact with files directly. "
-        "Keep responses concise and focused on actionable results.\n\n"
-        f"MACHINE: {server_name}\n\n"
-        "WEB APP PREVIEW — CRITICAL RULES:\n"
-        "1. NEVER start long-running dev servers via the Bash tool. "
-        "Running 'npm run dev', 'python -m http.server', 'flask run', 'npx vite', "
-        "or ANY process that doesn't exit will hang your Bash tool forever and freeze the conversation.\n"
-        "2. You CAN use Bash for short-lived build commands: npm install, npm run build, pip install, etc.\n"
-        "3. When you finish building or modifying a web app, tell the user: "
-        "\"The app is ready! Tap the menu (three dots) in the top right and select 'Start Preview' to view it in your browser.\"\n"
-        "4. The Conn server will auto-detect the project type (Vite, npm, Django, Flask, static HTML) "
-        "and start the right dev server on a free port. You do not need to configure anything.\n"
-        "5. If the user asks you to 'run it', 'start the server', 'show me the app', or 'deploy it', "
-        "remind them to use the Start Preview button instead of trying to run a server yourself.\n\n"
-        "QUESTIONS — CRITICAL RULE:\n"
-        "NEVER use the AskUserQuestion tool — it is not supported in this environment and will fail silently. "
-        "Instead, when you need to ask the user a question or present choices, write them directly in your "
-        "response text as numbered options. For example:\n"
-        "\"Which approach do you prefer?\n"
-        "1. Option A — description\n"
-        "2. Option B — description\n"
-        "3. Option C — description\"\n"
-        "The user will reply with their choice number or a custom answer.\n\n"
-        "DOCUMENTATION — IMPORTANT:\n"
-        "After making any code changes, investigate whether related documentation "
-        "(README files, docs/ folder, inline doc comments, CLAUDE.md, etc.) needs to be "
-        "updated to stay consistent with the changes you made. If you find stale or "
-        "missing documentation, update it as part of the same task."
-    )
-
-    # Append local model delegation instructions if configured
-    from .config import get_local_model_config
-    lm_config = get_local_model_config()
-    if lm_config:
-        opencode_bin = lm_config.get("opencode_path", "opencode")
-        lm_timeout = lm_config.get("timeout", 120)
-        conn_system_prompt += (
+# Conn-specific platform rules appended to every claude run. Only the machine
+# name and the local-model settings vary, so whole prompts are built once per
+# combination by _conn_system_prompt.
+_CONN_PROMPT_INTRO = (
+    "The user is communicating with you remotely via Conn, "
+    "an Android app that connects to this machine over the local network. "
+    "They cannot see your full terminal output or interact with files directly. "
+    "Keep responses concise and focused on actionable results.\n\n"
+)
+_CONN_PROMPT_RULES = (
+    "WEB APP PREVIEW — CRITICAL RULES:\n"
+    "1. NEVER start long-running dev servers via the Bash tool. "
+    "Running 'npm run dev', 'python -m http.server', 'flask run', 'npx vite', "
+    "or ANY process that doesn't exit will hang your Bash tool forever and freeze the conversation.\n"
+    "2. You CAN use Bash for short-lived build commands: npm install, npm run build, pip install, etc.\n"
+    "3. When you finish building or modifying a web app, tell the user: "
+    "\"The app is ready! Tap the menu (three dots) in the top right and select 'Start Preview' to view it in your browser.\"\n"
+    "4. The Conn server will auto-detect the project type (Vite, npm, Django, Flask, static HTML) "
+    "and start the right dev server on a free port. You do not need to configure anything.\n"
+    "5. If the user asks you to 'run it', 'start the server', 'show me the app', or 'deploy it', "
+    "remind them to use the Start Preview button instead of trying to run a server yourself.\n\n"
+    "QUESTIONS — CRITICAL RULE:\n"
+    "NEVER use the AskUserQuestion tool — it is not supported in this environment and will fail silently. "
+    "Instead, when you need to ask the user a question or present choices, write them directly in your "
+    "response text as numbered options. For example:\n"
+    "\"Which approach do you prefer?\n"
+    "1. Option A — description\n"
+    "2. Option B — description\n"
+    "3. Option C — description\"\n"
+    "The user will reply with their choice number or a custom answer.\n\n"
+    "DOCUMENTATION — IMPORTANT:\n"
+    "After making any code changes, investigate whether related documentation "
+    "(README files, docs/ folder, inline doc comments, CLAUDE.md, etc.) needs to be "
+    "updated to stay consistent with the changes you made. If you find stale or "
+    "missing documentation, update it as part of the same task."
+)
+
+
+@functools.lru_cache(maxsize=16)
+def _conn_system_prompt(server_name: str, opencode_bin: str | None = None, lm_timeout: int = 120) -> str:
+    """Conn platform rules for a machine, plus local model delegation if configured."""
+    prompt = f"{_CONN_PROMPT_INTRO}MACHINE: {server_name}\n\n{_CONN_PROMPT_RULES}"
+    if opencode_bin is not None:
+        prompt += (
             "\n\nLOCAL MODEL DELEGATION:\n"
             "This machine has a fast local coding LLM available via OpenCode — "
             "80B parameter model running at 70+ tokens/sec on local hardware. "
@@ -1409,6 +1565,90 @@ async def _run_claude(websocket: WebSocket, text: str, conversation_id: str, ses
             "and style issues. Address any valid findings before proceeding. "
             "This is a free, zero-cost quality gate — use it every time."
         )
+    return prompt
+
+
+# Environment for claude subprocesses, built once: ours minus CLAUDECODE so
+# claude doesn't think it's nested. The server never changes its own env.
+_CLAUDE_ENV = {k: v for k, v in os.environ.items() if k != "CLAUDECODE"}
+
+STREAM_READ_SIZE = 64 * 1024
+# Seconds to hold streamed text so bursts of tokens go out as one message
+TEXT_DELTA_COALESCE = 0.02
+
+
+async def _iter_lines(stream: asyncio.StreamReader):
+    """Yield lines (without the newline) from a stream, many per read.
+
+    Unlike `async for line in stream`, this awaits once per chunk instead of
+    once per line, and only scans newly read bytes for the separator, so a
+    huge line arriving in many chunks is not rescanned from the start.
+    """
+    buf = bytearray()
+    while chunk := await stream.read(STREAM_READ_SIZE):
+        scan = len(buf)
+        buf += chunk
+        start = 0
+        while (nl := buf.find(b"\n", scan)) != -1:
+            yield bytes(buf[start:nl])
+            start = scan = nl + 1
+        del buf[:start]
+    if buf:
+        yield bytes(buf)
+
+
+# The exact shape the CLI emits for a streamed text fragment. Anything else —
+# reordered keys, extra fields — simply misses and takes the full parse.
+_TEXT_DELTA_PREFIX = b'{"type":"content_block_delta",'
+_TEXT_DELTA_RE = re.compile(
+    rb'\{"type":"content_block_delta",(?:"index":\d+,)?'
+    rb'"delta":\{"type":"text_delta","text":("(?:[^"\\]|\\.)*")\}\}\s*'
+)
+
+
+def _parse_text_delta(line: bytes) -> dict | None:
+    """Decode a text content_block_delta line without parsing the whole event.
+
+    Text deltas are most of the stream, one per few tokens; this pulls out and
+    unescapes just the text string. Returns None for any other line.
+    """
+    if not line.startswith(_TEXT_DELTA_PREFIX):
+        return None
+    m = _TEXT_DELTA_RE.fullmatch(line)
+    if m is None:
+        return None
+    try:
+        text = _json.loads(m.group(1))
+    except ValueError:  # Bad escape or bytes; let the full parse reject it
+        return None
+    return {"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}}
+
+
+async def _run_claude(websocket: WebSocket, text: str, conversation_id: str, session_id: str | None, is_first_turn: bool = False, cwd: str | None = None, conv: Conversation | None = None):
+    """Spawn claude -p subprocess and stream events back via WebSocket.
+
+    ``conv`` is the caller's already-fetched Conversation; it is looked up
+    here only when not supplied.
+    """
+
+    if conv is None:
+        conv = sessions.get_conversation(conversation_id)
+    use_agent = conv and conv.agent
+
+    # Conn-specific platform rules (appended regardless of agent)
+    server_name = client_server_names.get(id(websocket), "")
+    if not server_name:
+        from .config import get_machine_name
+        server_name = get_machine_name()
+    # Include local model delegation instructions if configured
+    from .config import get_local_model_config
+    lm_config = get_local_model_config()
+    if lm_config:
+        conn_system_prompt = _conn_system_prompt(
+            server_name, lm_config.get("opencode_path", "opencode"), lm_config.get("timeout", 120),
+        )
+    else:
+        conn_system_prompt = _conn_system_prompt(server_name)
 
     # Append per-project custom instructions if configured
     project_dir = cwd or get_working_dir()
@@ -1478,37 +1718,36 @@ async def _run_claude(websocket: WebSocket, text: str, conversation_id: str, ses
     result_is_error = False
     result_errors: list[str] = []
     saw_streaming_deltas = False  # Track if we got content_block_delta events
-    forwarder = EventForwarder(cwd=cwd or get_working_dir())
-
-    # Clear CLAUDECODE env var so claude doesn't think it's nested
-    env = {k: v for k, v in os.environ.items() if k != "CLAUDECODE"}
+    forwarder = EventForwarder(cwd=cwd or get_working_dir(), coalesce=TEXT_DELTA_COALESCE)
 
     try:
-        # Use a large stdout buffer limit (32MB) because Claude's stream-json
-        # can emit very large single lines (e.g. base64-encoded image data from
-        # Read tool results). The default asyncio limit is 64KB, which causes
-        # "Separator is not found, and chunk exceed the limit" errors.
+        # stdout is split into lines by _iter_lines, so the limit only bounds
+        # how much unread output the pipe buffers before pausing the reader.
+        # Keep it large: Claude's stream-json can emit very large single lines
+        # (e.g. base64-encoded image data from Read tool results).
         process = await asyncio.create_subprocess_exec(
             *cmd,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            limit=32 * 1024 * 1024,  # 32MB readline limit
-            env=env,
+            limit=32 * 1024 * 1024,  # 32MB stream buffer
+            env=_CLAUDE_ENV,
             cwd=cwd or get_working_dir(),
+            # Own process group, so cancelling also stops the tools it spawned
+            start_new_session=True,
         )
         active_processes[conversation_id] = process
 
         new_session_id = session_id
 
-        async for raw_line in process.stdout:
-            line = raw_line.decode().strip()
-            if not line:
-                continue
-
-            try:
-                event = json.loads(line)
-            except json.JSONDecodeError:
-                continue
+        async for line in _iter_lines(process.stdout):
+            event = _parse_text_delta(line)
+            if event is None:
+                # Parse the raw bytes: both _json backends accept bytes and skip
+                # surrounding whitespace, and blank lines fail to parse.
+                try:
+                    event = _json.loads(line)
+                except ValueError:  # JSONDecodeError, or UnicodeDecodeError on bad bytes
+                    continue
 
             # Debug: log all event types to understand stream-json format
             evt_type = event.get("type", "unknown")
@@ -1567,6 +1806,7 @@ async def _run_claude(websocket: WebSocket, text: str, conversation_id: str, ses
                         "conversation_id": conversation_id,
                     })
 
+        await forwarder.flush()
         await process.wait()
 
         # Log stderr for debugging
@@ -1605,7 +1845,7 @@ async def _run_claude(websocket: WebSocket, text: str, conversation_id: str, ses
                         f"[User]: {text}"
                     )
                 await _run_claude(websocket, text, conversation_id, session_id=None,
-                                  is_first_turn=True, cwd=cwd)
+                                  is_first_turn=True, cwd=cwd, conv=conv)
                 return
 
             error_detail = "Message failed — tap to retry"
@@ -1640,12 +1880,11 @@ async def _run_claude(websocket: WebSocket, text: str, conversation_id: str, ses
             "session_id": new_session_id,
         }
         # Include current git branch so the client can update mid-session
-        conv_info = sessions.get_conversation(conversation_id)
-        if conv_info and conv_info.git_worktree_path:
+        if conv and conv.git_worktree_path:
             complete_msg["git_branch"] = f"conn/{conversation_id}"
         else:
             effective_cwd = cwd or get_working_dir()
-            branch = get_current_branch(effective_cwd)
+            branch = await _branch_for(effective_cwd)
             if branch:
                 complete_msg["git_branch"] = branch
         await _send_to_client(complete_msg)
@@ -1655,10 +1894,12 @@ async def _run_claude(websocket: WebSocket, text: str, conversation_id: str, ses
 
     except Exception as e:
         logger.exception(f"claude subprocess error: {e}")
+        await forwarder.flush()
         await _send_to_client({"type": "error", "detail": str(e), "conversation_id": conversation_id})
         await _send_to_client({"type": "message_complete", "conversation_id": conversation_id, "session_id": session_id})
     finally:
         active_processes.pop(conversation_id, None)
+        forwarder.discard()
         # Clean up temp MCP config file
         if mcp_config_path:
             try:
@@ -1667,28 +1908,28 @@ async def _run_claude(websocket: WebSocket, text: str, conversation_id: str, ses
                 pass
         # Clean up worktrees if no longer needed (no other active processes in same project)
         _maybe_cleanup_worktrees(conversation_id)
-        # Clean up lock if no longer held
-        lock = conversation_locks.get(conversation_id)
-        if lock and not lock.locked():
-            conversation_locks.pop(conversation_id, None)
 
 
-def _maybe_cleanup_worktrees(conversation_id: str):
+def _maybe_cleanup_worktrees(conversation_id: str) -> asyncio.Task | None:
     """Remove worktrees for a project if no parallel processes remain.
 
     When a process finishes, check the project directory and clean up ALL
     worktrees for that project — not just the finishing conversation's own
     worktree. This handles the case where ConvA (main dir) finishes after
     ConvB (worktree) already finished, leaving ConvB's worktree stale.
+
+    The conversations are detached right away; deleting the directories runs
+    in a background task (returned), so the caller's conversation lock is not
+    held while git works.
     """
     conv = sessions.get_conversation(conversation_id)
     if not conv:
-        return
+        return None
 
     # Determine the project directory (either original_working_dir or working_dir)
     project_dir = conv.original_working_dir or conv.working_dir
     if not project_dir:
-        return
+        return None
 
     # If any active process targets this project, worktrees are still needed
     still_active = any(
@@ -1696,13 +1937,21 @@ def _maybe_cleanup_worktrees(conversation_id: str):
         for cid, proc in active_processes.items()
     )
     if still_active:
-        return
+        return None
 
     # Clean up ALL worktrees for this project
-    for c in sessions.get_worktrees_for_project(project_dir):
-        logger.info(f"No more parallel processes for {project_dir} — removing worktree for {c.id}")
-        remove_worktree(project_dir, c.id)
+    stale = sessions.get_worktrees_for_project(project_dir)
+    if not stale:
+        return None
+    logger.info(
+        f"No more parallel processes for {project_dir} — removing worktrees for "
+        f"{', '.join(c.id for c in stale)}"
+    )
+    # Detach the conversations first so a message arriving while git runs
+    # starts in the project dir rather than a worktree being deleted.
+    for c in stale:
         sessions.update_worktree(c.id, None, None)
+    return _spawn(asyncio.to_thread(remove_worktrees, project_dir, [c.id for c in stale]))
 
 
 async def _generate_summary(conversation_id: str, user_text: str):
@@ -1724,14 +1973,13 @@ async def _generate_summary(conversation_id: str, user_text: str):
             f"Message: {user_text[:500]}"
         )
 
-        env = {k: v for k, v in os.environ.items() if k != "CLAUDECODE"}
         proc = await asyncio.create_subprocess_exec(
             "claude", "-p", prompt,
             "--output-format", "text",
             "--max-turns", "0",
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            env=env,
+            env=_CLAUDE_ENV,
             cwd="/tmp",
         )
         stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=30.0)
@@ -1783,13 +2031,26 @@ class EventForwarder:
         "mcp__playwright__browser_take_screenshot",
     }
 
-    def __init__(self, cwd: str | None = None):
+    # Coalesced text is sent early once it reaches this many characters
+    TEXT_BATCH_SIZE = 512
+
+    def __init__(self, cwd: str | None = None, coalesce: float = 0.0):
         self._saw_streaming_events = False  # Track if we got content_block events
         self._active_tool_name: str | None = None
-        self._tool_input_json: str = ""  # Accumulated input_json_delta fragments
+        # input_json_delta fragments, joined once when the block stops
+        self._tool_input_chunks: list[str] = []
+        self._tool_input_len = 0
         self._tool_start_sent: bool = False  # Whether we sent the initial tool_start
         self.image_paths: list[str] = []  # Image file paths emitted during this response
         self._cwd = cwd  # Working directory of the Claude subprocess
+        # Text-delta coalescing: when coalesce > 0, text deltas are held for up
+        # to that many seconds and sent as one text_delta message
+        self._coalesce = coalesce
+        self._pending_text: list[str] = []
+        self._pending_len = 0
+        self._pending_target: tuple | None = None  # (sender, conversation_id)
+        self._flush_timer: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
 
     async def forward(self, websocket: WebSocket, event: dict, conversation_id: str) -> dict | None:
         """Forward event to a specific WebSocket (used by send-image and tests)."""
@@ -1801,15 +2062,66 @@ class EventForwarder:
         """Forward event to the latest connected client (survives reconnects)."""
         return await self._forward_impl(_send_to_client, event, conversation_id)
 
+    async def flush(self):
+        """Send any coalesced text now. Call before the response ends."""
+        async with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending_text:
+                return
+            text = "".join(self._pending_text)
+            self._pending_text.clear()
+            self._pending_len = 0
+            sender, conversation_id = self._pending_target
+            await sender({"type": "text_delta", "text": text, "conversation_id": conversation_id})
+
+    def discard(self):
+        """Drop coalesced text that was never sent and stop its flush timer.
+
+        Called when a turn ends without a final flush (e.g. it was cancelled),
+        so held text can't reach the client after the turn is over.
+        """
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self._pending_text.clear()
+        self._pending_len = 0
+
+    async def _flush_later(self):
+        await asyncio.sleep(self._coalesce)
+        self._flush_timer = None
+        await self.flush()
+
+    async def _queue_text(self, sender, text: str, conversation_id: str):
+        self._pending_text.append(text)
+        self._pending_len += len(text)
+        self._pending_target = (sender, conversation_id)
+        if self._pending_len >= self.TEXT_BATCH_SIZE:
+            await self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = _spawn(self._flush_later())
+
     async def _forward_impl(self, sender, event: dict, conversation_id: str) -> dict | None:
         event_type = event.get("type")
 
+        if self._coalesce:
+            delta = event.get("delta", {}) if event_type == "content_block_delta" else {}
+            if delta.get("type") == "text_delta":
+                self._saw_streaming_events = True
+                await self._queue_text(sender, delta.get("text", ""), conversation_id)
+                return None
+            # Anything else must not overtake text that is still held back
+            if self._pending_text:
+                await self.flush()
+
         if event_type == "content_block_start":
             self._saw_streaming_events = True
             block = event.get("content_block", {})
             if block.get("type") == "tool_use":
                 self._active_tool_name = block.get("name", "")
-                self._tool_input_json = ""
+                self._tool_input_chunks = []
+                self._tool_input_len = 0
                 self._tool_start_sent = False
                 tool_input = block.get("input", {})
                 summary = _summarize_tool_input(self._active_tool_name, tool_input)
@@ -1829,15 +2141,16 @@ class EventForwarder:
 
         elif event_type == "content_block_stop":
             if self._active_tool_name is not None:
+                tool_input_json = "".join(self._tool_input_chunks)
                 # If we haven't sent tool_start yet, send it now with accumulated input
                 if not self._tool_start_sent:
                     summary = ""
-                    if self._tool_input_json:
+                    if tool_input_json:
                         try:
-                            input_data = json.loads(self._tool_input_json)
+                            input_data = _json.loads(tool_input_json)
                             summary = _summarize_tool_input(self._active_tool_name, input_data)
                         except json.JSONDecodeError:
-                            summary = self._tool_input_json[:80]
+                            summary = tool_input_json[:80]
                     start_out = {
                         "type": "tool_start",
                         "tool": self._active_tool_name,
@@ -1848,7 +2161,7 @@ class EventForwarder:
 
                 # Detect screenshot tools and emit image event
                 if self._active_tool_name in self.SCREENSHOT_TOOLS:
-                    image_path = _extract_screenshot_path(self._tool_input_json)
+                    image_path = _extract_screenshot_path(tool_input_json)
                     if image_path:
                         # Resolve relative paths against the Claude subprocess cwd
                         resolved = Path(image_path)
@@ -1863,7 +2176,8 @@ class EventForwarder:
                         })
 
                 self._active_tool_name = None
-                self._tool_input_json = ""
+                self._tool_input_chunks = []
+                self._tool_input_len = 0
                 self._tool_start_sent = False
                 out = {"type": "tool_done", "conversation_id": conversation_id}
                 await sender(out)
@@ -1883,11 +2197,16 @@ class EventForwarder:
                 return out
             elif delta.get("type") == "input_json_delta" and self._active_tool_name:
                 # Accumulate tool input fragments
-                self._tool_input_json += delta.get("partial_json", "")
-                # Once we have enough to parse, send tool_start with summary
-                if not self._tool_start_sent and len(self._tool_input_json) > 5:
+                fragment = delta.get("partial_json", "")
+                self._tool_input_chunks.append(fragment)
+                self._tool_input_len += len(fragment)
+                # Once we have enough to parse, send tool_start with summary.
+                # The input is a JSON object, so it can only be complete when
+                # the latest fragment ends in "}" — skip the join otherwise.
+                if (not self._tool_start_sent and self._tool_input_len > 5
+                        and fragment.rstrip().endswith("}")):
                     try:
-                        input_data = json.loads(self._tool_input_json)
+                        input_data = _json.loads("".join(self._tool_input_chunks))
                         summary = _summarize_tool_input(self._active_tool_name, input_data)
                         if summary:
                             self._tool_start_sent = True
@@ -1998,7 +2317,7 @@ def _extract_screenshot_path(tool_input_json: str) -> str | None:
     if not tool_input_json:
         return None
     try:
-        input_data = json.loads(tool_input_json)
+        input_data = _json.loads(tool_input_json)
     except json.JSONDecodeError:
         return None
     filename = input_data.get("filename")
@@ -2010,25 +2329,80 @@ def _extract_screenshot_path(tool_input_json: str) -> str | None:
 MAX_WS_MESSAGE_SIZE = 1 * 1024 * 1024  # 1MB — safety cap for WebSocket messages
 
 
+def _serialize(data: dict) -> str | None:
+    """Serialize an outbound message, or None if it exceeds MAX_WS_MESSAGE_SIZE."""
+    payload = _json.dumps(data)
+    if len(payload) > MAX_WS_MESSAGE_SIZE:
+        logger.warning(f"Dropping oversized WebSocket message ({len(payload)} bytes, type={data.get('type')})")
+        return None
+    return payload.decode()
+
+
+# Fixed replies sent from several handlers, serialized once at import
+_AUTH_OK = _serialize({"type": "auth_ok"})
+_ERR_INVALID_TOKEN = _serialize({"type": "error", "detail": "Invalid token"})
+_ERR_NOT_AUTHENTICATED = _serialize({"type": "error", "detail": "Not authenticated"})
+_ERR_EMPTY_MESSAGE = _serialize({"type": "error", "detail": "Empty message"})
+_ERR_INVALID_CONVERSATION_ID = _serialize({"type": "error", "detail": "Invalid conversation ID format"})
+_ERR_MISSING_CONVERSATION_ID = _serialize({"type": "error", "detail": "Missing conversation_id"})
+_ERR_CONVERSATION_NOT_FOUND = _serialize({"type": "error", "detail": "Conversation not found"})
+_ERR_NO_ACTIVE_PROCESS = _serialize({"type": "error", "detail": "No active process to cancel"})
+
+
 async def _send(websocket: WebSocket, data: dict):
     """Send JSON to WebSocket if still connected."""
+    if websocket.client_state != WebSocketState.CONNECTED:
+        return
+    payload = _serialize(data)
+    if payload is not None:
+        await _send_raw(websocket, payload)
+
+
+async def _send_raw(websocket: WebSocket, payload: str):
+    """Send an already-serialized JSON message if still connected."""
     if websocket.client_state != WebSocketState.CONNECTED:
         return
     try:
-        payload = json.dumps(data)
-        if len(payload) > MAX_WS_MESSAGE_SIZE:
-            logger.warning(f"Dropping oversized WebSocket message ({len(payload)} bytes, type={data.get('type')})")
-            return
         await websocket.send_text(payload)
     except (WebSocketDisconnect, RuntimeError):
         pass
 
 
+def _broadcast(*events: dict):
+    """Queue events for every connected client without waiting on any socket.
+
+    Each event is serialized once, however many clients there are.
+
+    A client whose outbox is full is too far behind to catch up — it is
+    dropped and closed so it reconnects and resyncs.
+    """
+    payloads = [p for p in map(_serialize, events) if p is not None]
+    for ws in list(connected_clients):
+        outbox = client_outboxes.get(id(ws))
+        if outbox is None:
+            continue
+        try:
+            for payload in payloads:
+                outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            logger.warning("Dropping slow WebSocket client (broadcast queue full)")
+            connected_clients.pop(ws, None)
+            client_outboxes.pop(id(ws), None)
+            _spawn(_close_quietly(ws, code=1013, reason="Too slow"))
+
+
+async def _close_quietly(websocket: WebSocket, code: int, reason: str):
+    try:
+        await websocket.close(code=code, reason=reason)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+
+
 async def _send_to_client(data: dict):
     """Send JSON to the latest connected client (survives reconnects)."""
     if not connected_clients:
         return
-    ws = connected_clients[-1]
+    ws = next(reversed(connected_clients))
     await _send(ws, data)
 
 
@@ -2042,4 +2416,5 @@ if __name__ == "__main__":
         port=get_port(),
         ssl_keyfile=str(key_path),
         ssl_certfile=str(cert_path),
+        loop=get_event_loop_impl(),
     )
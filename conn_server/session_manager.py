@@ -34,6 +34,9 @@ class Conversation:
 class SessionManager:
     def __init__(self):
         self._conversations: dict[str, Conversation] = {}
+        # Bumped whenever a conversation is added or removed, so callers can
+        # cache data derived from the conversation set.
+        self.mutation_counter = 0
         self._load()
 
     def _load(self):
@@ -82,6 +85,7 @@ class SessionManager:
             effort=effort,
         )
         self._conversations[conversation_id] = conv
+        self.mutation_counter += 1
         self._save()
         return conv
 
@@ -136,6 +140,7 @@ class SessionManager:
     def delete_conversation(self, conversation_id: str) -> bool:
         if conversation_id in self._conversations:
             del self._conversations[conversation_id]
+            self.mutation_counter += 1
             self._save()
             # Delete history file
             history_file = HISTORY_DIR / f"{conversation_id}.jsonl"
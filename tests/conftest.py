@@ -1,17 +1,18 @@
 """Shared test fixtures for the Conn server test suite."""
 
 import json
-import os
 import sys
 import tempfile
 from pathlib import Path
-from unittest.mock import patch
 
 import pytest
 
+from conn_server import agent_manager, config, git_utils, mcp_config, project_config, server, session_manager
+from conn_server.config import invalidate_config_cache
+
 
 @pytest.fixture
-def tmp_config_dir(tmp_path):
+def tmp_config_dir(tmp_path, monkeypatch):
     """Create a temporary config directory and patch config module paths."""
     sessions_file = tmp_path / "sessions.json"
     history_dir = tmp_path / "history"
@@ -45,45 +46,53 @@ def tmp_config_dir(tmp_path):
     (tmp_path / "projects").mkdir()
 
     # Clear env var overrides so tests use the patched config values
-    env_overrides = patch.dict(os.environ, {}, clear=False)
     for key in ("CONN_WORKING_DIR", "CONN_HOST", "CONN_PORT"):
-        os.environ.pop(key, None)
+        monkeypatch.delenv(key, raising=False)
+
+    # Patch in every module that imported a path constant at the top level
+    # (e.g. session_manager imports SESSIONS_FILE and HISTORY_DIR).
+    overrides = [
+        (config, "CONFIG_DIR", tmp_path),
+        (config, "CONFIG_FILE", config_file),
+        (config, "SESSIONS_FILE", sessions_file),
+        (config, "HISTORY_DIR", history_dir),
+        (config, "UPLOADS_DIR", uploads_dir),
+        (config, "LOG_DIR", log_dir),
+        (config, "WORKTREES_DIR", worktrees_dir),
+        (config, "WORKING_DIR", str(tmp_path / "projects")),
+        (config, "RELEASES_DIR", releases_dir),
+        (config, "PROJECTS_CONFIG_DIR", projects_config_dir),
+        (session_manager, "SESSIONS_FILE", sessions_file),
+        (session_manager, "HISTORY_DIR", history_dir),
+        (mcp_config, "MCP_SERVERS_FILE", mcp_servers_file),
+        (agent_manager, "AGENTS_DIR", agents_dir),
+        (project_config, "PROJECTS_CONFIG_DIR", projects_config_dir),
+        (server, "UPLOADS_DIR", uploads_dir),
+        (server, "RELEASES_DIR", releases_dir),
+        (server, "LOG_DIR", log_dir),
+        (git_utils, "WORKTREES_DIR", worktrees_dir),
+    ]
+    for module, attr, value in overrides:
+        monkeypatch.setattr(module, attr, value)
 
-    # Patch in both config and session_manager modules, since session_manager
-    # imports SESSIONS_FILE and HISTORY_DIR at the top level.
-    with patch("conn_server.config.CONFIG_DIR", tmp_path), \
-         patch("conn_server.config.CONFIG_FILE", config_file), \
-         patch("conn_server.config.SESSIONS_FILE", sessions_file), \
-         patch("conn_server.config.HISTORY_DIR", history_dir), \
-         patch("conn_server.config.UPLOADS_DIR", uploads_dir), \
-         patch("conn_server.config.LOG_DIR", log_dir), \
-         patch("conn_server.config.WORKTREES_DIR", worktrees_dir), \
-         patch("conn_server.config.WORKING_DIR", str(tmp_path / "projects")), \
-         patch("conn_server.session_manager.SESSIONS_FILE", sessions_file), \
-         patch("conn_server.session_manager.HISTORY_DIR", history_dir), \
-         patch("conn_server.mcp_config.MCP_SERVERS_FILE", mcp_servers_file), \
-         patch("conn_server.agent_manager.AGENTS_DIR", agents_dir), \
-         patch("conn_server.config.RELEASES_DIR", releases_dir), \
-         patch("conn_server.config.PROJECTS_CONFIG_DIR", projects_config_dir), \
-         patch("conn_server.project_config.PROJECTS_CONFIG_DIR", projects_config_dir), \
-         patch("conn_server.server.UPLOADS_DIR", uploads_dir), \
-         patch("conn_server.server.RELEASES_DIR", releases_dir), \
-         patch("conn_server.server.LOG_DIR", log_dir), \
-         patch("conn_server.git_utils.WORKTREES_DIR", worktrees_dir):
-        yield {
-            "dir": tmp_path,
-            "token": token,
-            "sessions_file": sessions_file,
-            "history_dir": history_dir,
-            "uploads_dir": uploads_dir,
-            "worktrees_dir": worktrees_dir,
-            "mcp_servers_file": mcp_servers_file,
-            "agents_dir": agents_dir,
-            "projects_dir": tmp_path / "projects",
-            "releases_dir": releases_dir,
-            "projects_config_dir": projects_config_dir,
-            "config_file": config_file,
-        }
+    # load_config() caches the parsed file — drop anything read from the
+    # previous test's (or the real) config dir.
+    invalidate_config_cache()
+    yield {
+        "dir": tmp_path,
+        "token": token,
+        "sessions_file": sessions_file,
+        "history_dir": history_dir,
+        "uploads_dir": uploads_dir,
+        "worktrees_dir": worktrees_dir,
+        "mcp_servers_file": mcp_servers_file,
+        "agents_dir": agents_dir,
+        "projects_dir": tmp_path / "projects",
+        "releases_dir": releases_dir,
+        "projects_config_dir": projects_config_dir,
+        "config_file": config_file,
+    }
+    invalidate_config_cache()
 
 
 @pytest.fixture
@@ -35,6 +35,52 @@ class TestParseFrontmatter:
         fm, _ = _parse_frontmatter(content)
         assert fm["tools"] == "Read, Grep, Glob"
 
+    def test_skips_comments_and_blank_lines(self):
+        content = "---\n# comment\n\nname: test\nnot a pair\ndescription: desc\n---\nBody"
+        fm, body = _parse_frontmatter(content)
+        assert fm == {"name": "test", "description": "desc"}
+        assert body.strip() == "Body"
+
+    def test_keys_split_on_first_colon(self):
+        content = "---\nname: test\nx.custom-key: a: b\n# skipped: yes\n  # also: skipped\n---\n"
+        fm, _ = _parse_frontmatter(content)
+        assert fm == {"name": "test", "x.custom-key": "a: b"}
+
+    def test_block_list_uses_yaml(self):
+        pytest.importorskip("yaml")
+        content = "---\nname: test\ndescription: desc\ntools:\n  - Read\n  - Grep\n---\nBody"
+        fm, body = _parse_frontmatter(content)
+        assert fm["tools"] == ["Read", "Grep"]
+        assert fm["name"] == "test"
+        assert body.strip() == "Body"
+
+    def test_block_list_keeps_scalars_as_flat_strings(self):
+        pytest.importorskip("yaml")
+        content = "---\nname: test\ndescription: Fix issue #12\nmodel: on\ntools:\n  - Read\n---\n"
+        fm, _ = _parse_frontmatter(content)
+        assert fm["description"] == "Fix issue #12"
+        assert fm["model"] == "on"
+        assert fm["tools"] == ["Read"]
+
+    def test_empty_value_next_to_block_list(self):
+        pytest.importorskip("yaml")
+        content = "---\nname: test\ndescription:\ntools:\n  - Read\n  - Grep\n---\n"
+        fm, _ = _parse_frontmatter(content)
+        assert fm["description"] == ""
+        assert fm["tools"] == ["Read", "Grep"]
+
+    def test_dashes_inside_value(self):
+        content = "---\nname: test\ndescription: before---after\n---\nBody"
+        fm, body = _parse_frontmatter(content)
+        assert fm["description"] == "before---after"
+        assert body.strip() == "Body"
+
+    def test_bytes_input(self):
+        content = "---\nname: test\ndescription: café\n---\nBody é".encode()
+        fm, body = _parse_frontmatter(content)
+        assert fm["description"] == "café"
+        assert body == "\nBody é"
+
 
 class TestAgentManager:
     @pytest.fixture
@@ -54,6 +100,9 @@ class TestAgentManager:
     def test_list_empty(self, manager):
         assert manager.list_agents() == []
 
+    def test_list_missing_dir(self, tmp_path):
+        assert AgentManager(agents_dir=tmp_path / "missing").list_agents() == []
+
     def test_create_and_list(self, manager, sample_agent):
         manager.create_agent(sample_agent)
         agents = manager.list_agents()
@@ -168,6 +217,15 @@ You are an expert debugger. Fix bugs efficiently.
         # Should not crash, may include file with empty description
         assert isinstance(agents, list)
 
+    def test_list_reads_frontmatter_past_first_chunk(self, manager, tmp_config_dir):
+        """Frontmatter longer than one header read is still parsed fully."""
+        long_desc = "x" * 10000
+        (tmp_config_dir["agents_dir"] / "long.md").write_text(
+            f"---\nname: long\ndescription: {long_desc}\nmodel: opus\n---\n\nPrompt"
+        )
+        agents = manager.list_agents()
+        assert agents == [{"name": "long", "description": long_desc, "model": "opus"}]
+
     def test_list_ignores_non_md_files(self, manager, tmp_config_dir):
         (tmp_config_dir["agents_dir"] / "notes.txt").write_text("not an agent")
         assert manager.list_agents() == []
@@ -208,6 +266,16 @@ class TestValidation:
         with pytest.raises(ValueError, match="Invalid permission mode"):
             manager.create_agent(agent)
 
+    def test_invalid_name_too_long(self, manager):
+        agent = AgentInfo(name="a" * 65, description="test")
+        with pytest.raises(ValueError, match="Invalid agent name"):
+            manager.create_agent(agent)
+
+    def test_invalid_name_trailing_newline(self, manager):
+        agent = AgentInfo(name="agent\n", description="test")
+        with pytest.raises(ValueError, match="Invalid agent name"):
+            manager.create_agent(agent)
+
     def test_valid_name_with_hyphens(self, manager):
         agent = AgentInfo(name="my-code-reviewer", description="test")
         result = manager.create_agent(agent)
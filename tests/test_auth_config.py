@@ -8,7 +8,10 @@ from unittest.mock import patch
 import pytest
 
 from conn_server.auth import verify_token
-from conn_server.config import load_config, get_auth_token, get_working_dir, get_port, get_host, print_startup_banner
+from conn_server.config import (
+    load_config, get_auth_token, get_working_dir, get_port, get_host, get_all, print_startup_banner,
+    get_event_loop_impl, invalidate_config_cache,
+)
 
 
 class TestVerifyToken:
@@ -21,6 +24,9 @@ class TestVerifyToken:
     def test_empty_token(self, tmp_config_dir):
         assert verify_token("") is False
 
+    def test_non_ascii_token(self, tmp_config_dir):
+        assert verify_token("tëst-token-abc123") is False
+
 
 class TestLoadConfig:
     def test_loads_existing_config(self, tmp_config_dir):
@@ -39,7 +45,9 @@ class TestLoadConfig:
              patch("conn_server.config.LOG_DIR", tmp_path / "logs"), \
              patch("conn_server.config.RELEASES_DIR", tmp_path / "releases"), \
              patch("conn_server.config.PROJECTS_CONFIG_DIR", tmp_path / "projects"):
+            invalidate_config_cache()
             config = load_config()
+        invalidate_config_cache()
 
         assert config_file.exists()
         assert len(config["auth_token"]) == 64  # hex(32) = 64 chars
@@ -55,10 +63,25 @@ class TestLoadConfig:
              patch("conn_server.config.LOG_DIR", tmp_path / "logs"), \
              patch("conn_server.config.RELEASES_DIR", tmp_path / "releases"), \
              patch("conn_server.config.PROJECTS_CONFIG_DIR", tmp_path / "projects"):
+            invalidate_config_cache()
             config1 = load_config()
+            invalidate_config_cache()
             config2 = load_config()
 
         assert config1["auth_token"] == config2["auth_token"]
+        invalidate_config_cache()
+
+    def test_caches_parsed_config(self, tmp_config_dir):
+        config1 = load_config()
+        tmp_config_dir["config_file"].write_text(json.dumps({"auth_token": "changed"}))
+        assert load_config() is config1
+        assert get_auth_token() == tmp_config_dir["token"]
+
+    def test_invalidate_rereads_file(self, tmp_config_dir):
+        load_config()
+        tmp_config_dir["config_file"].write_text(json.dumps({"auth_token": "changed"}))
+        invalidate_config_cache()
+        assert get_auth_token() == "changed"
 
 
 class TestConfigHelpers:
@@ -75,6 +98,15 @@ class TestConfigHelpers:
     def test_get_host(self, tmp_config_dir):
         assert get_host() == "0.0.0.0"
 
+    def test_get_all(self, tmp_config_dir):
+        assert get_all() == ("0.0.0.0", 8080, str(tmp_config_dir["projects_dir"]), tmp_config_dir["token"])
+
+    def test_event_loop_prefers_uvloop(self):
+        with patch("conn_server.config.importlib.util.find_spec", return_value=object()):
+            assert get_event_loop_impl() == "uvloop"
+        with patch("conn_server.config.importlib.util.find_spec", return_value=None):
+            assert get_event_loop_impl() == "asyncio"
+
 
 class TestEnvVarOverrides:
     def test_conn_working_dir_env(self, tmp_config_dir):
@@ -89,6 +121,11 @@ class TestEnvVarOverrides:
         with patch.dict(os.environ, {"CONN_HOST": "127.0.0.1"}):
             assert get_host() == "127.0.0.1"
 
+    def test_conn_local_ip_env(self):
+        from conn_server.config import _get_local_ip
+        with patch.dict(os.environ, {"CONN_LOCAL_IP": "192.168.1.50"}):
+            assert _get_local_ip() == "192.168.1.50"
+
     def test_env_takes_precedence_over_config(self, tmp_config_dir):
         """Env vars override config file values."""
         with patch.dict(os.environ, {"CONN_WORKING_DIR": "/override"}):
@@ -116,7 +153,9 @@ class TestStartupBanner:
              patch("conn_server.config.LOG_DIR", tmp_path / "logs"), \
              patch("conn_server.config.RELEASES_DIR", tmp_path / "releases"), \
              patch("conn_server.config.PROJECTS_CONFIG_DIR", tmp_path / "projects"):
+            invalidate_config_cache()
             print_startup_banner()
+        invalidate_config_cache()
         output = capsys.readouterr().out
         assert "Config generated" in output
 
@@ -173,3 +212,21 @@ class TestBuildPrompt:
         assert "attached an image" in result
         assert "attached a file (doc.pdf)" in result
         assert "review" in result
+
+
+class TestConnSystemPrompt:
+    def test_includes_machine_and_rules(self):
+        from conn_server.server import _conn_system_prompt
+        prompt = _conn_system_prompt("Mac Mini")
+        assert "MACHINE: Mac Mini\n\nWEB APP PREVIEW" in prompt
+        assert "LOCAL MODEL DELEGATION" not in prompt
+
+    def test_local_model_section(self):
+        from conn_server.server import _conn_system_prompt
+        prompt = _conn_system_prompt("Mac Mini", "/opt/opencode", 90)
+        assert "/opt/opencode run --format json" in prompt
+        assert "- Timeout: 90s" in prompt
+
+    def test_reused_across_turns(self):
+        from conn_server.server import _conn_system_prompt
+        assert _conn_system_prompt("Mac Mini") is _conn_system_prompt("Mac Mini")
@@ -0,0 +1,221 @@
+"""Tests for CLI helpers that don't need a running service."""
+
+import io
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from conn_server import cli
+
+
+class _FakeClock:
+    """Stands in for the time module: sleep() advances monotonic() instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestWaitForHealth:
+    def test_returns_as_soon_as_healthy(self):
+        clock = _FakeClock()
+        with patch.object(cli, "time", clock), \
+             patch.object(cli, "_health_check", side_effect=[False, False, True]) as check:
+            assert cli._wait_for_health(timeout=10) is True
+        assert check.call_count == 3
+        assert clock.sleeps == [0.05, 0.1]
+
+    def test_returns_false_after_timeout(self):
+        clock = _FakeClock()
+        with patch.object(cli, "time", clock), \
+             patch.object(cli, "_health_check", return_value=False):
+            assert cli._wait_for_health(timeout=3) is False
+        assert clock.now == pytest.approx(3)
+
+    def test_delay_stays_between_50ms_and_500ms(self):
+        clock = _FakeClock()
+        with patch.object(cli, "time", clock), \
+             patch.object(cli, "_health_check", return_value=False):
+            cli._wait_for_health(timeout=10)
+        # The last sleep may be cut short by the deadline
+        assert all(0.05 <= s <= 0.5 for s in clock.sleeps[:-1])
+        assert clock.sleeps[0] == 0.05
+        assert max(clock.sleeps) == 0.5
+
+
+class TestHealthCheck:
+    def _check(self, conn):
+        with patch.object(cli, "get_port", return_value=8443), \
+             patch("http.client.HTTPSConnection", return_value=conn) as cls:
+            result = cli._health_check()
+        assert cls.call_args.args == ("localhost", 8443)
+        conn.close.assert_called_once()
+        return result
+
+    def test_ok_response(self):
+        conn = MagicMock()
+        conn.getresponse.return_value.status = 200
+        assert self._check(conn) is True
+        conn.request.assert_called_once_with("GET", "/health")
+
+    def test_error_status(self):
+        conn = MagicMock()
+        conn.getresponse.return_value.status = 503
+        assert self._check(conn) is False
+
+    def test_connection_refused(self):
+        conn = MagicMock()
+        conn.request.side_effect = ConnectionRefusedError
+        assert self._check(conn) is False
+
+    def test_os_error(self):
+        conn = MagicMock()
+        conn.getresponse.side_effect = OSError("TLS handshake failed")
+        assert self._check(conn) is False
+
+
+class TestTailLines:
+    def _tail(self, tmp_path, data: bytes, n: int) -> list[bytes]:
+        path = tmp_path / "server.log"
+        path.write_bytes(data)
+        with open(path, "rb") as f:
+            lines = cli._tail_lines(f, n)
+            assert f.tell() == len(data)  # Left at EOF, ready to follow
+        return lines
+
+    def test_last_n_lines(self, tmp_path):
+        data = b"".join(b"line %d\n" % i for i in range(100))
+        assert self._tail(tmp_path, data, 3) == [b"line 97\n", b"line 98\n", b"line 99\n"]
+
+    def test_fewer_lines_than_requested(self, tmp_path):
+        assert self._tail(tmp_path, b"a\nb\n", 10) == [b"a\n", b"b\n"]
+
+    def test_no_trailing_newline(self, tmp_path):
+        assert self._tail(tmp_path, b"a\nb\nc", 2) == [b"b\n", b"c"]
+
+    def test_lines_span_read_blocks(self, tmp_path):
+        # 3000-byte lines straddle the 4096-byte read blocks
+        lines = [bytes([ord("a") + i]) * 2999 + b"\n" for i in range(6)]
+        assert self._tail(tmp_path, b"".join(lines), 3) == lines[-3:]
+
+    def test_empty_file(self, tmp_path):
+        assert self._tail(tmp_path, b"", 10) == []
+
+
+class TestFollow:
+    def test_copies_appended_data(self, tmp_path):
+        path = tmp_path / "server.log"
+        path.write_bytes(b"old\n")
+        out = io.BytesIO()
+        with open(path, "rb") as f:
+            f.seek(0, io.SEEK_END)
+            with open(path, "ab") as w:
+                w.write(b"new\n")
+            with patch.object(cli.time, "sleep", side_effect=KeyboardInterrupt) as sleep, \
+                 pytest.raises(KeyboardInterrupt):
+                cli._follow(f, out, interval=0.25)
+        assert out.getvalue() == b"new\n"
+        sleep.assert_called_once_with(0.25)
+
+    def test_restarts_after_truncation(self, tmp_path):
+        path = tmp_path / "server.log"
+        path.write_bytes(b"before rotation\n")
+        out = io.BytesIO()
+        with open(path, "rb") as f:
+            f.seek(0, io.SEEK_END)
+            path.write_bytes(b"after\n")
+            with patch.object(cli.time, "sleep", side_effect=KeyboardInterrupt), \
+                 pytest.raises(KeyboardInterrupt):
+                cli._follow(f, out)
+        assert out.getvalue() == b"after\n"
+
+
+class _FakeJournalReader:
+    """A cursor over a list of entries, shaped like systemd.journal.Reader."""
+
+    def __init__(self, entries, arrivals):
+        self.entries = entries
+        self.arrivals = arrivals  # batches appended by successive wait() calls
+        self.pos = 0  # index of the current entry; len(entries) after seek_tail
+        self.matches = []
+
+    def add_match(self, **kwargs):
+        self.matches.append(kwargs)
+
+    def seek_tail(self):
+        self.pos = len(self.entries)
+
+    def get_previous(self):
+        if self.pos == 0:
+            return {}
+        self.pos -= 1
+        return self.entries[self.pos]
+
+    def get_next(self, skip=1):
+        if self.pos + skip >= len(self.entries):
+            # Past the end: park on the newest entry so later arrivals come next
+            self.pos = len(self.entries) - 1
+            return {}
+        self.pos += skip
+        return self.entries[self.pos]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        entry = self.get_next()
+        if not entry:
+            raise StopIteration
+        return entry
+
+    def wait(self):
+        if not self.arrivals:
+            raise KeyboardInterrupt
+        self.entries.extend(self.arrivals.pop(0))
+
+
+class TestFollowJournal:
+    def _run(self, entries, arrivals, n):
+        reader = _FakeJournalReader(
+            [{"MESSAGE": m} for m in entries],
+            [[{"MESSAGE": m} for m in batch] for batch in arrivals],
+        )
+        journal = MagicMock()
+        journal.Reader.return_value = reader
+        with pytest.raises(KeyboardInterrupt):
+            cli._follow_journal(journal, n)
+        assert reader.matches == [{"_SYSTEMD_UNIT": "conn.service"}]
+
+    def test_prints_last_n_then_follows(self, capsys):
+        self._run(["one", "two", "three", "four", "five"], [["six"], ["seven", "eight"]], 3)
+        assert capsys.readouterr().out.split() == ["three", "four", "five", "six", "seven", "eight"]
+
+    def test_fewer_entries_than_requested(self, capsys):
+        self._run(["one", "two"], [["three"]], 50)
+        assert capsys.readouterr().out.split() == ["one", "two", "three"]
+
+    def test_single_entry_history(self, capsys):
+        self._run(["one", "two"], [["three"]], 1)
+        assert capsys.readouterr().out.split() == ["two", "three"]
+
+    def test_empty_journal(self, capsys):
+        self._run([], [["first"]], 50)
+        assert capsys.readouterr().out.split() == ["first"]
+
+
+class TestMain:
+    def test_version_subcommand(self, capsys):
+        cli.main(["version"])
+        assert capsys.readouterr().out == f"conn-server {cli.__version__}\n"
+
+    def test_unregistered_version_flag_is_rejected(self, capsys):
+        with pytest.raises(SystemExit):
+            cli.main(["--version"])
+        assert "unrecognized arguments" in capsys.readouterr().err
@@ -1,6 +1,7 @@
 """Tests for per-conversation process management and concurrency."""
 
 import asyncio
+import signal
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -19,6 +20,13 @@ def clean_global_state():
     srv.conversation_locks.clear()
 
 
+@pytest.fixture(autouse=True)
+def killpg():
+    """Record process-group signals instead of sending them."""
+    with patch.object(srv.os, "killpg") as mock:
+        yield mock
+
+
 class TestConversationLocks:
     def test_creates_new_lock(self):
         lock = srv._get_conversation_lock("conv_1")
@@ -51,38 +59,76 @@ class TestCancelConversationProcess:
         assert result is False
 
     @pytest.mark.asyncio
-    async def test_cancel_running_process_terminates(self):
+    async def test_cancel_running_process_terminates(self, killpg):
         proc = MagicMock()
+        proc.pid = 1234
         proc.returncode = None  # Still running
-        proc.terminate = MagicMock()
-        proc.kill = MagicMock()
-
-        wait_future = asyncio.get_event_loop().create_future()
-        wait_future.set_result(None)
         proc.wait = AsyncMock(return_value=None)
 
         srv.active_processes["conv_1"] = proc
         result = await srv._cancel_conversation_process("conv_1")
         assert result is True
-        proc.terminate.assert_called_once()
+        killpg.assert_called_once_with(1234, signal.SIGTERM)
+
+    @pytest.mark.asyncio
+    async def test_cancel_kills_group_after_timeout(self, killpg):
+        proc = MagicMock()
+        proc.pid = 1234
+        proc.returncode = None
+        proc.wait = AsyncMock(return_value=None)
+
+        async def time_out(aw, timeout):
+            aw.close()  # never awaited, so close it to avoid a "never awaited" warning
+            raise asyncio.TimeoutError
+
+        srv.active_processes["conv_1"] = proc
+        with patch.object(srv.asyncio, "wait_for", time_out):
+            await srv._cancel_conversation_process("conv_1")
+        assert [c.args for c in killpg.call_args_list] == [(1234, signal.SIGTERM), (1234, signal.SIGKILL)]
+
+    @pytest.mark.asyncio
+    async def test_cancel_tolerates_exited_group(self, killpg):
+        killpg.side_effect = ProcessLookupError
+        proc = MagicMock()
+        proc.pid = 1234
+        proc.returncode = None
+        proc.wait = AsyncMock(return_value=None)
+
+        srv.active_processes["conv_1"] = proc
+        assert await srv._cancel_conversation_process("conv_1") is True
 
     @pytest.mark.asyncio
-    async def test_cancel_does_not_affect_other_conversations(self):
+    async def test_cancel_does_not_affect_other_conversations(self, killpg):
         proc1 = MagicMock()
+        proc1.pid = 1001
         proc1.returncode = None
-        proc1.terminate = MagicMock()
         proc1.wait = AsyncMock(return_value=None)
 
         proc2 = MagicMock()
+        proc2.pid = 1002
         proc2.returncode = None
-        proc2.terminate = MagicMock()
 
         srv.active_processes["conv_1"] = proc1
         srv.active_processes["conv_2"] = proc2
 
         await srv._cancel_conversation_process("conv_1")
-        proc1.terminate.assert_called_once()
-        proc2.terminate.assert_not_called()
+        killpg.assert_called_once_with(1001, signal.SIGTERM)
+
+
+class TestSpawn:
+    @pytest.mark.asyncio
+    async def test_keeps_task_referenced_until_done(self):
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+
+        task = srv._spawn(work())
+        assert task in srv.background_tasks
+        release.set()
+        await task
+        await asyncio.sleep(0)  # let the done callback run
+        assert task not in srv.background_tasks
 
 
 class TestCancelAllProcesses:
@@ -92,27 +138,25 @@ class TestCancelAllProcesses:
         # Should not raise
 
     @pytest.mark.asyncio
-    async def test_cancel_all_terminates_all(self):
-        procs = {}
+    async def test_cancel_all_terminates_all(self, killpg):
         for i in range(3):
             proc = MagicMock()
+            proc.pid = 1000 + i
             proc.returncode = None
-            proc.terminate = MagicMock()
             proc.wait = AsyncMock(return_value=None)
             srv.active_processes[f"conv_{i}"] = proc
-            procs[f"conv_{i}"] = proc
 
         await srv._cancel_all_processes()
-        for cid, proc in procs.items():
-            proc.terminate.assert_called_once()
+        signalled = sorted(c.args for c in killpg.call_args_list)
+        assert signalled == [(1000 + i, signal.SIGTERM) for i in range(3)]
 
 
 class TestHandleCancel:
     @pytest.mark.asyncio
-    async def test_cancel_with_conversation_id(self):
+    async def test_cancel_with_conversation_id(self, killpg):
         proc = MagicMock()
+        proc.pid = 1234
         proc.returncode = None
-        proc.terminate = MagicMock()
         proc.wait = AsyncMock(return_value=None)
         srv.active_processes["conv_1"] = proc
 
@@ -120,7 +164,7 @@ class TestHandleCancel:
         ws.client_state = WebSocketState.CONNECTED
 
         await srv._handle_cancel(ws, {"conversation_id": "conv_1"})
-        proc.terminate.assert_called_once()
+        killpg.assert_called_once_with(1234, signal.SIGTERM)
         # Should have sent a cancelled event with conversation_id
         ws.send_text.assert_called()
         import json
@@ -129,22 +173,20 @@ class TestHandleCancel:
         assert sent["conversation_id"] == "conv_1"
 
     @pytest.mark.asyncio
-    async def test_cancel_without_conversation_id_cancels_all(self):
-        procs = {}
-        for cid in ["conv_1", "conv_2"]:
+    async def test_cancel_without_conversation_id_cancels_all(self, killpg):
+        for pid, cid in enumerate(["conv_1", "conv_2"], start=1001):
             proc = MagicMock()
+            proc.pid = pid
             proc.returncode = None
-            proc.terminate = MagicMock()
             proc.wait = AsyncMock(return_value=None)
             srv.active_processes[cid] = proc
-            procs[cid] = proc
 
         ws = AsyncMock()
         ws.client_state = WebSocketState.CONNECTED
 
         await srv._handle_cancel(ws, {})
-        for proc in procs.values():
-            proc.terminate.assert_called_once()
+        signalled = sorted(c.args for c in killpg.call_args_list)
+        assert signalled == [(1001, signal.SIGTERM), (1002, signal.SIGTERM)]
 
     @pytest.mark.asyncio
     async def test_cancel_no_process_returns_error(self):
@@ -157,6 +199,16 @@ class TestHandleCancel:
         assert sent["type"] == "error"
         assert "No active process" in sent["detail"]
 
+    @pytest.mark.asyncio
+    async def test_cancel_all_with_nothing_running_sends_text_frame(self):
+        ws = AsyncMock()
+        ws.client_state = WebSocketState.CONNECTED
+
+        await srv._handle_cancel(ws, {})
+        import json
+        ws.send_text.assert_called_once_with(srv._ERR_NO_ACTIVE_PROCESS)
+        assert json.loads(srv._ERR_NO_ACTIVE_PROCESS) == {"type": "error", "detail": "No active process to cancel"}
+
 
 class TestConcurrentLocking:
     @pytest.mark.asyncio
@@ -175,3 +227,151 @@ class TestConcurrentLocking:
 
         lock1.release()
         lock2.release()
+
+
+class TestConversationLockEviction:
+    def test_unreferenced_lock_is_dropped(self):
+        import gc
+        lock = srv._get_conversation_lock("conv_1")
+        assert "conv_1" in srv.conversation_locks
+        del lock
+        gc.collect()
+        assert "conv_1" not in srv.conversation_locks
+
+    @pytest.mark.asyncio
+    async def test_held_lock_survives_while_referenced(self):
+        import gc
+        lock = srv._get_conversation_lock("conv_1")
+        async with lock:
+            gc.collect()
+            assert srv._get_conversation_lock("conv_1") is lock
+            assert srv._get_conversation_lock("conv_1").locked()
+
+
+class TestBroadcast:
+    @pytest.fixture(autouse=True)
+    def clean_clients(self):
+        srv.connected_clients.clear()
+        srv.client_outboxes.clear()
+        yield
+        srv.connected_clients.clear()
+        srv.client_outboxes.clear()
+
+    def _connect(self, maxsize=srv.CLIENT_OUTBOX_SIZE):
+        ws = MagicMock()
+        srv.connected_clients[ws] = None
+        srv.client_outboxes[id(ws)] = asyncio.Queue(maxsize=maxsize)
+        return ws
+
+    @pytest.mark.asyncio
+    async def test_queues_events_in_order_for_every_client(self):
+        ws1, ws2 = self._connect(), self._connect()
+        srv._broadcast({"type": "a"}, {"type": "b"})
+        for ws in (ws1, ws2):
+            outbox = srv.client_outboxes[id(ws)]
+            assert [outbox.get_nowait() for _ in range(outbox.qsize())] == ['{"type":"a"}', '{"type":"b"}']
+
+    @pytest.mark.asyncio
+    async def test_serializes_each_event_once(self):
+        for _ in range(5):
+            self._connect()
+        with patch("conn_server.server._json.dumps", wraps=srv._json.dumps) as dumps:
+            srv._broadcast({"type": "a"})
+        assert dumps.call_count == 1
+        payloads = {srv.client_outboxes[id(ws)].get_nowait() for ws in srv.connected_clients}
+        assert len(payloads) == 1
+
+    @pytest.mark.asyncio
+    async def test_oversized_event_is_skipped(self):
+        ws = self._connect()
+        with patch("conn_server.server.MAX_WS_MESSAGE_SIZE", 20):
+            srv._broadcast({"type": "x" * 50}, {"type": "ok"})
+        assert srv.client_outboxes[id(ws)].get_nowait() == '{"type":"ok"}'
+
+    @pytest.mark.asyncio
+    async def test_slow_client_is_dropped(self):
+        slow = self._connect(maxsize=1)
+        slow.close = AsyncMock()
+        fast = self._connect()
+
+        srv._broadcast({"type": "a"}, {"type": "b"})
+        await asyncio.sleep(0)
+
+        assert slow not in srv.connected_clients
+        assert id(slow) not in srv.client_outboxes
+        slow.close.assert_awaited_once()
+        assert srv.client_outboxes[id(fast)].qsize() == 2
+
+    @pytest.mark.asyncio
+    async def test_send_to_client_targets_latest_connection(self):
+        first, latest = self._connect(), self._connect()
+        with patch("conn_server.server._send", new_callable=AsyncMock) as send:
+            await srv._send_to_client({"type": "image"})
+            srv.connected_clients.pop(latest)
+            await srv._send_to_client({"type": "image"})
+        assert [c.args[0] for c in send.await_args_list] == [latest, first]
+
+
+class TestWorktreeCleanup:
+    @pytest.mark.asyncio
+    async def test_detaches_conversations_and_removes_worktrees(self, tmp_path, tmp_config_dir):
+        import subprocess
+        from conn_server.git_utils import create_worktree
+        from conn_server.session_manager import SessionManager
+
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        for cmd in (["git", "init", "-b", "main"], ["git", "config", "user.email", "t@t"],
+                    ["git", "config", "user.name", "T"], ["git", "commit", "--allow-empty", "-m", "init"]):
+            subprocess.run(cmd, cwd=repo, capture_output=True, check=True)
+
+        sm = SessionManager()
+        sm.create_conversation("conv_main", "Main", working_dir=str(repo))
+        sm.create_conversation("conv_wt", "Worktree", working_dir=str(repo))
+        wt_path = create_worktree(str(repo), "conv_wt")
+        sm.update_worktree("conv_wt", wt_path, str(repo))
+
+        with patch.object(srv, "sessions", sm):
+            task = srv._maybe_cleanup_worktrees("conv_main")
+            # Detached before the directories are removed
+            assert sm.get_conversation("conv_wt").git_worktree_path is None
+            await task
+
+        assert not (tmp_config_dir["worktrees_dir"] / "conv_wt").exists()
+
+    @pytest.mark.asyncio
+    async def test_keeps_worktrees_while_project_is_active(self, tmp_path, tmp_config_dir):
+        from conn_server.session_manager import SessionManager
+
+        sm = SessionManager()
+        sm.create_conversation("conv_main", "Main", working_dir=str(tmp_path))
+        sm.create_conversation("conv_wt", "Worktree", working_dir=str(tmp_path))
+        sm.update_worktree("conv_wt", str(tmp_path / "wt"), str(tmp_path))
+        proc = MagicMock()
+        proc.returncode = None
+        srv.active_processes["conv_wt"] = proc
+
+        with patch.object(srv, "sessions", sm), patch.object(srv, "remove_worktrees") as remove:
+            assert srv._maybe_cleanup_worktrees("conv_main") is None
+
+        remove.assert_not_called()
+        assert sm.get_conversation("conv_wt").git_worktree_path == str(tmp_path / "wt")
+
+
+class TestWebSocketAuth:
+    def test_repeated_auth_reuses_sender(self, tmp_config_dir):
+        from starlette.testclient import TestClient
+        client = TestClient(srv.app)
+        with client.websocket_connect("/ws/chat") as ws:
+            ws.send_json({"type": "auth", "token": tmp_config_dir["token"]})
+            assert ws.receive_json() == {"type": "auth_ok"}
+            (outbox,) = srv.client_outboxes.values()
+
+            ws.send_json({"type": "auth", "token": tmp_config_dir["token"]})
+            assert ws.receive_json() == {"type": "auth_ok"}
+            assert list(srv.client_outboxes.values()) == [outbox]
+
+            # The one sender still delivers broadcasts
+            outbox.put_nowait('{"type":"hello"}')
+            assert ws.receive_json() == {"type": "hello"}
+        srv.connected_clients.clear()
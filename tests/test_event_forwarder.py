@@ -1,11 +1,13 @@
 """Tests for the EventForwarder — maps Claude stream-json to our WebSocket protocol."""
 
+import asyncio
 import json
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
-from conn_server.server import EventForwarder, _summarize_tool_input, _extract_screenshot_path
+import conn_server.server as srv
+from conn_server.server import EventForwarder, _iter_lines, _parse_text_delta, _summarize_tool_input, _extract_screenshot_path
 
 
 @pytest.fixture
@@ -64,6 +66,86 @@ class TestTextDeltaForwarding:
         assert forwarder._saw_streaming_events is True
 
 
+class TestTextCoalescing:
+    @staticmethod
+    def _delta(text):
+        return {"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}}
+
+    @pytest.mark.asyncio
+    async def test_deltas_within_window_sent_once(self, mock_websocket):
+        ws, _ = mock_websocket
+        fwd = EventForwarder(coalesce=0.01)
+        with patch("conn_server.server._send", new_callable=AsyncMock) as mock_send:
+            for text in ("Hel", "lo", "!"):
+                assert await fwd.forward(ws, self._delta(text), "conv_1") is None
+            mock_send.assert_not_called()
+            await asyncio.sleep(0.05)
+        mock_send.assert_called_once_with(ws, {"type": "text_delta", "text": "Hello!", "conversation_id": "conv_1"})
+
+    @pytest.mark.asyncio
+    async def test_other_events_flush_pending_text_first(self, mock_websocket):
+        ws, _ = mock_websocket
+        fwd = EventForwarder(coalesce=10)
+        tool_start = {
+            "type": "content_block_start",
+            "content_block": {"type": "tool_use", "name": "Bash", "input": {"command": "ls"}},
+        }
+        with patch("conn_server.server._send", new_callable=AsyncMock) as mock_send:
+            await fwd.forward(ws, self._delta("Let me look"), "conv_1")
+            await fwd.forward(ws, tool_start, "conv_1")
+        types = [c.args[1]["type"] for c in mock_send.call_args_list]
+        assert types == ["text_delta", "tool_start"]
+        assert mock_send.call_args_list[0].args[1]["text"] == "Let me look"
+
+    @pytest.mark.asyncio
+    async def test_large_batch_sent_without_waiting(self, mock_websocket):
+        ws, _ = mock_websocket
+        fwd = EventForwarder(coalesce=10)
+        with patch("conn_server.server._send", new_callable=AsyncMock) as mock_send:
+            await fwd.forward(ws, self._delta("x" * EventForwarder.TEXT_BATCH_SIZE), "conv_1")
+        mock_send.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_flush_sends_remaining_text(self, mock_websocket):
+        ws, _ = mock_websocket
+        fwd = EventForwarder(coalesce=10)
+        with patch("conn_server.server._send", new_callable=AsyncMock) as mock_send:
+            await fwd.forward(ws, self._delta("tail"), "conv_1")
+            await fwd.flush()
+            await fwd.flush()  # Nothing left — no second message
+        mock_send.assert_called_once_with(ws, {"type": "text_delta", "text": "tail", "conversation_id": "conv_1"})
+
+    @pytest.mark.asyncio
+    async def test_cancelled_turn_drops_held_text(self, tmp_config_dir):
+        stdout = asyncio.StreamReader()
+        stdout.feed_data(b'{"type":"content_block_delta","delta":{"type":"text_delta","text":"held"}}\n')
+        proc = AsyncMock()
+        proc.stdout = stdout
+        proc.returncode = None
+        with patch.object(srv, "TEXT_DELTA_COALESCE", 0.05), \
+             patch.object(srv.asyncio, "create_subprocess_exec", AsyncMock(return_value=proc)), \
+             patch("conn_server.server._send_to_client", new_callable=AsyncMock) as mock_send:
+            turn = asyncio.create_task(srv._run_claude(AsyncMock(), "hi", "conv_1", None))
+            while stdout._buffer:  # Let the turn read the delta and hold it
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            turn.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await turn
+            await asyncio.sleep(0.1)  # Past the coalescing window
+        mock_send.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_flush_timer_is_tracked(self, mock_websocket):
+        ws, _ = mock_websocket
+        fwd = EventForwarder(coalesce=10)
+        with patch("conn_server.server._send", new_callable=AsyncMock):
+            await fwd.forward(ws, self._delta("x"), "conv_1")
+        assert fwd._flush_timer in srv.background_tasks
+        fwd.discard()
+        assert fwd._flush_timer is None
+
+
 class TestToolUseForwarding:
     @pytest.mark.asyncio
     async def test_tool_start_with_immediate_input(self, forwarder, mock_websocket):
@@ -176,6 +258,25 @@ class TestToolUseForwarding:
         assert result is not None
         assert result["input_summary"] == "/tmp/test.py"
 
+    @pytest.mark.asyncio
+    async def test_tool_input_parsed_only_when_fragment_closes_object(self, forwarder, mock_websocket):
+        ws, _ = mock_websocket
+        start_event = {
+            "type": "content_block_start",
+            "content_block": {"type": "tool_use", "name": "Read", "input": {}},
+        }
+        fragments = ['{"file_', 'path": "/tmp/', 'long/', 'name', '.py"}']
+        with patch("conn_server.server._send", new_callable=AsyncMock), \
+             patch("conn_server.server._json.loads", wraps=json.loads) as loads:
+            await forwarder.forward(ws, start_event, "conv_1")
+            for fragment in fragments:
+                result = await forwarder.forward(ws, {
+                    "type": "content_block_delta",
+                    "delta": {"type": "input_json_delta", "partial_json": fragment},
+                }, "conv_1")
+        assert loads.call_count == 1
+        assert result["input_summary"] == "/tmp/long/name.py"
+
     @pytest.mark.asyncio
     async def test_tool_done_sends_start_if_not_sent(self, forwarder, mock_websocket):
         ws, _ = mock_websocket
@@ -661,3 +762,49 @@ class TestScreenshotImageEvent:
                 await fwd.forward(ws, {"type": "content_block_stop"}, "conv_1")
 
         assert fwd.image_paths == [str(tmp_path / "shot1.png"), str(tmp_path / "shot2.png")]
+
+
+class TestIterLines:
+    async def _lines(self, *chunks):
+        stream = asyncio.StreamReader()
+        for chunk in chunks:
+            stream.feed_data(chunk)
+        stream.feed_eof()
+        return [line async for line in _iter_lines(stream)]
+
+    @pytest.mark.asyncio
+    async def test_splits_many_lines_in_one_chunk(self):
+        assert await self._lines(b'{"a":1}\n{"b":2}\n\n{"c":3}\n') == [b'{"a":1}', b'{"b":2}', b"", b'{"c":3}']
+
+    @pytest.mark.asyncio
+    async def test_joins_line_split_across_reads(self):
+        with patch("conn_server.server.STREAM_READ_SIZE", 4):
+            assert await self._lines(b'{"text":"hello"}\n{"x":1}\n') == [b'{"text":"hello"}', b'{"x":1}']
+
+    @pytest.mark.asyncio
+    async def test_yields_unterminated_last_line(self):
+        assert await self._lines(b"one\ntwo") == [b"one", b"two"]
+
+
+class TestParseTextDelta:
+    def test_extracts_and_unescapes_text(self):
+        line = json.dumps(
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": 'say "hi"\n\u00e9'}},
+            separators=(",", ":"),
+        ).encode()
+        event = _parse_text_delta(line)
+        assert event == {"type": "content_block_delta", "delta": {"type": "text_delta", "text": 'say "hi"\n\u00e9'}}
+
+    def test_matches_without_index(self):
+        line = b'{"type":"content_block_delta","delta":{"type":"text_delta","text":"ok"}}'
+        assert _parse_text_delta(line)["delta"]["text"] == "ok"
+
+    @pytest.mark.parametrize("line", [
+        b'{"type":"content_block_delta","index":1,"delta":{"type":"input_json_delta","partial_json":"{"}}',
+        b'{"type":"content_block_delta","index":0,"delta":{"type":"text_delta","text":"a"},"extra":1}',
+        b'{"type":"content_block_delta","index":0,"delta":{"type":"text_delta","text":"bad \\q"}}',
+        b'{"type":"assistant","message":{}}',
+        b"",
+    ])
+    def test_other_lines_fall_back(self, line):
+        assert _parse_text_delta(line) is None
@@ -0,0 +1,96 @@
+"""Tests for the zero-copy file response."""
+
+import os
+
+import pytest
+
+from conn_server.file_response import ZEROCOPY_EXTENSION, ZeroCopyFileResponse
+
+
+def _scope(extensions=None, method="GET"):
+    return {"type": "http", "method": method, "headers": [], "extensions": extensions or {}}
+
+
+async def _run(response, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        if message["type"] == ZEROCOPY_EXTENSION:
+            # The fd is closed once the response returns — read it now.
+            message = {**message, "data": os.pread(message["file"], message["count"], message["offset"])}
+        sent.append(message)
+
+    await response(scope, receive, send)
+    return sent
+
+
+class TestZeroCopyFileResponse:
+    @pytest.mark.asyncio
+    async def test_hands_fd_to_server_when_supported(self, tmp_path):
+        f = tmp_path / "shot.png"
+        f.write_bytes(b"\x89PNG" + b"x" * 1000)
+
+        sent = await _run(ZeroCopyFileResponse(str(f)), _scope({ZEROCOPY_EXTENSION: {}}))
+
+        start, body = sent
+        assert start["status"] == 200
+        headers = dict(start["headers"])
+        assert headers[b"content-length"] == b"1004"
+        assert b"last-modified" in headers
+        assert body["type"] == ZEROCOPY_EXTENSION
+        assert body["offset"] == 0
+        assert body["count"] == 1004
+        assert body["more_body"] is False
+        assert body["data"] == f.read_bytes()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_streamed_body(self, tmp_path):
+        f = tmp_path / "a.txt"
+        f.write_text("hello")
+
+        sent = await _run(ZeroCopyFileResponse(str(f)), _scope())
+
+        assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+        assert sent[1]["body"] == b"hello"
+
+    @pytest.mark.asyncio
+    async def test_head_sends_no_body(self, tmp_path):
+        f = tmp_path / "a.txt"
+        f.write_text("hello")
+
+        sent = await _run(ZeroCopyFileResponse(str(f)), _scope({ZEROCOPY_EXTENSION: {}}, method="HEAD"))
+
+        assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+
+    @pytest.mark.asyncio
+    async def test_missing_file_raises(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            await _run(ZeroCopyFileResponse(str(tmp_path / "gone")), _scope({ZEROCOPY_EXTENSION: {}}))
+
+    @pytest.mark.asyncio
+    async def test_byte_range_zerocopy(self, tmp_path):
+        f = tmp_path / "a.bin"
+        f.write_bytes(bytes(range(200)))
+
+        response = ZeroCopyFileResponse(str(f), status_code=206, byte_range=(50, 10))
+        sent = await _run(response, _scope({ZEROCOPY_EXTENSION: {}}))
+
+        assert sent[0]["status"] == 206
+        assert (sent[1]["offset"], sent[1]["count"]) == (50, 10)
+        assert sent[1]["data"] == bytes(range(50, 60))
+
+    @pytest.mark.asyncio
+    async def test_byte_range_streamed(self, tmp_path):
+        f = tmp_path / "a.bin"
+        f.write_bytes(bytes(range(200)) * 1000)
+
+        response = ZeroCopyFileResponse(str(f), status_code=206, byte_range=(100, 150_000))
+        response.chunk_size = 64 * 1024
+        sent = await _run(response, _scope())
+
+        body = b"".join(m["body"] for m in sent[1:])
+        assert body == f.read_bytes()[100:150_100]
+        assert sent[-1]["more_body"] is False
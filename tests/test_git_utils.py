@@ -1,9 +1,11 @@
 """Tests for git_utils module — branch detection and worktree management."""
 import subprocess
+from types import SimpleNamespace
 
 import pytest
 
-from conn_server.git_utils import get_current_branch, is_git_repo, create_worktree, remove_worktree
+from conn_server import git_utils
+from conn_server.git_utils import get_current_branch, is_git_repo, create_worktree, remove_worktree, remove_worktrees
 
 
 def _init_git_repo(path, branch="main"):
@@ -45,6 +47,73 @@ class TestIsGitRepo:
         assert is_git_repo("/nonexistent/path/abc123") is False
 
 
+class _FakeGitError(Exception):
+    pass
+
+
+def _fake_pygit2(git_dir, *, branch="main", bare=False, unborn=False, detached=False, error=None):
+    """A stand-in pygit2 module whose discovered repository has the given HEAD state."""
+    class Repository:
+        def __init__(self, path):
+            if error is not None:
+                raise error
+            self.is_bare = bare
+            self.head_is_unborn = unborn
+            self.head_is_detached = detached
+            self.head = SimpleNamespace(shorthand=branch)
+
+    return SimpleNamespace(
+        GitError=_FakeGitError,
+        Repository=Repository,
+        discover_repository=lambda path: git_dir,
+    )
+
+
+class TestPygit2Backend:
+    """The pygit2 path must give the same answers as the git subprocess fallback."""
+
+    def _both(self, monkeypatch, path, fake):
+        monkeypatch.setattr(git_utils, "pygit2", None)
+        expected = (get_current_branch(path), is_git_repo(path))
+        monkeypatch.setattr(git_utils, "pygit2", fake)
+        return expected, (get_current_branch(path), is_git_repo(path))
+
+    def test_branch(self, tmp_path, monkeypatch):
+        _init_git_repo(tmp_path, branch="develop")
+        fake = _fake_pygit2(str(tmp_path / ".git"), branch="develop")
+        expected, actual = self._both(monkeypatch, str(tmp_path), fake)
+        assert actual == expected == ("develop", True)
+
+    def test_detached_head(self, tmp_path, monkeypatch):
+        _init_git_repo(tmp_path)
+        subprocess.run(["git", "checkout", "--detach"], cwd=str(tmp_path), capture_output=True, check=True)
+        fake = _fake_pygit2(str(tmp_path / ".git"), detached=True)
+        expected, actual = self._both(monkeypatch, str(tmp_path), fake)
+        assert actual == expected == ("HEAD", True)
+
+    def test_unborn_branch(self, tmp_path, monkeypatch):
+        subprocess.run(["git", "init", "-b", "main", str(tmp_path)], capture_output=True, check=True)
+        fake = _fake_pygit2(str(tmp_path / ".git"), unborn=True)
+        expected, actual = self._both(monkeypatch, str(tmp_path), fake)
+        assert actual == expected == (None, True)
+
+    def test_inside_git_dir(self, tmp_path, monkeypatch):
+        _init_git_repo(tmp_path)
+        fake = _fake_pygit2(str(tmp_path / ".git"))
+        expected, actual = self._both(monkeypatch, str(tmp_path / ".git"), fake)
+        assert actual == expected == ("main", True)
+
+    def test_not_a_repo(self, tmp_path, monkeypatch):
+        expected, actual = self._both(monkeypatch, str(tmp_path), _fake_pygit2(None))
+        assert actual == expected == (None, False)
+
+    def test_git_error_returns_no_repo(self, tmp_path, monkeypatch):
+        fake = _fake_pygit2(str(tmp_path / ".git"), error=_FakeGitError("corrupt"))
+        monkeypatch.setattr(git_utils, "pygit2", fake)
+        assert get_current_branch(str(tmp_path)) is None
+        assert is_git_repo(str(tmp_path)) is False
+
+
 class TestCreateWorktree:
     def test_creates_worktree_successfully(self, tmp_path, tmp_config_dir):
         repo = tmp_path / "repo"
@@ -102,3 +171,28 @@ class TestRemoveWorktree:
         # Remove a worktree that doesn't exist — should not raise
         result = remove_worktree(str(repo), "conv_nonexistent")
         assert result is True  # No worktree dir to remove, branch -D is best-effort
+
+
+class TestRemoveWorktrees:
+    def test_removes_all_worktrees_and_branches(self, tmp_path, tmp_config_dir):
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        _init_git_repo(repo)
+
+        ids = ["conv_a", "conv_b", "conv_c"]
+        for cid in ids:
+            assert create_worktree(str(repo), cid) is not None
+
+        result = remove_worktrees(str(repo), ids + ["conv_missing"])
+        assert result == {cid: True for cid in ids + ["conv_missing"]}
+        for cid in ids:
+            assert not (tmp_config_dir["worktrees_dir"] / cid).exists()
+
+        branch_check = subprocess.run(
+            ["git", "branch", "--list", "conn/*"],
+            cwd=str(repo), capture_output=True, text=True,
+        )
+        assert branch_check.stdout.strip() == ""
+
+    def test_empty_list(self, tmp_path, tmp_config_dir):
+        assert remove_worktrees(str(tmp_path), []) == {}
@@ -2,7 +2,7 @@
 
 import pytest
 
-from conn_server.mcp_catalog import CATALOG, get_catalog, CatalogEntry, CredentialField
+from conn_server.mcp_catalog import CATALOG, get_catalog, get_catalog_json, CatalogEntry, CredentialField
 from conn_server.mcp_config import McpConfigManager, McpServer
 
 
@@ -141,6 +141,23 @@ class TestGetCatalog:
         assert gh["credentials"][0]["key"] == "Authorization"
         assert gh["doc_url"]
 
+    def test_json_matches_dicts(self):
+        import json
+        for installed in (set(), {"playwright", "github"}):
+            assert json.loads(get_catalog_json(installed)) == get_catalog(installed)
+
+    def test_iter_matches_list(self):
+        from conn_server.mcp_catalog import iter_catalog
+        it = iter_catalog({"github"})
+        assert not isinstance(it, list)
+        assert list(it) == get_catalog({"github"})
+
+    def test_matches_asdict(self):
+        from dataclasses import asdict
+        result = get_catalog(set())
+        for entry, d in zip(CATALOG, result):
+            assert d == {**asdict(entry), "installed": False}
+
 
 class TestCatalogEndpoint:
     """Integration test for GET /mcp/catalog via McpConfigManager."""
@@ -2,6 +2,7 @@
 
 import asyncio
 import json
+import os
 import socket
 import sys
 from pathlib import Path
@@ -10,7 +11,9 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from httpx import AsyncClient, ASGITransport
 
-from conn_server.preview_manager import PreviewManager, PREVIEW_PORT_MIN, PREVIEW_PORT_MAX
+from conn_server.preview_manager import (
+    PreviewManager, ProjectKind, detect_project_kind, PREVIEW_PORT_MIN, PREVIEW_PORT_MAX,
+)
 from conn_server.server import app
 from conn_server.session_manager import SessionManager
 
@@ -66,6 +69,25 @@ class TestPreviewManagerDetectCommand:
             pm._detect_command(str(tmp_path), 8100)
 
 
+class TestDetectProjectKind:
+    def test_dev_script_wins_over_start(self, tmp_path):
+        (tmp_path / "package.json").write_text(json.dumps({"scripts": {"dev": "vite", "start": "node ."}}))
+        assert detect_project_kind(tmp_path) is ProjectKind.NODE_DEV
+
+    def test_dist_wins_over_root_index(self, tmp_path):
+        (tmp_path / "index.html").write_text("<html></html>")
+        (tmp_path / "dist").mkdir()
+        (tmp_path / "dist" / "index.html").write_text("<html></html>")
+        assert detect_project_kind(tmp_path) is ProjectKind.STATIC_DIST
+
+    def test_empty_dir_dist_ignored(self, tmp_path):
+        (tmp_path / "dist").mkdir()
+        assert detect_project_kind(tmp_path) is None
+
+    def test_missing_dir(self, tmp_path):
+        assert detect_project_kind(tmp_path / "nope") is None
+
+
 class TestPreviewManagerFindPort:
     def test_find_free_port_returns_in_range(self):
         pm = PreviewManager()
@@ -86,6 +108,21 @@ class TestPreviewManagerFindPort:
         finally:
             s.close()
 
+    def test_preferred_port_is_stable_across_processes(self):
+        import subprocess
+        code = "from conn_server.preview_manager import PreviewManager; print(PreviewManager()._find_free_port('/some/project'))"
+        ports = {
+            subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+            for _ in range(2)
+        }
+        assert len(ports) == 1
+
+    def test_find_free_port_skips_ports_held_by_previews(self):
+        pm = PreviewManager()
+        first_free = pm._find_free_port()
+        pm._used_ports.add(first_free)
+        assert pm._find_free_port() != first_free
+
 
 class TestCanPreview:
     def test_npm_dev_project(self, tmp_path):
@@ -122,6 +159,15 @@ class TestCanPreview:
         (tmp_path / "package.json").write_text(json.dumps({"name": "foo"}))
         assert PreviewManager.can_preview(str(tmp_path)) is False
 
+    def test_package_json_edit_is_picked_up(self, tmp_path):
+        pkg = tmp_path / "package.json"
+        pkg.write_text(json.dumps({"name": "foo"}))
+        assert PreviewManager.can_preview(str(tmp_path)) is False
+        pkg.write_text(json.dumps({"scripts": {"dev": "vite"}}))
+        st = pkg.stat()
+        os.utime(pkg, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert PreviewManager.can_preview(str(tmp_path)) is True
+
 
 class TestPreviewManagerLifecycle:
     def test_get_preview_returns_none_when_empty(self):
@@ -164,6 +210,7 @@ class TestPreviewManagerLifecycle:
         assert stopped is True
         assert pm.get_preview(wd) is None
         assert len(pm.list_previews()) == 0
+        assert pm._used_ports == set()
 
     @pytest.mark.asyncio
     async def test_start_deduplicates_same_dir(self, tmp_path):
@@ -61,6 +61,17 @@ def test_overwrite_existing_instructions(tmp_config_dir):
     assert get_custom_instructions(path) == "Second version"
 
 
+def test_external_edit_is_picked_up(tmp_config_dir):
+    """A config file edited outside the server is re-read (cache keyed by mtime/size)."""
+    path = "/Users/pat/Projects/MyApp"
+    set_custom_instructions(path, "Cached")
+    assert get_custom_instructions(path) == "Cached"
+
+    cfg = tmp_config_dir["projects_config_dir"] / "MyApp.json"
+    cfg.write_text(json.dumps({"path": path, "custom_instructions": "Edited by hand"}))
+    assert get_custom_instructions(path) == "Edited by hand"
+
+
 # --- REST endpoint tests ---
 
 @pytest.fixture
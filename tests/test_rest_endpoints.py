@@ -1,6 +1,7 @@
 """Tests for REST API endpoints."""
 
 import json
+import os
 import subprocess
 from pathlib import Path
 from unittest.mock import patch
@@ -57,6 +58,13 @@ class TestHealthEndpoint:
             response = await client.get("/health")
         assert response.json()["uptime_seconds"] >= 0
 
+    @pytest.mark.asyncio
+    async def test_responses_use_compact_json(self, test_client):
+        async with test_client as client:
+            response = await client.get("/health")
+        assert response.headers["content-type"] == "application/json"
+        assert b'", "' not in response.content
+
 
 class TestConversationsEndpoint:
     @pytest.mark.asyncio
@@ -128,6 +136,23 @@ class TestConversationsEndpoint:
         conv = next(c for c in convs if c["id"] == "conv_plain")
         assert conv["git_branch"] is None
 
+    @pytest.mark.asyncio
+    async def test_git_branch_follows_checkout(self, test_client, headers, tmp_config_dir):
+        """The cached branch is dropped once .git/HEAD is rewritten."""
+        project_dir = tmp_config_dir["projects_dir"] / "SwitchProject"
+        project_dir.mkdir()
+        _init_git_repo(project_dir, branch="main")
+        import conn_server.server as server
+        server.sessions.create_conversation("conv_switch", "Test", working_dir=str(project_dir))
+
+        async with test_client as client:
+            first = await client.get("/conversations", headers=headers)
+            subprocess.run(["git", "checkout", "-b", "other"], cwd=project_dir, capture_output=True, check=True)
+            second = await client.get("/conversations", headers=headers)
+        branch = lambda r: next(c for c in r.json()["conversations"] if c["id"] == "conv_switch")["git_branch"]
+        assert branch(first) == "main"
+        assert branch(second) == "other"
+
 
 class TestProjectsEndpoint:
     @pytest.mark.asyncio
@@ -163,6 +188,15 @@ class TestProjectsEndpoint:
         assert ".hidden" not in names
         assert "Visible" in names
 
+    @pytest.mark.asyncio
+    async def test_list_projects_sees_project_created_after_listing(self, test_client, headers, tmp_config_dir):
+        async with test_client as client:
+            await client.get("/projects", headers=headers)
+            await client.post("/projects", json={"name": "Later"}, headers=headers)
+            response = await client.get("/projects", headers=headers)
+        names = [p["name"] for p in response.json()["projects"]]
+        assert "Later" in names
+
     @pytest.mark.asyncio
     async def test_list_projects_requires_auth(self, test_client):
         async with test_client as client:
@@ -484,6 +518,62 @@ class TestUploadEndpoint:
             )
         assert response.status_code == 401
 
+    @pytest.mark.asyncio
+    async def test_upload_multi_chunk_roundtrip(self, test_client, headers):
+        data = bytes(range(256)) * 1000  # several UPLOAD_CHUNK_SIZE chunks
+        async with test_client as client:
+            response = await client.post(
+                "/upload?conversation_id=conv_1",
+                headers=headers,
+                files={"file": ("big.png", data, "image/png")},
+            )
+        assert response.status_code == 200
+        assert Path(response.json()["path"]).read_bytes() == data
+
+    @pytest.mark.asyncio
+    async def test_upload_sharded_under_conversation_dir(self, test_client, headers, tmp_config_dir):
+        async with test_client as client:
+            response = await client.post(
+                "/upload?conversation_id=conv_1",
+                headers=headers,
+                files={"file": ("shot.png", b"png", "image/png")},
+            )
+        path = Path(response.json()["path"])
+        shard = path.parent
+        assert shard.parent == tmp_config_dir["uploads_dir"] / "conv_1"
+        assert path.name.startswith(shard.name)
+        assert path.name.endswith("_shot.png")
+
+    @pytest.mark.asyncio
+    async def test_upload_too_large_leaves_no_file(self, test_client, headers, tmp_config_dir):
+        with patch("conn_server.server.MAX_UPLOAD_SIZE", 1000):
+            async with test_client as client:
+                response = await client.post(
+                    "/upload?conversation_id=conv_big",
+                    headers=headers,
+                    files={"file": ("big.png", b"x" * 5000, "image/png")},
+                )
+        assert response.status_code == 413
+        conv_dir = tmp_config_dir["uploads_dir"] / "conv_big"
+        assert not any(p.is_file() for p in conv_dir.rglob("*"))
+
+    @pytest.mark.asyncio
+    async def test_upload_too_large_mid_stream(self, test_client, tmp_config_dir):
+        # Size unknown up front (e.g. chunked body) — caught while copying
+        import io
+        from fastapi import HTTPException
+        from starlette.datastructures import UploadFile
+        from conn_server.server import upload_file
+
+        upload = UploadFile(io.BytesIO(b"x" * 5000), filename="big.png")
+        assert upload.size is None
+        with patch("conn_server.server.MAX_UPLOAD_SIZE", 1000), \
+             patch("conn_server.server.UPLOAD_CHUNK_SIZE", 512), \
+             pytest.raises(HTTPException) as exc:
+            await upload_file(conversation_id="conv_big", file=upload)
+        assert exc.value.status_code == 413
+        assert not any(p.is_file() for p in (tmp_config_dir["uploads_dir"] / "conv_big").rglob("*"))
+
 
 class TestActiveConversationsEndpoint:
     @pytest.mark.asyncio
@@ -749,6 +839,19 @@ class TestMcpServersEndpoint:
             })
         assert response.status_code == 404
 
+    @pytest.mark.asyncio
+    async def test_catalog_marks_installed_servers(self, test_client, headers):
+        async with test_client as client:
+            await client.post("/mcp/servers", headers=headers, json={
+                "name": "playwright", "transport": "stdio", "command": "npx",
+            })
+            response = await client.get("/mcp/catalog", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        catalog = {e["id"]: e for e in response.json()["catalog"]}
+        assert catalog["playwright"]["installed"] is True
+        assert catalog["github"]["installed"] is False
+
 
 class TestServeFileEndpoint:
     """Tests for GET /files — serves image files back to the mobile client."""
@@ -774,6 +877,20 @@ class TestServeFileEndpoint:
             response = await client.get(f"/files?path={img}", headers=headers)
         assert response.status_code == 200
 
+    @pytest.mark.asyncio
+    async def test_serve_revalidates_with_etag(self, test_client, headers, tmp_config_dir):
+        uploads = tmp_config_dir["uploads_dir"]
+        img = uploads / "cached.png"
+        img.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 50)
+
+        async with test_client as client:
+            first = await client.get(f"/files?path={img}", headers=headers)
+            assert first.headers["cache-control"] == "private, max-age=300"
+            etag = first.headers["etag"]
+            second = await client.get(f"/files?path={img}", headers={**headers, "If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+
     @pytest.mark.asyncio
     async def test_serve_rejects_non_image(self, test_client, headers, tmp_config_dir):
         uploads = tmp_config_dir["uploads_dir"]
@@ -808,6 +925,12 @@ class TestServeFileEndpoint:
             response = await client.get("/files?path=/../../../etc/passwd.png", headers=headers)
         assert response.status_code in (400, 403)
 
+    @pytest.mark.asyncio
+    async def test_serve_rejects_overlong_path(self, test_client, headers):
+        async with test_client as client:
+            response = await client.get(f"/files?path=/tmp/{'a' * 5000}.png", headers=headers)
+        assert response.status_code == 414
+
     @pytest.mark.asyncio
     async def test_serve_rejects_outside_allowed_dirs(self, test_client, headers):
         """Files outside uploads_dir/working_dir/tmp are rejected.
@@ -857,6 +980,45 @@ class TestServeFileEndpoint:
             response = await client.get(f"/files?path={img}&token=wrong-token")
         assert response.status_code == 403
 
+    def test_root_prefixes_end_with_separator(self, test_client):
+        # Otherwise "<uploads>-evil/x.png" would pass as being under "<uploads>"
+        from conn_server import server
+        _, prefixes = server._get_servable_roots()
+        assert prefixes and all(p.endswith(os.sep) for p in prefixes)
+
+    def test_roots_follow_conversation_set(self, test_client, tmp_config_dir, tmp_path):
+        from conn_server import server
+        roots, _ = server._get_servable_roots()
+        project = tmp_path / "elsewhere"
+        project.mkdir()
+        assert str(project.resolve()) not in roots
+
+        server.sessions.create_conversation("roots-conv", "Roots", working_dir=str(project))
+        roots, _ = server._get_servable_roots()
+        assert str(project.resolve()) in roots
+
+        server.sessions.delete_conversation("roots-conv")
+        roots, _ = server._get_servable_roots()
+        assert str(project.resolve()) not in roots
+
+
+    def test_symlinked_root_resolved_per_request(self, test_client, tmp_config_dir, tmp_path):
+        from conn_server import server
+        first, second = tmp_path / "first", tmp_path / "second"
+        first.mkdir()
+        second.mkdir()
+        link = tmp_path / "projects-link"
+        link.symlink_to(first)
+        server.sessions.create_conversation("link-conv", "Link", working_dir=str(link))
+        roots, _ = server._get_servable_roots()
+        assert str(first.resolve()) in roots
+
+        link.unlink()
+        link.symlink_to(second)
+        roots, _ = server._get_servable_roots()
+        assert str(second.resolve()) in roots
+        assert str(first.resolve()) not in roots
+
 
 class TestValidateToolSpec:
     """Tests for _validate_tool_spec — accepts bare tool names and pattern syntax."""
@@ -884,6 +1046,14 @@ class TestValidateToolSpec:
     def test_edit_with_pattern(self):
         assert _validate_tool_spec("Edit(*.py)") is True
 
+    def test_malformed_pattern(self):
+        assert _validate_tool_spec("Bash(git:*") is False
+        assert _validate_tool_spec("Bash(git:*)extra") is False
+        assert _validate_tool_spec("Bashful") is False
+
+    def test_non_string_spec(self):
+        assert _validate_tool_spec(None) is False
+
 
 class TestUpdateEndpoint:
     @pytest.mark.asyncio
@@ -910,6 +1080,20 @@ class TestUpdateEndpoint:
         assert data["versionCode"] == 42
         assert data["versionName"] == "1.0.0-dev.42"
 
+    @pytest.mark.asyncio
+    async def test_update_check_sees_new_release(self, test_client, headers, tmp_config_dir):
+        version_file = tmp_config_dir["releases_dir"] / "version.json"
+        version_file.write_text(json.dumps({"versionCode": 1}))
+
+        async with test_client as client:
+            first = await client.get("/update/check", headers=headers)
+            version_file.write_text(json.dumps({"versionCode": 2}))
+            st = version_file.stat()
+            os.utime(version_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            second = await client.get("/update/check", headers=headers)
+        assert first.json()["versionCode"] == 1
+        assert second.json()["versionCode"] == 2
+
     @pytest.mark.asyncio
     async def test_update_check_requires_auth(self, test_client):
         async with test_client as client:
@@ -959,6 +1143,80 @@ class TestUpdateEndpoint:
             response = await client.get("/update/download")
         assert response.status_code == 401
 
+    @pytest.mark.asyncio
+    async def test_update_download_range(self, test_client, headers, tmp_config_dir):
+        (tmp_config_dir["releases_dir"] / "latest.apk").write_bytes(bytes(range(100)))
+
+        async with test_client as client:
+            response = await client.get("/update/download", headers={**headers, "Range": "bytes=90-"})
+        assert response.status_code == 206
+        assert response.content == bytes(range(90, 100))
+        assert response.headers["content-range"] == "bytes 90-99/100"
+        assert response.headers["accept-ranges"] == "bytes"
+
+    @pytest.mark.asyncio
+    async def test_update_download_suffix_range(self, test_client, headers, tmp_config_dir):
+        (tmp_config_dir["releases_dir"] / "latest.apk").write_bytes(bytes(range(100)))
+
+        async with test_client as client:
+            response = await client.get("/update/download", headers={**headers, "Range": "bytes=-5"})
+        assert response.status_code == 206
+        assert response.content == bytes(range(95, 100))
+
+    @pytest.mark.asyncio
+    async def test_update_download_unsatisfiable_range(self, test_client, headers, tmp_config_dir):
+        (tmp_config_dir["releases_dir"] / "latest.apk").write_bytes(b"\x00" * 100)
+
+        async with test_client as client:
+            response = await client.get("/update/download", headers={**headers, "Range": "bytes=500-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */100"
+
+    @pytest.mark.asyncio
+    async def test_update_download_if_none_match(self, test_client, headers, tmp_config_dir):
+        (tmp_config_dir["releases_dir"] / "latest.apk").write_bytes(b"\x00" * 100)
+
+        async with test_client as client:
+            first = await client.get("/update/download", headers=headers)
+            etag = first.headers["etag"]
+            second = await client.get("/update/download", headers={**headers, "If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+
+    @pytest.mark.asyncio
+    async def test_update_download_stale_if_range_sends_full_file(self, test_client, headers, tmp_config_dir):
+        (tmp_config_dir["releases_dir"] / "latest.apk").write_bytes(b"\x00" * 100)
+
+        async with test_client as client:
+            response = await client.get(
+                "/update/download",
+                headers={**headers, "Range": "bytes=10-", "If-Range": '"stale"'},
+            )
+        assert response.status_code == 200
+        assert len(response.content) == 100
+
+    @pytest.mark.asyncio
+    async def test_update_download_if_range_uses_strong_comparison(self, test_client, headers, tmp_config_dir):
+        (tmp_config_dir["releases_dir"] / "latest.apk").write_bytes(b"\x00" * 100)
+
+        async with test_client as client:
+            etag = (await client.get("/update/download", headers=headers)).headers["etag"]
+            assert not etag.startswith("W/")
+            strong = await client.get(
+                "/update/download", headers={**headers, "Range": "bytes=10-", "If-Range": etag},
+            )
+            weak = await client.get(
+                "/update/download", headers={**headers, "Range": "bytes=10-", "If-Range": f"W/{etag}"},
+            )
+            revalidate = await client.get("/update/download", headers={**headers, "If-None-Match": f"W/{etag}"})
+        assert strong.status_code == 206
+        assert len(strong.content) == 90
+        # A weak validator never satisfies If-Range, so the whole file is sent
+        assert weak.status_code == 200
+        assert len(weak.content) == 100
+        # If-None-Match compares weakly
+        assert revalidate.status_code == 304
+
     @pytest.mark.asyncio
     async def test_releases_empty(self, test_client, headers):
         async with test_client as client:
@@ -1171,6 +1429,16 @@ class TestSendImageEndpoint:
             response = await client.post("/send-image", json={"path": "/etc/passwd"}, headers=headers)
         assert response.status_code == 403
 
+    @pytest.mark.asyncio
+    async def test_rejects_sibling_sharing_root_prefix(self, test_client, headers):
+        async with test_client as client:
+            response = await client.post(
+                "/send-image",
+                json={"path": "/tmp/auto-mobile/screenshots-evil/x.png", "conversation_id": "c"},
+                headers=headers,
+            )
+        assert response.status_code == 403
+
     @pytest.mark.asyncio
     async def test_rejects_path_traversal(self, test_client, headers):
         async with test_client as client:
@@ -1181,6 +1449,16 @@ class TestSendImageEndpoint:
             )
         assert response.status_code == 400
 
+    @pytest.mark.asyncio
+    async def test_rejects_overlong_path(self, test_client, headers):
+        async with test_client as client:
+            response = await client.post(
+                "/send-image",
+                json={"path": "/tmp/auto-mobile/screenshots/" + "a" * 5000 + ".png"},
+                headers=headers,
+            )
+        assert response.status_code == 414
+
     @pytest.mark.asyncio
     async def test_rejects_nonexistent_file(self, test_client, headers):
         async with test_client as client: